@@ -0,0 +1,104 @@
+# bench_lectura.py - Benchmark de la lectura de lineas de archivos planos (ingesta)
+# Compara la lectura en modo texto linea por linea (implementacion original)
+# contra ingesta.iter_bloques_lineas (mmap por bloques) y mide la tabla de
+# offsets de lineas; reporta throughput en MB/s
+#
+# Uso: python benchmarks/bench_lectura.py [cantidad_filas]
+
+import os
+import sys
+import tempfile
+import time
+
+# Agregar src al path
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generador
+import ingesta
+
+
+def lineas_modo_texto(ruta):
+    # Implementacion original: lectura en modo texto, recortando el "\n"
+    # Se mantiene aca solo como referencia de comparacion
+    cantidad = 0
+    arch = open(ruta, "r", encoding="utf-8")
+    for linea in arch:
+        if linea[-1] == "\n":
+            linea = linea[:-1]
+        cantidad += 1
+    arch.close()
+    return cantidad
+
+
+def lineas_mmap(ruta):
+    # Lectura por bloques con mmap
+    cantidad = 0
+    for lineas in ingesta.iter_bloques_lineas(ruta):
+        for linea in lineas:
+            cantidad += 1
+    return cantidad
+
+
+def filas_tabla(ruta):
+    # Tabla de offsets de lineas
+    return len(ingesta.tabla_lineas(ruta)) - 1
+
+
+def medir(funcion, ruta, repeticiones):
+    # Retorna (mejor tiempo en segundos, resultado de la funcion)
+    mejor = None
+    resultado = None
+    r = 0
+    while r < repeticiones:
+        inicio = time.perf_counter()
+        resultado = funcion(ruta)
+        duracion = time.perf_counter() - inicio
+        if mejor == None or duracion < mejor:
+            mejor = duracion
+        r += 1
+    return mejor, resultado
+
+
+def ejecutar(filas):
+    # Genera un CSV sintetico, verifica que las lecturas coinciden e imprime MB/s
+    carpeta = tempfile.mkdtemp(prefix="bench_lectura_")
+    ruta = os.path.join(carpeta, "solicitudes.csv")
+    tamano = generador.generar_archivo(ruta, filas)
+    megabytes = tamano / (1024.0 * 1024.0)
+
+    resultados = {}
+    try:
+        cantidades = []
+        for nombre, funcion in [
+            ("modo_texto", lineas_modo_texto),
+            ("mmap", lineas_mmap),
+            ("tabla_lineas", filas_tabla),
+        ]:
+            duracion, cantidad = medir(funcion, ruta, 3)
+            cantidades.append(cantidad)
+            resultados[nombre] = round(megabytes / duracion, 2)
+            print(
+                nombre.ljust(14)
+                + str(resultados[nombre]).rjust(8)
+                + " MB/s   ("
+                + str(cantidad)
+                + " lineas, "
+                + str(round(megabytes, 1))
+                + " MB)"
+            )
+        if cantidades[0] != cantidades[1] or cantidades[0] != cantidades[2]:
+            raise ValueError("Cantidad de lineas distinta: " + str(cantidades))
+    finally:
+        os.remove(ruta)
+        os.rmdir(carpeta)
+    return resultados
+
+
+if __name__ == "__main__":
+    filas = 500000
+    if len(sys.argv) > 1:
+        filas = int(sys.argv[1])
+    ejecutar(filas)
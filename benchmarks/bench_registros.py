@@ -0,0 +1,100 @@
+# bench_registros.py - Benchmark de memoria por registro (dict vs compacto)
+# Genera un CSV sintetico (ver generador.py), lo lee y normaliza/valida los
+# registros como dicts y como registro.RegistroCompacto (--compacto). Reporta
+# bytes por registro retenidos al terminar la validacion (tracemalloc) y el
+# tiempo de normalizacion + validacion de cada representacion
+#
+# Uso: python benchmarks/bench_registros.py [--filas 10000,100000]
+
+import contextlib
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DIR_BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(DIR_BENCH), "src"))
+
+import logger
+import ingesta
+import normalizador
+import validador
+import generador
+
+
+def medir_representacion(ruta, compacto):
+    # Lee el archivo, normaliza y valida con la representacion indicada
+    # Retorna (bytes retenidos por los registros, segundos de procesamiento)
+    crudos = ingesta.leer_solicitudes(ruta)
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    registros = normalizador.normalizar_registros(crudos, compacto)
+    validador.validar_registros(registros)
+    duracion = time.perf_counter() - inicio
+    # Liberar los registros crudos: solo se mide lo que queda vivo para las
+    # etapas siguientes (calidad y exportacion)
+    del crudos
+    gc.collect()
+    retenidos = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del registros
+    return retenidos, duracion
+
+
+def ejecutar(lista_filas):
+    # Corre el benchmark para cada cantidad de filas e imprime la comparacion
+    carpeta = tempfile.mkdtemp(prefix="bench_registros_")
+    logger.inicializar(carpeta, "workflow.log", asincronico=True)
+    logger.configurar_agregacion(100)
+    resultados = []
+    devnull = open(os.devnull, "w")
+    for filas in lista_filas:
+        ruta = os.path.join(carpeta, "datos_" + str(filas) + ".csv")
+        generador.generar_archivo(ruta, filas, 42, generador.MEZCLA_ERRORES_DEFAULT)
+        # Los modulos loguean a consola: se descarta para no medir la terminal
+        with contextlib.redirect_stdout(devnull):
+            bytes_dict, t_dict = medir_representacion(ruta, False)
+            bytes_compacto, t_compacto = medir_representacion(ruta, True)
+            logger.flush()
+        os.remove(ruta)
+        resultado = {
+            "filas": filas,
+            "bytes_por_registro_dict": int(bytes_dict / filas),
+            "bytes_por_registro_compacto": int(bytes_compacto / filas),
+            "reduccion_memoria": round(bytes_dict / bytes_compacto, 2),
+            "duracion_s_dict": round(t_dict, 4),
+            "duracion_s_compacto": round(t_compacto, 4),
+        }
+        resultados.append(resultado)
+        print(
+            str(filas).rjust(9)
+            + " filas   dict: "
+            + str(resultado["bytes_por_registro_dict"]).rjust(6)
+            + " B/reg "
+            + str(resultado["duracion_s_dict"]).rjust(8)
+            + " s   compacto: "
+            + str(resultado["bytes_por_registro_compacto"]).rjust(6)
+            + " B/reg "
+            + str(resultado["duracion_s_compacto"]).rjust(8)
+            + " s   x"
+            + str(resultado["reduccion_memoria"])
+        )
+    devnull.close()
+    logger.cerrar()
+    shutil.rmtree(carpeta)
+    return resultados
+
+
+if __name__ == "__main__":
+    lista_filas = [10000, 100000]
+    i = 1
+    while i < len(sys.argv):
+        if sys.argv[i] == "--filas":
+            lista_filas = [int(x) for x in sys.argv[i + 1].split(",")]
+            i += 1
+        i += 1
+    ejecutar(lista_filas)
@@ -0,0 +1,119 @@
+# bench_separar_campos.py - Benchmark del separador de campos CSV (ingesta)
+# Compara ingesta.separar_campos contra la implementacion original caracter
+# por caracter y reporta throughput en MB/s para distintos tipos de linea
+#
+# Uso: python benchmarks/bench_separar_campos.py [cantidad_lineas]
+
+import os
+import sys
+import time
+
+# Agregar src al path
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+import ingesta
+
+
+def separar_campos_caracter(linea):
+    # Implementacion original (concatenacion caracter por caracter)
+    # Se mantiene aca solo como referencia de comparacion
+    campos = []
+    campo_actual = ""
+    dentro_comillas = False
+    i = 0
+    while i < len(linea):
+        c = linea[i]
+        if c == '"':
+            if dentro_comillas:
+                if i + 1 < len(linea) and linea[i + 1] == '"':
+                    campo_actual = campo_actual + '"'
+                    i += 2
+                    continue
+                else:
+                    dentro_comillas = False
+            else:
+                dentro_comillas = True
+        elif c == "," and not dentro_comillas:
+            campos.append(campo_actual)
+            campo_actual = ""
+        else:
+            campo_actual = campo_actual + c
+        i += 1
+    campos.append(campo_actual)
+    return campos
+
+
+def generar_lineas(tipo, cantidad):
+    # Genera lineas de prueba del tipo indicado
+    lineas = []
+    i = 0
+    while i < cantidad:
+        if tipo == "sin_comillas":
+            linea = (
+                "SOL-" + str(i) + ",15/03/2025,CUENTA,CLI-" + str(i)
+                + ",50000,ARS,Argentina,S,N"
+            )
+        elif tipo == "con_comillas":
+            linea = (
+                "SOL-" + str(i) + ',15/03/2025,"cuenta, ahorros",CLI-' + str(i)
+                + ',50000,ARS,"Argentina ""AR""",S,N'
+            )
+        else:
+            # Campo largo entre comillas (peor caso de la version original)
+            linea = "SOL-" + str(i) + ',"' + ("x" * 2000) + ', y",ARS'
+        lineas.append(linea)
+        i += 1
+    return lineas
+
+
+def medir(funcion, lineas, repeticiones):
+    # Retorna el mejor tiempo (segundos) de procesar todas las lineas
+    mejor = None
+    r = 0
+    while r < repeticiones:
+        inicio = time.perf_counter()
+        for linea in lineas:
+            funcion(linea)
+        duracion = time.perf_counter() - inicio
+        if mejor == None or duracion < mejor:
+            mejor = duracion
+        r += 1
+    return mejor
+
+
+def ejecutar(cantidad):
+    # Corre el benchmark para cada tipo de linea e imprime MB/s
+    resultados = {}
+    for tipo in ["sin_comillas", "con_comillas", "campo_largo"]:
+        lineas = generar_lineas(tipo, cantidad)
+        megabytes = sum(len(l.encode("utf-8")) for l in lineas) / (1024.0 * 1024.0)
+
+        # Verificar que ambas implementaciones coinciden antes de medir
+        for linea in lineas:
+            if ingesta.separar_campos(linea) != separar_campos_caracter(linea):
+                raise ValueError("Resultados distintos para: " + linea)
+
+        t_original = medir(separar_campos_caracter, lineas, 3)
+        t_nuevo = medir(ingesta.separar_campos, lineas, 3)
+        resultados[tipo] = {
+            "mb": round(megabytes, 2),
+            "mb_s_original": round(megabytes / t_original, 2),
+            "mb_s_nuevo": round(megabytes / t_nuevo, 2),
+            "aceleracion": round(t_original / t_nuevo, 1),
+        }
+        print(
+            tipo.ljust(14)
+            + " original: " + str(resultados[tipo]["mb_s_original"]).rjust(8) + " MB/s"
+            + "   nuevo: " + str(resultados[tipo]["mb_s_nuevo"]).rjust(8) + " MB/s"
+            + "   x" + str(resultados[tipo]["aceleracion"])
+        )
+    return resultados
+
+
+if __name__ == "__main__":
+    cantidad = 20000
+    if len(sys.argv) > 1:
+        cantidad = int(sys.argv[1])
+    ejecutar(cantidad)
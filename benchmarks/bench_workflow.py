@@ -0,0 +1,207 @@
+# bench_workflow.py - Benchmark por etapa del workflow
+# Genera archivos sinteticos (ver generador.py) y mide por separado ingesta,
+# normalizacion, validacion, calidad y exportacion: duracion, registros/s y
+# pico de memoria (tracemalloc). Guarda los resultados en un JSON para
+# comparar entre commits.
+#
+# Uso: python benchmarks/bench_workflow.py [--filas 10000,100000]
+#        [--formatos csv,json,txt] [--sin-memoria] [--errores fecha=0.1,...]
+#        [--salida ruta.json]
+
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+DIR_BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(DIR_BENCH), "src"))
+
+import logger
+import ingesta
+import normalizador
+import validador
+import calidad
+import main
+import generador
+
+# Carpeta donde se guardan los resultados (ignorada por git)
+DIR_RESULTADOS = os.path.join(DIR_BENCH, "resultados")
+
+
+def commit_actual():
+    # Hash corto del commit actual, o "" si no se puede obtener
+    try:
+        salida = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=DIR_BENCH,
+            capture_output=True,
+            text=True,
+        )
+        return salida.stdout.strip()
+    except OSError:
+        return ""
+
+
+def medir_etapa(nombre, funcion, filas, medir_memoria):
+    # Ejecuta funcion() y retorna (resultado, metricas de la etapa)
+    if medir_memoria:
+        tracemalloc.reset_peak()
+        memoria_inicio = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    resultado = funcion()
+    duracion = time.perf_counter() - inicio
+    metricas = {
+        "etapa": nombre,
+        "duracion_s": round(duracion, 4),
+        "registros_por_s": int(filas / duracion) if duracion > 0 else 0,
+    }
+    if medir_memoria:
+        pico = tracemalloc.get_traced_memory()[1]
+        metricas["pico_memoria_mb"] = round((pico - memoria_inicio) / 1048576.0, 2)
+    return resultado, metricas
+
+
+def bench_archivo(ruta, filas, carpeta, medir_memoria):
+    # Corre las 5 etapas sobre un archivo y retorna la lista de metricas
+    etapas = []
+    tamano_mb = os.path.getsize(ruta) / 1048576.0
+
+    registros, m = medir_etapa(
+        "ingesta", lambda: ingesta.leer_solicitudes(ruta), filas, medir_memoria
+    )
+    m["mb_por_s"] = round(tamano_mb / m["duracion_s"], 2) if m["duracion_s"] > 0 else 0
+    etapas.append(m)
+
+    registros, m = medir_etapa(
+        "normalizacion",
+        lambda: normalizador.normalizar_registros(registros),
+        filas,
+        medir_memoria,
+    )
+    etapas.append(m)
+
+    registros, m = medir_etapa(
+        "validacion",
+        lambda: validador.validar_registros(registros),
+        filas,
+        medir_memoria,
+    )
+    etapas.append(m)
+
+    _, m = medir_etapa(
+        "calidad",
+        lambda: calidad.generar_reporte(registros, os.path.basename(ruta), carpeta),
+        filas,
+        medir_memoria,
+    )
+    etapas.append(m)
+
+    ruta_salida = os.path.join(carpeta, "salida.csv")
+    _, m = medir_etapa(
+        "exportacion",
+        lambda: main.exportar_csv(registros, ruta_salida),
+        filas,
+        medir_memoria,
+    )
+    etapas.append(m)
+    return etapas
+
+
+def ejecutar(lista_filas, formatos, medir_memoria, mezcla, ruta_resultados):
+    # Genera los archivos, corre el benchmark y guarda el JSON de resultados
+    carpeta = tempfile.mkdtemp(prefix="bench_workflow_")
+    logger.inicializar(carpeta, "workflow.log", asincronico=True)
+    logger.configurar_agregacion(100)
+    if medir_memoria:
+        tracemalloc.start()
+
+    resultados = {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": commit_actual(),
+        "python": platform.python_version(),
+        "medicion_memoria": medir_memoria,
+        "mezcla_errores": mezcla,
+        "corridas": [],
+    }
+    devnull = open(os.devnull, "w")
+    for filas in lista_filas:
+        for formato in formatos:
+            ruta = os.path.join(carpeta, "datos_" + str(filas) + "." + formato)
+            generador.generar_archivo(ruta, filas, 42, mezcla)
+            # Los modulos loguean a consola: se descarta para no medir la terminal
+            with contextlib.redirect_stdout(devnull):
+                etapas = bench_archivo(ruta, filas, carpeta, medir_memoria)
+                logger.flush()
+            os.remove(ruta)
+            resultados["corridas"].append(
+                {"formato": formato, "filas": filas, "etapas": etapas}
+            )
+            for m in etapas:
+                linea = (
+                    formato.ljust(5)
+                    + str(filas).rjust(9)
+                    + "  "
+                    + m["etapa"].ljust(14)
+                    + str(m["duracion_s"]).rjust(9)
+                    + " s"
+                    + str(m["registros_por_s"]).rjust(11)
+                    + " reg/s"
+                )
+                if "pico_memoria_mb" in m.keys():
+                    linea = linea + str(m["pico_memoria_mb"]).rjust(10) + " MB"
+                print(linea)
+    devnull.close()
+
+    if medir_memoria:
+        tracemalloc.stop()
+    logger.cerrar()
+    shutil.rmtree(carpeta)
+
+    dir_resultados = os.path.dirname(ruta_resultados)
+    if dir_resultados != "" and not os.path.exists(dir_resultados):
+        os.makedirs(dir_resultados)
+    arch = open(ruta_resultados, "w", encoding="utf-8")
+    arch.write(json.dumps(resultados, indent=4, ensure_ascii=False))
+    arch.close()
+    print("Resultados guardados en: " + ruta_resultados)
+    return resultados
+
+
+if __name__ == "__main__":
+    lista_filas = [10000, 100000]
+    formatos = ["csv", "json", "txt"]
+    medir_memoria = True
+    mezcla = generador.MEZCLA_ERRORES_DEFAULT
+    ruta_resultados = None
+    i = 1
+    while i < len(sys.argv):
+        arg = sys.argv[i]
+        if arg == "--filas":
+            lista_filas = [int(x) for x in sys.argv[i + 1].split(",")]
+            i += 1
+        elif arg == "--formatos":
+            formatos = sys.argv[i + 1].split(",")
+            i += 1
+        elif arg == "--errores":
+            mezcla = generador.parsear_mezcla(sys.argv[i + 1])
+            i += 1
+        elif arg == "--salida":
+            ruta_resultados = sys.argv[i + 1]
+            i += 1
+        elif arg == "--sin-memoria":
+            medir_memoria = False
+        i += 1
+    if ruta_resultados == None:
+        nombre = "bench_" + datetime.now().strftime("%Y%m%d_%H%M%S")
+        commit = commit_actual()
+        if commit != "":
+            nombre = nombre + "_" + commit
+        ruta_resultados = os.path.join(DIR_RESULTADOS, nombre + ".json")
+    ejecutar(lista_filas, formatos, medir_memoria, mezcla, ruta_resultados)
@@ -0,0 +1,171 @@
+# generador.py - Generador determinista de datos sinteticos para benchmarks
+# Produce archivos CSV, JSON o TXT de solicitudes con una mezcla configurable
+# de errores (fechas invalidas, monedas no soportadas, montos fuera de rango,
+# campos vacios y campos entre comillas). Misma semilla = mismo archivo.
+#
+# Uso: python benchmarks/generador.py salida.csv [--filas N] [--semilla S]
+#        [--errores fecha=0.05,moneda=0.05,monto=0.05,vacio=0.02,comillas=0.1]
+
+import json
+import os
+import random
+import sys
+
+# Agregar src al path
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+import ingesta
+
+# Proporcion de registros con cada tipo de error (0.0 a 1.0)
+MEZCLA_ERRORES_DEFAULT = {
+    "fecha": 0.05,
+    "moneda": 0.05,
+    "monto": 0.05,
+    "vacio": 0.02,
+    "comillas": 0.10,
+}
+
+# Valores validos (en distintos formatos, como llegan en los archivos reales)
+TIPOS_PRODUCTO = ["cuenta", "CUENTA", " tarjeta ", "servicio", "Tarjeta"]
+MONEDAS = ["ARS", "usd", "EUR", " ars "]
+PAISES = ["Argentina", " brasil ", "colombia", "ESTADOS UNIDOS", "chile"]
+FLAGS = ["S", "N"]
+
+# Valores con error por tipo
+FECHAS_INVALIDAS = ["32/13/2025", "2025/03/15", "15-3-2025", "sin fecha", "00/00/0000"]
+MONEDAS_INVALIDAS = ["GBP", "BRL", "XXX", "dolar"]
+MONTOS_INVALIDOS = ["-500", "0", "1000000000", "abc", "12.5"]
+
+
+def generar_fecha(rnd):
+    # Fecha valida en uno de los tres formatos aceptados
+    dia = rnd.randint(1, 28)
+    mes = rnd.randint(1, 12)
+    anio = rnd.randint(2020, 2026)
+    formato = rnd.randint(0, 2)
+    if formato == 0:
+        return "%02d/%02d/%04d" % (dia, mes, anio)
+    if formato == 1:
+        return "%04d-%02d-%02d" % (anio, mes, dia)
+    return "%02d-%02d-%04d" % (dia, mes, anio)
+
+
+def generar_registro(rnd, numero, mezcla):
+    # Genera un registro (diccionario de strings) con errores segun la mezcla
+    reg = {
+        "id_solicitud": "SOL-" + str(numero),
+        "fecha_solicitud": generar_fecha(rnd),
+        "tipo_producto": rnd.choice(TIPOS_PRODUCTO),
+        "id_cliente": "CLI-" + str(rnd.randint(100, 999999)),
+        "monto_o_limite": str(rnd.randint(1, 2000000)),
+        "moneda": rnd.choice(MONEDAS),
+        "pais": rnd.choice(PAISES),
+        "flag_prioritario": rnd.choice(FLAGS),
+        "flag_digital": rnd.choice(FLAGS),
+    }
+    if rnd.random() < mezcla.get("fecha", 0.0):
+        reg["fecha_solicitud"] = rnd.choice(FECHAS_INVALIDAS)
+    if rnd.random() < mezcla.get("moneda", 0.0):
+        reg["moneda"] = rnd.choice(MONEDAS_INVALIDAS)
+    if rnd.random() < mezcla.get("monto", 0.0):
+        reg["monto_o_limite"] = rnd.choice(MONTOS_INVALIDOS)
+    if rnd.random() < mezcla.get("vacio", 0.0):
+        reg[rnd.choice(["tipo_producto", "id_cliente", "pais"])] = ""
+    if rnd.random() < mezcla.get("comillas", 0.0):
+        # Valor con coma y comillas: obliga a escapar en CSV
+        reg["tipo_producto"] = 'cuenta, "plus"'
+    return reg
+
+
+def escapar_csv(valor):
+    # Escapa un valor para CSV (comillas si tiene coma o comillas)
+    if "," in valor or '"' in valor:
+        return '"' + valor.replace('"', '""') + '"'
+    return valor
+
+
+def generar_archivo(ruta, filas, semilla=42, mezcla=None):
+    # Escribe `filas` registros en `ruta`; el formato sale de la extension
+    # Escribe registro por registro (sirve para archivos de millones de filas)
+    # Retorna el tamano del archivo en bytes
+    if mezcla == None:
+        mezcla = MEZCLA_ERRORES_DEFAULT
+    formato = ingesta.detectar_formato(ruta)
+    if formato not in ["csv", "json", "txt"]:
+        raise ValueError("Formato no soportado por el generador: " + ruta)
+
+    rnd = random.Random(semilla)
+    arch = open(ruta, "w", encoding="utf-8", buffering=1024 * 1024)
+    if formato == "csv":
+        arch.write(",".join(ingesta.CAMPOS) + "\n")
+    elif formato == "txt":
+        arch.write("|".join(ingesta.CAMPOS) + "\n")
+    else:
+        arch.write("[\n")
+
+    numero = 1
+    while numero <= filas:
+        reg = generar_registro(rnd, numero, mezcla)
+        valores = []
+        for campo in ingesta.CAMPOS:
+            valores.append(reg[campo])
+        if formato == "csv":
+            escapados = []
+            for valor in valores:
+                escapados.append(escapar_csv(valor))
+            arch.write(",".join(escapados) + "\n")
+        elif formato == "txt":
+            # En TXT el pipe es separador: no puede aparecer en los valores
+            arch.write("|".join(valores) + "\n")
+        else:
+            if numero > 1:
+                arch.write(",\n")
+            arch.write(json.dumps(reg, ensure_ascii=False))
+        numero += 1
+
+    if formato == "json":
+        arch.write("\n]\n")
+    arch.close()
+    return os.path.getsize(ruta)
+
+
+def parsear_mezcla(texto):
+    # Convierte "fecha=0.05,moneda=0.1" en un diccionario de proporciones
+    mezcla = {}
+    for parte in texto.split(","):
+        if parte.strip() == "":
+            continue
+        clave, valor = parte.split("=")
+        clave = clave.strip()
+        if clave not in MEZCLA_ERRORES_DEFAULT.keys():
+            raise ValueError("Tipo de error desconocido: " + clave)
+        mezcla[clave] = float(valor)
+    return mezcla
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(
+            "Uso: python benchmarks/generador.py salida.csv [--filas N] "
+            + "[--semilla S] [--errores fecha=0.05,moneda=0.05,...]"
+        )
+        sys.exit(1)
+    ruta = sys.argv[1]
+    filas = 10000
+    semilla = 42
+    mezcla = None
+    i = 2
+    while i < len(sys.argv):
+        if sys.argv[i] == "--filas":
+            filas = int(sys.argv[i + 1])
+        elif sys.argv[i] == "--semilla":
+            semilla = int(sys.argv[i + 1])
+        elif sys.argv[i] == "--errores":
+            mezcla = parsear_mezcla(sys.argv[i + 1])
+        i += 2
+    tamano = generar_archivo(ruta, filas, semilla, mezcla)
+    print(
+        "Generado " + ruta + ": " + str(filas) + " filas, " + str(tamano) + " bytes"
+    )
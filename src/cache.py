@@ -0,0 +1,176 @@
+# cache.py - Cache de resultados por contenido del archivo de entrada
+# La clave combina el hash SHA-256 de los bytes de entrada con una huella de
+# las reglas (monedas, campos obligatorios, umbrales, codigo de ingesta,
+# normalizacion, validacion, procesamiento, reporte y exportacion) y del
+# formato de salida. Si la clave ya se proceso, se reutilizan la salida y el
+# reporte guardados en data/cache/<clave>/ sin recalcular
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+
+import calidad
+import ingesta
+import logger
+import normalizador
+import procesador
+import registro
+import validador
+
+MODULO = "CACHE"
+
+# Cambiar si cambia el formato de lo guardado en cache (invalida todo)
+VERSION_CACHE = 1
+
+# Bytes leidos por bloque al calcular el hash de un archivo
+BLOQUE_HASH = 1024 * 1024
+
+# Nombres de los archivos guardados en cada entrada de cache
+ARCHIVO_SALIDA_CACHE = "salida"
+ARCHIVO_REPORTE_CACHE = "reporte_calidad.json"
+ARCHIVO_DATOS_CACHE = "entrada.json"
+
+# main.py arma las lineas de la salida (CSV/JSONL); no se importa porque
+# main importa este modulo
+ARCHIVO_EXPORTACION = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "main.py"
+)
+
+
+def hash_archivo(ruta):
+    # SHA-256 (hex) del contenido de un archivo, leido por bloques
+    h = hashlib.sha256()
+    arch = open(ruta, "rb")
+    bloque = arch.read(BLOQUE_HASH)
+    while bloque != b"":
+        h.update(bloque)
+        bloque = arch.read(BLOQUE_HASH)
+    arch.close()
+    return h.hexdigest()
+
+
+def huella_reglas(formato_salida, comprimir_salida):
+    # Huella (hex) de todo lo que, ademas de la entrada, define el resultado:
+    # parametros de las reglas, codigo fuente de ingesta, normalizacion,
+    # validacion, armado de cada fila (procesador), reporte y exportacion, y
+    # formato del archivo de salida
+    datos = {
+        "version": VERSION_CACHE,
+        "monedas_soportadas": validador.MONEDAS_SOPORTADAS,
+        "campos_obligatorios": validador.CAMPOS_OBLIGATORIOS,
+        "monto_maximo": validador.MONTO_MAXIMO,
+        "umbral_riesgo_medio": normalizador.UMBRAL_RIESGO_MEDIO,
+        "umbral_riesgo_alto": normalizador.UMBRAL_RIESGO_ALTO,
+        "codigo_normalizador": hash_archivo(normalizador.__file__),
+        "codigo_validador": hash_archivo(validador.__file__),
+        "codigo_procesador": hash_archivo(procesador.__file__),
+        "codigo_registro": hash_archivo(registro.__file__),
+        "codigo_ingesta": hash_archivo(ingesta.__file__),
+        "codigo_calidad": hash_archivo(calidad.__file__),
+        "codigo_exportacion": hash_archivo(ARCHIVO_EXPORTACION),
+        "formato_salida": formato_salida,
+        "comprimir_salida": comprimir_salida,
+    }
+    texto = json.dumps(datos, sort_keys=True)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def calcular_clave(archivo_entrada, formato_salida, comprimir_salida):
+    # Clave de cache: hash de la entrada + huella de las reglas
+    texto = (
+        hash_archivo(archivo_entrada)
+        + ":"
+        + huella_reglas(formato_salida, comprimir_salida)
+    )
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def copiar_archivo(origen, destino):
+    # Copia origen en destino. No se usan hard links: editar la salida de una
+    # ejecucion (o volver a escribir en su ruta) modificaria tambien la
+    # entrada de cache. Si destino existe se borra antes, por si es un enlace
+    if os.path.exists(destino):
+        os.remove(destino)
+    shutil.copyfile(origen, destino)
+
+
+def buscar(carpeta_cache, clave):
+    # Retorna la carpeta de la entrada de cache de `clave`, o None si no existe
+    # (o esta incompleta)
+    carpeta = os.path.join(carpeta_cache, clave)
+    for nombre in [ARCHIVO_SALIDA_CACHE, ARCHIVO_REPORTE_CACHE, ARCHIVO_DATOS_CACHE]:
+        if not os.path.exists(os.path.join(carpeta, nombre)):
+            return None
+    return carpeta
+
+
+def guardar(carpeta_cache, clave, archivo_salida, reporte):
+    # Guarda la salida y el reporte de una ejecucion bajo `clave`
+    # Se arma en una carpeta temporal y se renombra al final: una entrada a
+    # medio escribir nunca se encuentra con buscar()
+    carpeta = os.path.join(carpeta_cache, clave)
+    if os.path.exists(carpeta):
+        return carpeta
+    temporal = carpeta + ".tmp" + str(os.getpid())
+    os.makedirs(temporal, exist_ok=True)
+    copiar_archivo(archivo_salida, os.path.join(temporal, ARCHIVO_SALIDA_CACHE))
+
+    reporte_cache = {}
+    for campo in reporte.keys():
+        # Las metricas son de la ejecucion original, no del resultado
+        if campo != "metricas":
+            reporte_cache[campo] = reporte[campo]
+    arch = open(os.path.join(temporal, ARCHIVO_REPORTE_CACHE), "w", encoding="utf-8")
+    arch.write(json.dumps(reporte_cache, indent=4, ensure_ascii=False))
+    arch.close()
+
+    datos = {
+        "clave": clave,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "carpeta_ejecucion": os.path.dirname(archivo_salida),
+    }
+    arch = open(os.path.join(temporal, ARCHIVO_DATOS_CACHE), "w", encoding="utf-8")
+    arch.write(json.dumps(datos, indent=4, ensure_ascii=False))
+    arch.close()
+
+    try:
+        os.rename(temporal, carpeta)
+    except OSError:
+        # Otro proceso guardo la misma clave primero
+        shutil.rmtree(temporal)
+    logger.info(MODULO, "Resultado guardado en cache: " + clave[0:12])
+    return carpeta
+
+
+def restaurar(carpeta, archivo_entrada, archivo_salida):
+    # Deja en la carpeta de ejecucion la salida y el reporte de la entrada de
+    # cache. El reporte se reescribe con el archivo de entrada y la fecha de
+    # esta ejecucion, mas una seccion "cache" con el origen del resultado
+    # Retorna el reporte
+    copiar_archivo(os.path.join(carpeta, ARCHIVO_SALIDA_CACHE), archivo_salida)
+
+    arch = open(os.path.join(carpeta, ARCHIVO_REPORTE_CACHE), "r", encoding="utf-8")
+    reporte = json.loads(arch.read())
+    arch.close()
+    arch = open(os.path.join(carpeta, ARCHIVO_DATOS_CACHE), "r", encoding="utf-8")
+    datos = json.loads(arch.read())
+    arch.close()
+
+    reporte["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    reporte["archivo_entrada"] = archivo_entrada
+    reporte["cache"] = {
+        "clave": datos["clave"],
+        "timestamp_original": datos["timestamp"],
+        "carpeta_ejecucion_original": datos["carpeta_ejecucion"],
+    }
+    logger.info(
+        MODULO,
+        "Resultado reutilizado desde cache: "
+        + datos["clave"][0:12]
+        + " (ejecucion original: "
+        + datos["timestamp"]
+        + ")",
+    )
+    return reporte
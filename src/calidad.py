@@ -5,75 +5,46 @@ import json
 import os
 from datetime import datetime
 import logger
+import validador
 
 MODULO = "CALIDAD"
 
+# Nombres descriptivos para las reglas conocidas
+NOMBRES_REGLAS = {
+    "R1": "R1_campos_obligatorios",
+    "R2": "R2_formato_fecha_moneda",
+    "R3": "R3_rango_monto",
+}
+
+# Cantidad de ejemplos de falla que se guardan por regla
+MAX_EJEMPLOS_POR_REGLA = 3
+
 
 def generar_reporte(registros, archivo_entrada, carpeta_salida):
     # Genera un reporte de calidad en formato JSON
-    # registros: lista de registros ya validados (con estado y _detalle_reglas)
+    # registros: lista (o iterador) de registros ya validados
+    # (con estado y _fallas, o _detalle_reglas en el formato anterior)
     # archivo_entrada: nombre del archivo procesado
     # carpeta_salida: donde guardar el reporte
-
-    total = len(registros)
-    total_validos = 0
-    total_invalidos = 0
-
-    # Nombres descriptivos para las reglas conocidas
-    nombres_reglas = {
-        "R1": "R1_campos_obligatorios",
-        "R2": "R2_formato_fecha_moneda",
-        "R3": "R3_rango_monto",
-    }
-
-    # Descubrir todas las reglas presentes en los registros
-    reglas_encontradas = []
+    # Una sola pasada: las reglas se descubren mientras se cuentan
+    acumulador = AcumuladorCalidad()
     for reg in registros:
-        if "_detalle_reglas" in reg.keys():
-            detalle = reg["_detalle_reglas"]
-            for clave in detalle.keys():
-                if clave not in reglas_encontradas:
-                    reglas_encontradas.append(clave)
-
-    # Ordenar las reglas para consistencia (bubble sort manual)
-    for x in range(len(reglas_encontradas) - 1):
-        for u in range(x + 1, len(reglas_encontradas)):
-            if reglas_encontradas[x] > reglas_encontradas[u]:
-                aux = reglas_encontradas[x]
-                reglas_encontradas[x] = reglas_encontradas[u]
-                reglas_encontradas[u] = aux
-
-    # Inicializar contadores por regla
-    fallas_por_regla = {}
-    ejemplos_por_regla = {}
-    for regla in reglas_encontradas:
-        fallas_por_regla[regla] = 0
-        ejemplos_por_regla[regla] = []
+        acumulador.agregar(reg)
+    return acumulador.reporte(archivo_entrada, carpeta_salida)
 
-    for reg in registros:
-        if reg["estado"] == "VALIDO":
-            total_validos += 1
-        else:
-            total_invalidos += 1
-
-        # Obtener detalle de reglas
-        if "_detalle_reglas" in reg.keys():
-            detalle = reg["_detalle_reglas"]
-        else:
-            detalle = {}
-        if "id_solicitud" in reg.keys():
-            id_sol = reg["id_solicitud"]
-        else:
-            id_sol = "DESCONOCIDO"
 
-        # Contar fallas por cada regla encontrada
-        for regla in reglas_encontradas:
-            if regla in detalle.keys() and len(detalle[regla]) > 0:
-                fallas_por_regla[regla] = fallas_por_regla[regla] + 1
-                for m in detalle[regla]:
-                    ej = id_sol + ": " + m
-                    if len(ejemplos_por_regla[regla]) < 3:
-                        ejemplos_por_regla[regla].append(ej)
+def construir_reporte(
+    total,
+    total_validos,
+    total_invalidos,
+    reglas_encontradas,
+    fallas_por_regla,
+    ejemplos_por_regla,
+    archivo_entrada,
+    carpeta_salida,
+):
+    # Arma el reporte a partir de los contadores ya calculados y lo guarda
+    # reglas_encontradas: lista ordenada de claves de reglas (R1, R2, ...)
 
     # Calcular porcentajes
     if total > 0:
@@ -95,8 +66,8 @@ def generar_reporte(registros, archivo_entrada, carpeta_salida):
         else:
             pct_regla_invalidos = 0.0
         # Usar nombre descriptivo si existe, sino usar la clave tal cual
-        if regla in nombres_reglas.keys():
-            nombre = nombres_reglas[regla]
+        if regla in NOMBRES_REGLAS.keys():
+            nombre = NOMBRES_REGLAS[regla]
         else:
             nombre = regla
         detalle_reglas[nombre] = {
@@ -119,13 +90,8 @@ def generar_reporte(registros, archivo_entrada, carpeta_salida):
         "detalle_reglas": detalle_reglas,
     }
 
-    # Guardar como JSON
-    ruta_reporte = os.path.join(carpeta_salida, "reporte_calidad.json")
-    arch = open(ruta_reporte, "w", encoding="utf-8")
-    arch.write(json.dumps(reporte, indent=4, ensure_ascii=False))
-    arch.close()
+    guardar_reporte(reporte, carpeta_salida)
 
-    logger.info(MODULO, "Reporte de calidad generado: " + ruta_reporte)
     logger.info(
         MODULO,
         "Cumplimiento global: "
@@ -138,3 +104,154 @@ def generar_reporte(registros, archivo_entrada, carpeta_salida):
     )
 
     return reporte
+
+
+def escribir_reporte(reporte, carpeta_salida):
+    # Escribe el reporte como JSON en carpeta_salida/reporte_calidad.json
+    ruta_reporte = os.path.join(carpeta_salida, "reporte_calidad.json")
+    arch = open(ruta_reporte, "w", encoding="utf-8")
+    arch.write(json.dumps(reporte, indent=4, ensure_ascii=False))
+    arch.close()
+    return ruta_reporte
+
+
+def guardar_reporte(reporte, carpeta_salida):
+    # Guarda el reporte y registra en el log donde quedo
+    ruta_reporte = escribir_reporte(reporte, carpeta_salida)
+    logger.info(MODULO, "Reporte de calidad generado: " + ruta_reporte)
+    return ruta_reporte
+
+
+def agregar_metricas(reporte, metricas_ejecucion, carpeta_salida):
+    # Agrega la seccion "metricas" (duracion por etapa) al reporte ya guardado
+    # y lo reescribe. Se llama al final porque la exportacion va despues
+    # del control de calidad
+    reporte["metricas"] = metricas_ejecucion
+    return escribir_reporte(reporte, carpeta_salida)
+
+
+class AcumuladorCalidad:
+    # Acumula las metricas de calidad registro a registro, sin guardar los
+    # registros. Permite calcular el reporte mientras los datos fluyen
+    # (streaming) y combinar acumuladores de distintos fragmentos con fusionar().
+    # Reglas (DEC-03): las de validador.REGLAS si los registros traen la mascara
+    # _fallas; con el formato anterior (_detalle_reglas, dict de listas de
+    # mensajes) se descubren dinamicamente
+
+    def __init__(self):
+        self.total = 0
+        self.total_validos = 0
+        self.total_invalidos = 0
+        self.fallas_por_regla = {}
+        self.ejemplos_por_regla = {}
+        self.reglas_registradas = False
+
+    def agregar(self, reg):
+        # Suma un registro ya validado (con estado y _fallas o _detalle_reglas)
+        self.total += 1
+        if reg["estado"] == "VALIDO":
+            self.total_validos += 1
+        else:
+            self.total_invalidos += 1
+
+        if "_fallas" in reg.keys():
+            self.agregar_fallas(reg, reg["_fallas"])
+            return
+        if "_detalle_reglas" not in reg.keys():
+            return
+        detalle = reg["_detalle_reglas"]
+        if "id_solicitud" in reg.keys():
+            id_sol = reg["id_solicitud"]
+        else:
+            id_sol = "DESCONOCIDO"
+
+        for regla in detalle.keys():
+            # Reglas nuevas se descubren a medida que aparecen
+            if regla not in self.fallas_por_regla.keys():
+                self.fallas_por_regla[regla] = 0
+                self.ejemplos_por_regla[regla] = []
+            if len(detalle[regla]) > 0:
+                self.fallas_por_regla[regla] += 1
+                ejemplos = self.ejemplos_por_regla[regla]
+                for m in detalle[regla]:
+                    if len(ejemplos) < MAX_EJEMPLOS_POR_REGLA:
+                        ejemplos.append(id_sol + ": " + m)
+
+    def agregar_fallas(self, reg, fallas):
+        # Cuenta las fallas de la mascara de bits `fallas` de un registro
+        # Los mensajes se arman solo mientras falten ejemplos de la regla
+        if not self.reglas_registradas:
+            for regla in validador.REGLAS:
+                if regla not in self.fallas_por_regla.keys():
+                    self.fallas_por_regla[regla] = 0
+                    self.ejemplos_por_regla[regla] = []
+            self.reglas_registradas = True
+        if fallas == 0:
+            return
+        for regla in validador.reglas_falladas(fallas):
+            self.fallas_por_regla[regla] += 1
+            ejemplos = self.ejemplos_por_regla[regla]
+            if len(ejemplos) >= MAX_EJEMPLOS_POR_REGLA:
+                continue
+            if "id_solicitud" in reg.keys():
+                id_sol = reg["id_solicitud"]
+            else:
+                id_sol = "DESCONOCIDO"
+            for m in validador.mensajes_regla(reg, regla):
+                if len(ejemplos) < MAX_EJEMPLOS_POR_REGLA:
+                    ejemplos.append(id_sol + ": " + m)
+
+    def exportar_estado(self):
+        # Diccionario serializable (JSON) con todo lo acumulado, para guardarlo
+        # en un checkpoint y seguir sumando despues con restaurar_estado()
+        return {
+            "total": self.total,
+            "total_validos": self.total_validos,
+            "total_invalidos": self.total_invalidos,
+            "fallas_por_regla": self.fallas_por_regla,
+            "ejemplos_por_regla": self.ejemplos_por_regla,
+            "reglas_registradas": self.reglas_registradas,
+        }
+
+    def restaurar_estado(self, estado):
+        # Reemplaza lo acumulado por un estado de exportar_estado()
+        self.total = estado["total"]
+        self.total_validos = estado["total_validos"]
+        self.total_invalidos = estado["total_invalidos"]
+        self.fallas_por_regla = dict(estado["fallas_por_regla"])
+        self.ejemplos_por_regla = {}
+        for regla in estado["ejemplos_por_regla"].keys():
+            self.ejemplos_por_regla[regla] = list(estado["ejemplos_por_regla"][regla])
+        self.reglas_registradas = estado["reglas_registradas"]
+
+    def fusionar(self, otro):
+        # Suma a este acumulador lo acumulado por otro (por ejemplo, de otro
+        # fragmento del archivo). otro debe corresponder a registros posteriores
+        # para que los ejemplos queden en el mismo orden que en una pasada serial
+        self.total += otro.total
+        self.total_validos += otro.total_validos
+        self.total_invalidos += otro.total_invalidos
+        for regla in otro.fallas_por_regla.keys():
+            if regla not in self.fallas_por_regla.keys():
+                self.fallas_por_regla[regla] = 0
+                self.ejemplos_por_regla[regla] = []
+            self.fallas_por_regla[regla] += otro.fallas_por_regla[regla]
+            ejemplos = self.ejemplos_por_regla[regla]
+            for ej in otro.ejemplos_por_regla[regla]:
+                if len(ejemplos) < MAX_EJEMPLOS_POR_REGLA:
+                    ejemplos.append(ej)
+        return self
+
+    def reporte(self, archivo_entrada, carpeta_salida):
+        # Genera y guarda el reporte JSON con lo acumulado hasta el momento
+        reglas = sorted(self.fallas_por_regla.keys())
+        return construir_reporte(
+            self.total,
+            self.total_validos,
+            self.total_invalidos,
+            reglas,
+            self.fallas_por_regla,
+            self.ejemplos_por_regla,
+            archivo_entrada,
+            carpeta_salida,
+        )
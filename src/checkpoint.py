@@ -0,0 +1,177 @@
+# checkpoint.py - Checkpoints para reanudar ejecuciones interrumpidas (--reanudar)
+# Guarda en la carpeta de ejecucion, cada FILAS_POR_CHECKPOINT registros, hasta
+# donde se leyo la entrada (byte), cuantos registros se procesaron, el
+# acumulador de calidad serializado y hasta donde se escribio la salida. La
+# salida se escribe con el sufijo .parcial y se renombra al terminar: si la
+# ejecucion se corta (error, SIGTERM, corte de luz) nunca queda una salida a
+# medio escribir con el nombre final, y --reanudar sigue desde el ultimo
+# checkpoint
+
+import gzip
+import json
+import os
+import signal
+import threading
+from datetime import datetime
+
+import indice
+
+MODULO = "CHECKPOINT"
+
+# Cambiar si cambia el contenido del checkpoint (invalida los existentes)
+VERSION_CHECKPOINT = 1
+
+# Nombre del checkpoint dentro de la carpeta de ejecucion
+ARCHIVO_CHECKPOINT = "checkpoint.json"
+
+# Sufijo de la salida mientras no termina la ejecucion
+SUFIJO_PARCIAL = ".parcial"
+
+# Registros entre checkpoints (se guardan al final de un bloque de lectura,
+# ver ingesta.BLOQUE_MMAP)
+FILAS_POR_CHECKPOINT = 100000
+
+# Senales que piden terminar: se guarda un checkpoint y se corta la ejecucion
+SENALES_INTERRUPCION = [signal.SIGTERM, signal.SIGINT]
+
+# Se marca desde el manejador de senales; el workflow lo consulta al terminar
+# cada bloque de lectura. Se limpia al empezar una ejecucion de nivel superior
+# (ver instalar_senales): dentro de un lote, la interrupcion detiene tambien
+# los archivos que faltan
+INTERRUPCION = threading.Event()
+
+
+class SalidaConfirmable:
+    # Archivo de salida binario que se confirma por tramos: confirmar() deja en
+    # disco todo lo escrito y retorna la posicion, donde se puede retomar
+    # (truncando lo que se haya escrito despues)
+    # Con comprimir=True cada tramo es un miembro gzip: un gzip puede tener
+    # varios miembros seguidos y se lee como uno solo
+
+    def __init__(self, ruta, posicion=None, comprimir=False, nivel=6):
+        # posicion None: archivo nuevo; si no, se retoma en esa posicion
+        if posicion == None:
+            self.arch = open(ruta, "wb")
+        else:
+            self.arch = open(ruta, "r+b")
+            self.arch.truncate(posicion)
+            self.arch.seek(posicion)
+        self.comprimir = comprimir
+        self.nivel = nivel
+        self.gz = None
+
+    def escribir(self, texto):
+        # Escribe texto (UTF-8)
+        datos = texto.encode("utf-8")
+        if not self.comprimir:
+            self.arch.write(datos)
+            return
+        if self.gz == None:
+            self.gz = gzip.GzipFile(
+                filename="", mode="wb", compresslevel=self.nivel, fileobj=self.arch
+            )
+        self.gz.write(datos)
+
+    def confirmar(self):
+        # Cierra el tramo, lo baja a disco y retorna la posicion en bytes
+        if self.gz != None:
+            self.gz.close()
+            self.gz = None
+        self.arch.flush()
+        os.fsync(self.arch.fileno())
+        return self.arch.tell()
+
+    def cerrar(self):
+        # Cierra el ultimo tramo y el archivo
+        if self.gz != None:
+            self.gz.close()
+            self.gz = None
+        self.arch.close()
+
+
+def ruta_checkpoint(carpeta):
+    # Ruta del checkpoint de una carpeta de ejecucion
+    return os.path.join(carpeta, ARCHIVO_CHECKPOINT)
+
+
+def guardar(carpeta, estado):
+    # Escribe el checkpoint (estado + version y fecha) en un temporal y lo
+    # renombra: si se corta a mitad, queda el checkpoint anterior
+    datos = {
+        "version": VERSION_CHECKPOINT,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    for clave in estado.keys():
+        datos[clave] = estado[clave]
+    ruta = ruta_checkpoint(carpeta)
+    temporal = ruta + ".tmp"
+    arch = open(temporal, "w", encoding="utf-8")
+    arch.write(json.dumps(datos, indent=4, ensure_ascii=False))
+    arch.flush()
+    os.fsync(arch.fileno())
+    arch.close()
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def cargar(carpeta):
+    # Lee el checkpoint de una carpeta de ejecucion
+    # Retorna (estado, None) o (None, motivo) si no hay checkpoint, no se puede
+    # leer o el archivo de entrada cambio desde que se guardo
+    ruta = ruta_checkpoint(carpeta)
+    if not os.path.exists(ruta):
+        return None, "No hay un checkpoint en " + carpeta
+    try:
+        arch = open(ruta, "r", encoding="utf-8")
+        try:
+            estado = json.loads(arch.read())
+        finally:
+            arch.close()
+    except (OSError, ValueError) as e:
+        return None, "No se pudo leer el checkpoint " + ruta + ": " + str(e)
+    if estado.get("version") != VERSION_CHECKPOINT:
+        return None, "El checkpoint " + ruta + " es de otra version"
+    if not os.path.exists(estado["archivo_entrada"]):
+        return None, "No existe el archivo de entrada " + estado["archivo_entrada"]
+    if indice.firma_archivo(estado["archivo_entrada"]) != estado["firma_entrada"]:
+        return None, "El archivo de entrada cambio desde el checkpoint"
+    if not os.path.exists(estado["archivo_salida"] + SUFIJO_PARCIAL):
+        return None, "No existe la salida parcial de la ejecucion"
+    return estado, None
+
+
+def borrar(carpeta):
+    # Borra el checkpoint (la ejecucion termino)
+    ruta = ruta_checkpoint(carpeta)
+    if os.path.exists(ruta):
+        os.remove(ruta)
+
+
+def pedir_interrupcion(numero_senal, marco):
+    # Manejador de SIGTERM/SIGINT: el workflow guarda un checkpoint al terminar
+    # el bloque que esta procesando y se detiene
+    INTERRUPCION.set()
+
+
+def instalar_senales():
+    # Instala pedir_interrupcion para SENALES_INTERRUPCION
+    # Retorna los manejadores anteriores (para restaurar_senales), o None si no
+    # se pueden instalar (solo el hilo principal puede manejar senales)
+    # Si los manejadores ya estan instalados (un archivo dentro de un lote), la
+    # interrupcion pendiente es la del lote y no se limpia
+    if signal.getsignal(SENALES_INTERRUPCION[0]) != pedir_interrupcion:
+        INTERRUPCION.clear()
+    if threading.current_thread() != threading.main_thread():
+        return None
+    anteriores = {}
+    for senal in SENALES_INTERRUPCION:
+        anteriores[senal] = signal.signal(senal, pedir_interrupcion)
+    return anteriores
+
+
+def restaurar_senales(anteriores):
+    # Vuelve a instalar los manejadores de instalar_senales()
+    if anteriores == None:
+        return
+    for senal in anteriores.keys():
+        signal.signal(senal, anteriores[senal])
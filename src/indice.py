@@ -0,0 +1,209 @@
+# indice.py - Indice persistente de offsets de lineas (archivo .idx)
+# Guarda junto al archivo de entrada la tabla de offsets de sus lineas
+# (ingesta.tabla_lineas) con el tamano y la fecha de modificacion del archivo.
+# En las ejecuciones siguientes la tabla se carga sin recorrer el archivo: se
+# va directo a una linea (reanudar o reprocesar un rango de lineas) y los
+# fragmentos de --workers se calculan sin leer el archivo
+# Las lineas se numeran desde 1 e incluyen el header y las lineas vacias, igual
+# que ingesta.iter_solicitudes(numerar=True)
+
+import array
+import bisect
+import json
+import os
+import sys
+
+import ingesta
+import logger
+
+MODULO = "INDICE"
+
+# Cambiar si cambia el formato del archivo .idx (invalida los existentes)
+VERSION_INDICE = 1
+
+# Extension del indice: solicitudes.csv -> solicitudes.csv.idx
+EXTENSION_INDICE = ".idx"
+
+# Formatos que se pueden indexar por lineas (JSON es un unico array)
+FORMATOS_INDEXABLES = ["csv", "txt", "jsonl"]
+
+
+def ruta_indice(archivo):
+    # Ruta del archivo de indice de `archivo`
+    return archivo + EXTENSION_INDICE
+
+
+def firma_archivo(archivo):
+    # Tamano y fecha de modificacion (ns) de un archivo: si cambian, el indice
+    # guardado ya no corresponde al contenido
+    estado = os.stat(archivo)
+    return {"tamano": estado.st_size, "mtime_ns": estado.st_mtime_ns}
+
+
+def es_indexable(archivo):
+    # True si el archivo es CSV, TXT o JSONL sin comprimir (se puede mapear)
+    return (
+        ingesta.detectar_formato(archivo) in FORMATOS_INDEXABLES
+        and ingesta.detectar_compresion(archivo) == None
+    )
+
+
+def guardar_indice(archivo, tabla, firma):
+    # Escribe el indice: una linea JSON con version, firma del archivo, orden de
+    # bytes y cantidad de lineas, seguida de la tabla en binario (8 bytes por
+    # offset). Se escribe en un temporal y se renombra: nunca queda un indice a
+    # medio escribir
+    # Retorna la ruta del indice, o None si no se pudo escribir
+    ruta = ruta_indice(archivo)
+    encabezado = {
+        "version": VERSION_INDICE,
+        "tamano": firma["tamano"],
+        "mtime_ns": firma["mtime_ns"],
+        "orden_bytes": sys.byteorder,
+        "lineas": len(tabla) - 1,
+    }
+    temporal = ruta + ".tmp" + str(os.getpid())
+    try:
+        arch = open(temporal, "wb")
+        try:
+            arch.write((json.dumps(encabezado) + "\n").encode("utf-8"))
+            arch.write(tabla.tobytes())
+        finally:
+            arch.close()
+        os.replace(temporal, ruta)
+    except OSError as e:
+        logger.warn(MODULO, "No se pudo guardar el indice de lineas: " + str(e))
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        return None
+    return ruta
+
+
+def cargar_indice(archivo):
+    # Lee el indice guardado de `archivo`
+    # Retorna la tabla (array "q", ver ingesta.tabla_lineas), o None si no hay
+    # indice, esta desactualizado (cambio el tamano o la fecha del archivo) o
+    # no se puede leer
+    ruta = ruta_indice(archivo)
+    if not os.path.exists(ruta):
+        return None
+    try:
+        arch = open(ruta, "rb")
+        try:
+            encabezado = json.loads(arch.readline().decode("utf-8"))
+            datos = arch.read()
+        finally:
+            arch.close()
+        firma = firma_archivo(archivo)
+        if (
+            encabezado["version"] != VERSION_INDICE
+            or encabezado["tamano"] != firma["tamano"]
+            or encabezado["mtime_ns"] != firma["mtime_ns"]
+        ):
+            logger.info(MODULO, "Indice de lineas desactualizado: " + ruta)
+            return None
+        tabla = array.array("q")
+        tabla.frombytes(datos)
+        if encabezado["orden_bytes"] != sys.byteorder:
+            tabla.byteswap()
+    except (OSError, ValueError, KeyError) as e:
+        logger.warn(MODULO, "Indice de lineas invalido, se ignora: " + str(e))
+        return None
+    if len(tabla) != encabezado["lineas"] + 1 or tabla[-1] != firma["tamano"]:
+        logger.warn(MODULO, "Indice de lineas invalido, se ignora: " + ruta)
+        return None
+    return tabla
+
+
+def obtener_indice(archivo, persistir=True):
+    # Retorna la tabla de offsets de lineas de `archivo`: la del indice guardado
+    # si esta vigente; si no, la arma recorriendo el archivo y (persistir=True)
+    # la guarda para las proximas ejecuciones
+    # Retorna None si el archivo no se puede indexar (JSON o comprimido)
+    if not es_indexable(archivo):
+        return None
+    tabla = cargar_indice(archivo)
+    if tabla != None:
+        logger.info(
+            MODULO,
+            "Indice de lineas cargado: "
+            + ruta_indice(archivo)
+            + " ("
+            + str(len(tabla) - 1)
+            + " lineas)",
+        )
+        return tabla
+
+    firma = firma_archivo(archivo)
+    tabla = ingesta.tabla_lineas(archivo)
+    mensaje = "Indice de lineas armado: " + str(len(tabla) - 1) + " lineas"
+    # Si el archivo cambio mientras se recorria, la tabla no se guarda
+    if persistir and firma_archivo(archivo) == firma:
+        if guardar_indice(archivo, tabla, firma) != None:
+            mensaje = mensaje + ", guardado en " + ruta_indice(archivo)
+    logger.info(MODULO, mensaje)
+    return tabla
+
+
+def offset_linea(tabla, numero):
+    # Byte donde empieza la linea `numero` (desde 1); despues de la ultima
+    # linea, el tamano del archivo
+    if numero < 1:
+        numero = 1
+    if numero > len(tabla):
+        numero = len(tabla)
+    return tabla[numero - 1]
+
+
+def linea_en_offset(tabla, offset):
+    # Numero de la primera linea que empieza en un byte >= offset (igual que
+    # ingesta.alinear_a_linea, pero sin leer el archivo)
+    return bisect.bisect_left(tabla, offset) + 1
+
+
+def alinear_a_linea(tabla, offset):
+    # Offset del primer inicio de linea >= offset, buscado en la tabla
+    return tabla[bisect.bisect_left(tabla, offset)]
+
+
+def iter_lineas(archivo, desde, hasta=None, tabla=None):
+    # Retorna un generador de los registros de las lineas desde..hasta
+    # (incluidas, desde 1, como iter_solicitudes(numerar=True)) de un CSV, TXT
+    # o JSONL plano, sin leer el resto del archivo. hasta=None: hasta el final
+    # tabla: tabla de offsets ya obtenida (si es None se usa obtener_indice)
+    # Retorna None si el archivo no se puede leer por lineas
+    formato = ingesta.verificar_archivo(archivo)
+    if formato == None:
+        return None
+    if not es_indexable(archivo):
+        logger.error(
+            MODULO,
+            "Solo se pueden leer rangos de lineas de archivos CSV, TXT o JSONL "
+            + "sin comprimir: "
+            + archivo,
+        )
+        return None
+    lectura = ingesta.leer_header(archivo, formato)
+    if lectura == None:
+        return contar_registros(archivo, [])
+    if tabla == None:
+        tabla = obtener_indice(archivo)
+    inicio = offset_linea(tabla, desde)
+    # El header nunca es un registro
+    if inicio < lectura[1]:
+        inicio = lectura[1]
+    fin = tabla[-1]
+    if hasta != None:
+        fin = offset_linea(tabla, hasta + 1)
+    registros = ingesta.iter_rango_bytes(archivo, formato, lectura[0], inicio, fin)
+    return contar_registros(archivo, registros)
+
+
+def contar_registros(archivo, registros):
+    # Generador: entrega los registros y al terminar loguea el fin de la
+    # ingesta, como los iteradores de ingesta
+    total = 0
+    for reg in registros:
+        total += 1
+        yield reg
+    ingesta.registrar_fin_ingesta(archivo, total)
@@ -1,14 +1,40 @@
-# ingesta.py - Ingesta de archivos CSV, JSON y TXT (RF-01)
-# Lee archivos CSV, JSON y TXT de solicitudes y retorna lista de diccionarios
-
-import os
+# ingesta.py - Ingesta de archivos CSV, JSON, JSONL y TXT (RF-01)
+# Lee archivos CSV, JSON, JSONL y TXT de solicitudes y retorna lista de diccionarios
+# (o un iterador de diccionarios con iter_solicitudes, para memoria acotada)
+
+import array
+import bz2
+import gzip
+import io
 import json
+import lzma
+import mmap
+import os
+import re
+import zipfile
+import zlib
 import logger
 
 MODULO = "INGESTA"
 
 # Formatos de archivo soportados
-FORMATOS_SOPORTADOS = ["csv", "json", "txt"]
+FORMATOS_SOPORTADOS = ["csv", "json", "txt", "jsonl"]
+
+# Extensiones alternativas de un formato soportado
+ALIAS_FORMATOS = {"ndjson": "jsonl"}
+
+# Compresiones soportadas como extension compuesta (solicitudes.csv.gz)
+# Se descomprimen mientras se leen, sin escribir el archivo plano a disco
+COMPRESIONES = ["gz", "bz2", "xz", "zip"]
+
+# Errores que pueden aparecer al descomprimir un archivo danado o truncado
+ERRORES_DESCOMPRESION = (
+    OSError,
+    EOFError,
+    zlib.error,
+    lzma.LZMAError,
+    zipfile.BadZipFile,
+)
 
 # Campos esperados en el CSV
 CAMPOS = [
@@ -23,225 +49,722 @@ CAMPOS = [
     "flag_digital",
 ]
 
+# Parser JSON incremental: caracteres leidos por bloque y espacios permitidos
+TAMANO_BLOQUE_JSON = 64 * 1024
+REGEX_ESPACIOS_JSON = re.compile("[ \t\n\r]*")
+SEPARADORES_JSON = ",] \t\n\r"
+
+# Lectura por bloques de lineas: bytes que se decodifican juntos al leer un
+# archivo plano con mmap, y caracteres por lectura de un archivo comprimido
+BLOQUE_MMAP = 1024 * 1024
+BLOQUE_TEXTO = 1024 * 1024
+
+# Fin de linea para la tabla de offsets (ver tabla_lineas)
+REGEX_FIN_LINEA = re.compile(b"\n")
+
 
 def separar_campos(linea):
     # Separa una linea CSV en campos
     # Si un campo tiene comillas, respeta las comas dentro de comillas
     # Maneja comillas escapadas CSV ("" se convierte en ")
+    # Camino rapido: sin comillas en la linea, alcanza con split(",")
+    if '"' not in linea:
+        return linea.split(",")
+
+    # Camino con comillas: se avanza por saltos con find() y se copian
+    # tramos completos (slices) en vez de concatenar caracter por caracter
     campos = []
-    campo_actual = ""
+    partes = []
     dentro_comillas = False
+    n = len(linea)
     i = 0
-    while i < len(linea):
-        c = linea[i]
-        if c == '"':
-            if dentro_comillas:
-                # Dentro de comillas: verificar si es comilla escapada ("")
-                if i + 1 < len(linea) and linea[i + 1] == '"':
-                    # Comilla escapada: agregar una comilla literal y saltar la siguiente
-                    campo_actual = campo_actual + '"'
-                    i += 2
-                    continue
-                else:
-                    # Cierre de comillas
-                    dentro_comillas = False
+    # Posiciones de la proxima coma/comilla (se recalculan solo si quedaron atras)
+    prox_coma = linea.find(",")
+    prox_comilla = linea.find('"')
+    while True:
+        if dentro_comillas:
+            if prox_comilla < i and prox_comilla != -1:
+                prox_comilla = linea.find('"', i)
+            if prox_comilla == -1:
+                # Comilla sin cerrar: el resto de la linea es parte del campo
+                partes.append(linea[i:])
+                break
+            partes.append(linea[i:prox_comilla])
+            if prox_comilla + 1 < n and linea[prox_comilla + 1] == '"':
+                # Comilla escapada: agregar una comilla literal y saltar la siguiente
+                partes.append('"')
+                i = prox_comilla + 2
+            else:
+                # Cierre de comillas
+                dentro_comillas = False
+                i = prox_comilla + 1
+            prox_comilla = linea.find('"', i)
+        else:
+            if prox_coma < i and prox_coma != -1:
+                prox_coma = linea.find(",", i)
+            if prox_comilla < i and prox_comilla != -1:
+                prox_comilla = linea.find('"', i)
+            if prox_coma == -1 and prox_comilla == -1:
+                # No quedan separadores: el resto es el ultimo campo
+                partes.append(linea[i:])
+                break
+            if prox_comilla == -1 or (prox_coma != -1 and prox_coma < prox_comilla):
+                # Fin del campo actual
+                partes.append(linea[i:prox_coma])
+                campos.append("".join(partes))
+                partes = []
+                i = prox_coma + 1
             else:
                 # Apertura de comillas
+                partes.append(linea[i:prox_comilla])
                 dentro_comillas = True
-        elif c == "," and not dentro_comillas:
-            campos.append(campo_actual)
-            campo_actual = ""
-        else:
-            campo_actual = campo_actual + c
-        i += 1
-    campos.append(campo_actual)
+                i = prox_comilla + 1
+    campos.append("".join(partes))
     return campos
 
 
-def detectar_formato(archivo):
-    # Detecta el formato del archivo segun su extension
-    # Retorna: "csv", "json", "txt" o None si no es soportado
-    partes = os.path.splitext(archivo)
-    if len(partes) < 2:
-        return None
-    ext = partes[1]
-    # Quitar el punto y convertir a minusculas
+def extension(archivo):
+    # Ultima extension del archivo, sin el punto y en minusculas ("" si no tiene)
+    ext = os.path.splitext(archivo)[1]
     if len(ext) > 0 and ext[0] == ".":
         ext = ext[1:]
-    ext = ext.lower()
+    return ext.lower()
+
+
+def detectar_compresion(archivo):
+    # Retorna la compresion del archivo ("gz", "bz2", "xz", "zip") o None
+    ext = extension(archivo)
+    if ext in COMPRESIONES:
+        return ext
+    return None
+
+
+def quitar_compresion(archivo):
+    # Quita la extension de compresion: "datos.csv.gz" -> "datos.csv"
+    if detectar_compresion(archivo) != None:
+        return os.path.splitext(archivo)[0]
+    return archivo
+
+
+def detectar_formato(archivo):
+    # Detecta el formato del archivo segun su extension
+    # Retorna: "csv", "json", "txt", "jsonl" (.jsonl o .ndjson) o None si no es
+    # soportado. En archivos comprimidos se usa la extension anterior a la de
+    # compresion (solicitudes.csv.gz -> "csv")
+    ext = extension(quitar_compresion(archivo))
+    if ext in ALIAS_FORMATOS.keys():
+        ext = ALIAS_FORMATOS[ext]
     if ext in FORMATOS_SOPORTADOS:
         return ext
     else:
         return None
 
 
-def leer_json(archivo):
-    # Lee un archivo JSON y retorna una lista de diccionarios
-    # El JSON debe contener un array de objetos
-    registros = []
-    arch = open(archivo, "r", encoding="utf-8")
-    contenido = arch.read()
-    arch.close()
+def abrir_texto(archivo):
+    # Abre un archivo de entrada en modo texto UTF-8, descomprimiendolo
+    # mientras se lee si tiene extension de compresion
+    # Un .zip debe contener un solo archivo
+    compresion = detectar_compresion(archivo)
+    if compresion == "gz":
+        return gzip.open(archivo, "rt", encoding="utf-8")
+    if compresion == "bz2":
+        return bz2.open(archivo, "rt", encoding="utf-8")
+    if compresion == "xz":
+        return lzma.open(archivo, "rt", encoding="utf-8")
+    if compresion == "zip":
+        zf = zipfile.ZipFile(archivo)
+        nombres = []
+        for info in zf.infolist():
+            if not info.is_dir():
+                nombres.append(info.filename)
+        if len(nombres) != 1:
+            zf.close()
+            raise zipfile.BadZipFile("El zip debe contener un solo archivo: " + archivo)
+        # El miembro abierto mantiene el archivo aunque se cierre el ZipFile
+        miembro = zf.open(nombres[0])
+        zf.close()
+        return io.TextIOWrapper(miembro, encoding="utf-8")
+    return open(archivo, "r", encoding="utf-8")
+
+
+def separar_lineas(texto):
+    # Separa un bloque de texto en lineas, sin el fin de linea
+    # Igual que la lectura en modo texto, "\r\n" y "\r" solo tambien cortan linea
+    if "\r" in texto:
+        texto = texto.replace("\r\n", "\n").replace("\r", "\n")
+    return texto.split("\n")
+
+
+def abrir_mmap(archivo):
+    # Mapea un archivo plano en memoria, solo lectura
+    # Retorna (arch, mm); mm es None si el archivo esta vacio (mmap no admite
+    # largo 0)
+    arch = open(archivo, "rb")
+    if os.fstat(arch.fileno()).st_size == 0:
+        return arch, None
+    return arch, mmap.mmap(arch.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def iter_bloques_mmap(archivo, inicio=0, fin=None, con_offset=False):
+    # Generador: listas de lineas (decodificadas, sin fin de linea) que empiezan
+    # en [inicio, fin) de un archivo plano, leido con mmap
+    # Cada bloque de ~BLOQUE_MMAP bytes termina en un "\n": se decodifica de una
+    # vez desde el mapa (sin copiar los bytes) y se separa en lineas, en lugar
+    # de decodificar y recortar linea por linea
+    # inicio debe ser un inicio de linea (ver alinear_a_linea); fin=None es el
+    # final del archivo
+    # con_offset: entrega (lineas, byte donde termina el bloque); el siguiente
+    # bloque empieza en ese byte (sirve para retomar la lectura)
+    arch, mm = abrir_mmap(archivo)
+    if mm == None:
+        arch.close()
+        return
+    vista = memoryview(mm)
+    try:
+        if fin == None or fin > len(mm):
+            fin = len(mm)
+        pos = inicio
+        while pos < fin:
+            limite = pos + BLOQUE_MMAP
+            if limite >= fin:
+                limite = fin
+            else:
+                corte = mm.rfind(b"\n", pos, limite)
+                if corte < 0:
+                    # Linea mas larga que un bloque: se lee hasta su fin
+                    corte = mm.find(b"\n", limite, fin)
+                if corte < 0:
+                    limite = fin
+                else:
+                    limite = corte + 1
+            lineas = separar_lineas(str(vista[pos:limite], "utf-8"))
+            if lineas[-1] == "":
+                lineas.pop()
+            pos = limite
+            if con_offset:
+                yield lineas, limite
+            else:
+                yield lineas
+    finally:
+        vista.release()
+        mm.close()
+        arch.close()
+
 
-    # Intentar parsear el JSON
-    datos = None
+def iter_bloques_texto(archivo):
+    # Generador: listas de lineas de un archivo comprimido (no se puede
+    # mapear), leyendo de a BLOQUE_TEXTO caracteres ya descomprimidos
+    # La ultima linea incompleta de cada bloque se completa con el siguiente
+    arch = abrir_texto(archivo)
     try:
-        datos = json.loads(contenido)
-    except:
-        logger.error(MODULO, "Error al parsear archivo JSON: " + archivo)
-        return None
+        resto = ""
+        while True:
+            bloque = arch.read(BLOQUE_TEXTO)
+            if bloque == "":
+                break
+            lineas = (resto + bloque).split("\n")
+            resto = lineas.pop()
+            yield lineas
+        if resto != "":
+            yield [resto]
+    finally:
+        arch.close()
 
-    # Validar que datos sea una lista
-    if type(datos) != list:
-        logger.error(MODULO, "El archivo JSON debe contener un array: " + archivo)
-        return None
 
-    # Procesar cada elemento
-    for elem in datos:
-        if type(elem) != dict:
-            logger.warn(MODULO, "Elemento no es un diccionario, se omite")
-            continue
-        # Convertir valores no-string a string para compatibilidad
-        # con normalizador (que hace .strip() sobre cada valor)
-        d = {}
-        for campo in elem.keys():
-            valor = elem[campo]
-            if valor == None:
-                d[campo] = None
-            elif type(valor) != str:
-                d[campo] = str(valor)
-            else:
-                d[campo] = valor
-        registros.append(d)
+def iter_bloques_lineas(archivo):
+    # Generador de listas de lineas de un archivo CSV, TXT o JSONL: con mmap si
+    # es plano, en modo texto si esta comprimido
+    if detectar_compresion(archivo) == None:
+        return iter_bloques_mmap(archivo)
+    return iter_bloques_texto(archivo)
+
+
+def tabla_lineas(archivo):
+    # Tabla de offsets de las lineas de un archivo plano: array de enteros con
+    # el byte donde empieza cada linea y, al final, el tamano del archivo. La
+    # linea i (desde 0, incluido el header) ocupa [tabla[i], tabla[i + 1])
+    # Las lineas se cortan en "\n", como en alinear_a_linea; con la tabla se
+    # leen rangos de lineas (leer_lineas) o se fragmenta sin recorrer el archivo
+    arch, mm = abrir_mmap(archivo)
+    tabla = array.array("q", [0])
+    if mm != None:
+        try:
+            for fin_linea in REGEX_FIN_LINEA.finditer(mm):
+                tabla.append(fin_linea.end())
+            if tabla[-1] != len(mm):
+                tabla.append(len(mm))
+        finally:
+            mm.close()
+    arch.close()
+    return tabla
 
-    if len(registros) == 0:
-        logger.warn(MODULO, "Archivo vacio (solo header o sin datos): " + archivo)
-        return registros
 
+def leer_lineas(archivo, tabla, desde, hasta):
+    # Retorna las lineas desde..hasta-1 (indices de tabla_lineas) de un archivo
+    # plano, decodificadas y sin fin de linea, sin leer el resto del archivo
+    if hasta > len(tabla) - 1:
+        hasta = len(tabla) - 1
+    lineas = []
+    if desde >= hasta:
+        return lineas
+    for bloque in iter_bloques_mmap(archivo, tabla[desde], tabla[hasta]):
+        lineas.extend(bloque)
+    return lineas
+
+
+def registrar_fin_ingesta(archivo, total):
+    # Loguea el cierre de la ingesta de un archivo (comun a todos los formatos)
+    if total == 0:
+        logger.warn(MODULO, "Archivo vacio (solo header o sin datos): " + archivo)
+        return
     logger.info(
         MODULO,
-        "Ingesta completada - "
-        + str(len(registros))
-        + " registros leidos de "
-        + archivo,
+        "Ingesta completada - " + str(total) + " registros leidos de " + archivo,
     )
-    return registros
 
 
-def leer_txt(archivo):
-    # Lee un archivo TXT delimitado por pipe (|) y retorna una lista de diccionarios
-    # Primera linea es el header, lineas siguientes son datos
-    registros = []
-    arch = open(archivo, "r", encoding="utf-8")
-    primera = True
-    header = []
+def convertir_elemento_json(elem):
+    # Convierte valores no-string a string para compatibilidad
+    # con normalizador (que hace .strip() sobre cada valor)
+    d = {}
+    for campo in elem.keys():
+        valor = elem[campo]
+        if valor == None:
+            d[campo] = None
+        elif type(valor) != str:
+            d[campo] = str(valor)
+        else:
+            d[campo] = valor
+    return d
+
+
+def leer_mas(arch, buffer, pos, tamano):
+    # Descarta del buffer lo ya procesado y le agrega `tamano` caracteres mas
+    # Retorna (buffer, pos, fin_archivo)
+    bloque = arch.read(tamano)
+    if pos > 0:
+        buffer = buffer[pos:]
+        pos = 0
+    if bloque == "":
+        return buffer, pos, True
+    return buffer + bloque, pos, False
+
+
+def saltar_espacios(arch, buffer, pos, fin_archivo):
+    # Avanza pos hasta el proximo caracter que no sea espacio, leyendo mas
+    # bloques si hace falta. Retorna (buffer, pos, fin_archivo); si se llega
+    # al final del archivo, pos queda en len(buffer)
+    while True:
+        pos = REGEX_ESPACIOS_JSON.match(buffer, pos).end()
+        if pos < len(buffer) or fin_archivo:
+            return buffer, pos, fin_archivo
+        buffer, pos, fin_archivo = leer_mas(arch, buffer, pos, TAMANO_BLOQUE_JSON)
+
+
+def error_json(archivo, total):
+    # Loguea un error de parseo a mitad del archivo y retorna la excepcion
+    # que corta la lectura (leer_solicitudes la convierte en None)
+    logger.error(
+        MODULO,
+        "Error al parsear archivo JSON: "
+        + archivo
+        + " (despues de "
+        + str(total)
+        + " registros)",
+    )
+    return ValueError("JSON invalido en " + archivo)
 
-    for linea in arch:
-        if linea[-1] == "\n":
-            linea = linea[:-1]
 
-        # Saltar lineas vacias
-        if linea == "":
-            continue
+def iterar_array_json(arch, buffer, pos, archivo):
+    # Generador: decodifica de a un elemento el array JSON que empieza en
+    # buffer[pos] (despues del "[") con JSONDecoder.raw_decode sobre un buffer
+    # deslizante. En memoria solo queda el elemento actual y un bloque de texto
+    # Lanza ValueError si el JSON es invalido a mitad del archivo
+    decodificador = json.JSONDecoder()
+    fin_archivo = False
+    total = 0
+    try:
+        buffer, pos, fin_archivo = saltar_espacios(arch, buffer, pos, fin_archivo)
+        vacio = pos < len(buffer) and buffer[pos] == "]"
+        if vacio:
+            pos += 1
+        espacios = REGEX_ESPACIOS_JSON.match
+        while not vacio:
+            # Saltar espacios en el buffer; solo se llama a saltar_espacios
+            # (que lee mas) cuando se llego al final del buffer
+            pos = espacios(buffer, pos).end()
+            if pos >= len(buffer):
+                buffer, pos, fin_archivo = saltar_espacios(
+                    arch, buffer, pos, fin_archivo
+                )
+            if pos >= len(buffer) or buffer[pos] == "]":
+                raise error_json(archivo, total)
+
+            # Decodificar el elemento; si queda cortado al final del buffer, leer
+            # mas y reintentar (duplicando el bloque para elementos muy grandes)
+            tamano = TAMANO_BLOQUE_JSON
+            while True:
+                try:
+                    elem, fin = decodificador.raw_decode(buffer, pos)
+                    # Un numero cortado por el bloque ("97" de "972.5") se
+                    # decodifica sin error: solo se acepta el elemento si
+                    # despues viene un separador
+                    if fin_archivo:
+                        break
+                    if fin < len(buffer) and buffer[fin] in SEPARADORES_JSON:
+                        break
+                except json.JSONDecodeError:
+                    if fin_archivo:
+                        raise error_json(archivo, total)
+                buffer, pos, fin_archivo = leer_mas(arch, buffer, pos, tamano)
+                tamano = tamano * 2
+            pos = fin
+
+            if type(elem) != dict:
+                logger.warn(MODULO, "Elemento no es un diccionario, se omite")
+            else:
+                total += 1
+                yield convertir_elemento_json(elem)
+
+            # Despues de un elemento viene "," o el "]" final
+            pos = espacios(buffer, pos).end()
+            if pos >= len(buffer):
+                buffer, pos, fin_archivo = saltar_espacios(
+                    arch, buffer, pos, fin_archivo
+                )
+            if pos >= len(buffer):
+                raise error_json(archivo, total)
+            if buffer[pos] == "]":
+                pos += 1
+                break
+            if buffer[pos] != ",":
+                raise error_json(archivo, total)
+            pos += 1
+
+        # Despues del array solo pueden quedar espacios
+        buffer, pos, fin_archivo = saltar_espacios(arch, buffer, pos, fin_archivo)
+        if pos < len(buffer):
+            raise error_json(archivo, total)
+    finally:
+        arch.close()
+    registrar_fin_ingesta(archivo, total)
 
-        # Leer el header (primera linea)
-        if primera:
-            ls = linea.split("|")
-            i = 0
-            while i < len(ls):
-                header.append(ls[i].strip())
-                i += 1
-            primera = False
-            continue
 
-        # Leer datos
+def iter_json(archivo):
+    # Retorna un iterador de diccionarios para un archivo JSON
+    # El JSON debe contener un array de objetos, que se decodifican de a uno
+    # (memoria acotada aunque el archivo pese varios GB)
+    # Retorna None si el archivo no empieza con un array; si el error aparece
+    # a mitad del archivo, el iterador lanza ValueError
+    arch = abrir_texto(archivo)
+    buffer, pos, fin_archivo = saltar_espacios(arch, "", 0, False)
+
+    if pos < len(buffer) and buffer[pos] == "[":
+        return iterar_array_json(arch, buffer, pos + 1, archivo)
+
+    # No es un array: distinguir JSON valido de otro tipo de JSON invalido
+    # (caso de error, se puede leer el archivo completo)
+    contenido = buffer + arch.read()
+    arch.close()
+    try:
+        json.loads(contenido)
+    except ValueError:
+        logger.error(MODULO, "Error al parsear archivo JSON: " + archivo)
+        return None
+    logger.error(MODULO, "El archivo JSON debe contener un array: " + archivo)
+    return None
+
+
+def separar_header(linea, formato):
+    # Separa la linea de header de un archivo CSV o TXT en nombres de campo
+    if formato == "csv":
+        return separar_campos(linea)
+    header = []
+    for nombre in linea.split("|"):
+        header.append(nombre.strip())
+    return header
+
+
+def armar_registro(header, linea, formato):
+    # Arma el diccionario de una linea de datos CSV o TXT segun el header
+    # En TXT (delimitado por pipe) cada valor se recorta con strip()
+    reg = {}
+    if formato == "csv":
+        ls = separar_campos(linea)
+        i = 0
+        while i < len(header) and i < len(ls):
+            reg[header[i]] = ls[i]
+            i += 1
+    else:
         ls = linea.split("|")
-        reg = {}
         i = 0
         while i < len(header) and i < len(ls):
             reg[header[i]] = ls[i].strip()
             i += 1
-        registros.append(reg)
+    return reg
 
-    arch.close()
 
-    # Verificar si el archivo estaba vacio (solo header)
-    if len(registros) == 0:
-        logger.warn(MODULO, "Archivo vacio (solo header o sin datos): " + archivo)
-        return registros
+def iter_delimitado(archivo, formato, numerar=False):
+    # Generador: lee un archivo CSV o TXT registro por registro
+    # Primera linea no vacia es el header, lineas siguientes son datos
+    # numerar: entrega (numero de linea en el archivo, registro), contando
+    # desde 1 e incluyendo el header y las lineas vacias
+    # Las lineas llegan por bloques (iter_bloques_lineas: mmap si es plano)
+    header = None
+    total = 0
+    numero = 0
 
-    logger.info(
-        MODULO,
-        "Ingesta completada - "
-        + str(len(registros))
-        + " registros leidos de "
-        + archivo,
-    )
-    return registros
+    for lineas in iter_bloques_lineas(archivo):
+        for linea in lineas:
+            numero += 1
 
+            # Saltar lineas vacias
+            if linea == "":
+                continue
 
-def leer_solicitudes(archivo):
-    # Lee un archivo CSV, JSON o TXT y retorna una lista de diccionarios
+            # Leer el header (primera linea)
+            if header == None:
+                header = separar_header(linea, formato)
+                continue
+
+            # Leer datos
+            total += 1
+            if numerar:
+                yield numero, armar_registro(header, linea, formato)
+            else:
+                yield armar_registro(header, linea, formato)
+
+    registrar_fin_ingesta(archivo, total)
+
+
+def iter_txt(archivo, numerar=False):
+    # Generador: lee un archivo TXT delimitado por pipe (|) registro por registro
+    return iter_delimitado(archivo, "txt", numerar)
+
+
+def iter_csv(archivo, numerar=False):
+    # Generador: lee un archivo CSV registro por registro
     # Cada diccionario tiene las claves del header
+    return iter_delimitado(archivo, "csv", numerar)
+
 
-    # Verificar que el archivo existe
+def decodificar_linea_jsonl(linea, archivo):
+    # Decodifica una linea de un archivo JSONL (un objeto JSON por linea)
+    # Retorna el registro, o None si la linea no es un objeto JSON valido
+    # (cada linea es independiente: se omite con WARN y se sigue leyendo)
+    try:
+        elem = json.loads(linea)
+    except ValueError:
+        logger.warn_agregado(
+            MODULO,
+            "linea JSONL invalida",
+            "Linea JSON invalida en " + archivo + ", se omite",
+        )
+        return None
+    if type(elem) != dict:
+        logger.warn(MODULO, "Elemento no es un diccionario, se omite")
+        return None
+    return convertir_elemento_json(elem)
+
+
+def iter_jsonl(archivo, numerar=False):
+    # Generador: lee un archivo JSONL (.jsonl o .ndjson) de a una linea
+    # Las lineas vacias se ignoran
+    # numerar: entrega (numero de linea en el archivo, registro)
+    total = 0
+    numero = 0
+    for lineas in iter_bloques_lineas(archivo):
+        for linea in lineas:
+            numero += 1
+            if linea.strip() == "":
+                continue
+            reg = decodificar_linea_jsonl(linea, archivo)
+            if reg == None:
+                continue
+            total += 1
+            if numerar:
+                yield numero, reg
+            else:
+                yield reg
+
+    registrar_fin_ingesta(archivo, total)
+
+
+def decodificar_linea(linea_bytes):
+    # Decodifica una linea leida en modo binario y quita el fin de linea
+    # (\n o \r\n, igual que la lectura en modo texto)
+    linea = linea_bytes.decode("utf-8")
+    if linea[-1:] == "\n":
+        linea = linea[:-1]
+        if linea[-1:] == "\r":
+            linea = linea[:-1]
+    return linea
+
+
+def leer_header(archivo, formato):
+    # Lee el header de un archivo CSV o TXT
+    # Retorna (header, offset) con offset = byte donde empiezan los datos,
+    # o None si el archivo no tiene ninguna linea
+    # JSONL no tiene header: retorna (None, 0)
+    if formato == "jsonl":
+        return None, 0
+    arch = open(archivo, "rb")
+    header = None
+    while header == None:
+        linea_bytes = arch.readline()
+        if linea_bytes == b"":
+            break
+        linea = decodificar_linea(linea_bytes)
+        if linea != "":
+            header = separar_header(linea, formato)
+    offset = arch.tell()
+    arch.close()
+    if header == None:
+        return None
+    return header, offset
+
+
+def alinear_a_linea(arch, offset):
+    # Retorna el offset del primer inicio de linea >= offset
+    # (si offset ya es inicio de linea, lo retorna tal cual)
+    if offset == 0:
+        return 0
+    arch.seek(offset - 1)
+    arch.readline()
+    return arch.tell()
+
+
+def iter_rango_bytes(archivo, formato, header, inicio, fin):
+    # Generador: registros de las lineas CSV, TXT o JSONL que empiezan en
+    # [inicio, fin). inicio debe ser un inicio de linea (ver alinear_a_linea)
+    for lineas in iter_bloques_mmap(archivo, inicio, fin):
+        for reg in registros_de_lineas(lineas, formato, header, archivo):
+            yield reg
+
+
+def registros_de_lineas(lineas, formato, header, archivo):
+    # Arma los registros de una lista de lineas de datos CSV, TXT o JSONL (sin
+    # el header), saltando las vacias y las lineas JSONL invalidas
+    registros = []
+    for linea in lineas:
+        if formato == "jsonl":
+            if linea.strip() == "":
+                continue
+            reg = decodificar_linea_jsonl(linea, archivo)
+            if reg != None:
+                registros.append(reg)
+            continue
+        if linea == "":
+            continue
+        registros.append(armar_registro(header, linea, formato))
+    return registros
+
+
+def verificar_archivo(archivo):
+    # Verifica que el archivo exista y tenga un formato soportado
+    # Retorna el formato, o None (con ERROR en el log) si no se puede leer
     if not os.path.exists(archivo):
         logger.error(MODULO, "Archivo no encontrado: " + archivo)
         return None
 
-    # Detectar formato del archivo
     formato = detectar_formato(archivo)
     if formato == None:
         logger.error(MODULO, "Formato de archivo no soportado: " + archivo)
         return None
+    return formato
 
-    # Procesar segun el formato
-    if formato == "csv":
-        # Logica original para CSV
-        registros = []
-        arch = open(archivo, "r", encoding="utf-8")
-        primera = True
-        header = []
 
-        for linea in arch:
-            if linea[-1] == "\n":
-                linea = linea[:-1]
+def iter_descomprimiendo(iterador, archivo):
+    # Generador: entrega los registros de iterador y convierte un error de
+    # descompresion (archivo danado o truncado) en ValueError, igual que un
+    # JSON invalido a mitad del archivo
+    try:
+        for reg in iterador:
+            yield reg
+    except ERRORES_DESCOMPRESION as e:
+        logger.error(
+            MODULO, "Error al descomprimir archivo: " + archivo + " (" + str(e) + ")"
+        )
+        raise ValueError("Archivo comprimido invalido: " + archivo)
 
-            # Saltar lineas vacias
-            if linea == "":
-                continue
 
-            # Leer el header (primera linea)
-            if primera:
-                header = separar_campos(linea)
-                primera = False
-                continue
+def numerar_elementos(iterador):
+    # Generador: entrega (posicion, registro) de los elementos de un array
+    # JSON, contando desde 1 (un elemento puede ocupar varias lineas)
+    numero = 0
+    for reg in iterador:
+        numero += 1
+        yield numero, reg
 
-            # Leer datos
-            ls = separar_campos(linea)
-            reg = {}
-            i = 0
-            while i < len(header) and i < len(ls):
-                reg[header[i]] = ls[i]
-                i += 1
-            registros.append(reg)
 
-        arch.close()
+def iter_solicitudes(archivo, numerar=False):
+    # Retorna un iterador que entrega los registros del archivo de a uno,
+    # sin cargar el archivo completo en memoria (CSV, JSON, JSONL o TXT,
+    # planos o comprimidos con gzip, bz2, xz o zip)
+    # numerar: entrega tuplas (numero, registro); numero es la linea del
+    # archivo (CSV, TXT, JSONL) o la posicion del elemento en el array (JSON)
+    # Retorna None si el archivo no existe o no se puede leer
 
-        # Verificar si el archivo estaba vacio (solo header)
-        if len(registros) == 0:
-            logger.warn(MODULO, "Archivo vacio (solo header o sin datos): " + archivo)
-            return registros
+    formato = verificar_archivo(archivo)
+    if formato == None:
+        return None
 
-        logger.info(
-            MODULO,
-            "Ingesta completada - "
-            + str(len(registros))
-            + " registros leidos de "
-            + archivo,
+    # Procesar segun el formato
+    compresion = detectar_compresion(archivo)
+    iterador = None
+    try:
+        if formato == "csv":
+            iterador = iter_csv(archivo, numerar)
+        elif formato == "json":
+            # iter_json lee el primer bloque al llamarlo (no es un generador)
+            iterador = iter_json(archivo)
+            if iterador != None and numerar:
+                iterador = numerar_elementos(iterador)
+        elif formato == "txt":
+            iterador = iter_txt(archivo, numerar)
+        elif formato == "jsonl":
+            iterador = iter_jsonl(archivo, numerar)
+    except ERRORES_DESCOMPRESION as e:
+        if compresion == None:
+            raise
+        logger.error(
+            MODULO, "Error al descomprimir archivo: " + archivo + " (" + str(e) + ")"
         )
-        return registros
-    elif formato == "json":
-        return leer_json(archivo)
-    elif formato == "txt":
-        return leer_txt(archivo)
+        return None
+
+    if iterador == None or compresion == None:
+        return iterador
+    return iter_descomprimiendo(iterador, archivo)
+
+
+def consumir_iterador(iterador):
+    # Materializa un iterador de registros en una lista
+    # Retorna None si el iterador es None o falla a mitad de la lectura
+    # (JSON invalido; el error ya quedo en el log)
+    if iterador == None:
+        return None
+    registros = []
+    try:
+        for reg in iterador:
+            registros.append(reg)
+    except ValueError:
+        return None
+    return registros
+
+
+def leer_json(archivo):
+    # Lee un archivo JSON y retorna una lista de diccionarios
+    # El JSON debe contener un array de objetos
+    return consumir_iterador(iter_json(archivo))
+
+
+def leer_txt(archivo):
+    # Lee un archivo TXT delimitado por pipe (|) y retorna una lista de diccionarios
+    return consumir_iterador(iter_txt(archivo))
+
+
+def leer_solicitudes(archivo):
+    # Lee un archivo CSV, JSON, JSONL o TXT y retorna una lista de diccionarios
+    # Cada diccionario tiene las claves del header
+    # Envoltorio de iter_solicitudes para quien necesite la lista completa
+    return consumir_iterador(iter_solicitudes(archivo))
@@ -0,0 +1,268 @@
+# ingesta_multiple.py - Ingesta de varios archivos en paralelo (RF-01)
+# Lee y parsea una lista de archivos CSV, JSON, JSONL o TXT (planos o
+# comprimidos) en un pool de procesos y entrega un solo flujo de registros:
+# archivo por archivo en el orden de la lista, y los de cada archivo en su
+# orden. Cada registro lleva el archivo y la linea de donde salio, asi las
+# etapas siguientes ven un unico conjunto de datos
+
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import ingesta
+import logger
+import paralelo
+
+MODULO = "INGESTA_MULTIPLE"
+
+# Campos que se agregan a cada registro: ruta del archivo y numero de linea
+# (posicion del elemento en archivos JSON), como texto igual que el resto
+CAMPO_ARCHIVO = "_archivo_origen"
+CAMPO_LINEA = "_linea_origen"
+
+# Archivos leidos a la vez por worker: los que no son el archivo en curso
+# esperan con su cola de partes llena
+ARCHIVOS_POR_WORKER = 2
+
+# Registros por parte enviada desde un worker: un archivo grande viaja en
+# partes y no como una sola lista
+REGISTROS_POR_PARTE = 1000
+
+# Partes que un worker puede adelantar por archivo antes de esperar a que el
+# proceso principal las consuma (acota la memoria de los archivos en lectura)
+PARTES_POR_COLA = 4
+
+# Segundos de espera en las colas de partes antes de revisar si el worker
+# termino con error o si hay que dejar de leer
+ESPERA_COLA_S = 0.5
+
+# Colas de partes y evento de cancelacion del proceso worker (iniciar_worker)
+COLAS_WORKER = None
+DETENER_WORKER = None
+
+
+def iter_partes(archivo, estado, registros_por_parte=None):
+    # Generador: registros del archivo con su origen, en listas de hasta
+    # registros_por_parte registros (default REGISTROS_POR_PARTE)
+    # estado: diccionario donde se deja "status" ("ok", "empty" o "error":
+    # archivo inexistente, no soportado o invalido a mitad de la lectura) y
+    # "registros" (cantidad entregada). Ante un error se descarta la parte en
+    # armado: las partes ya entregadas no se pueden retirar
+    if registros_por_parte == None:
+        registros_por_parte = REGISTROS_POR_PARTE
+    estado["status"] = "error"
+    estado["registros"] = 0
+    iterador = ingesta.iter_solicitudes(archivo, numerar=True)
+    if iterador == None:
+        return
+    parte = []
+    try:
+        for numero, reg in iterador:
+            reg[CAMPO_ARCHIVO] = archivo
+            reg[CAMPO_LINEA] = str(numero)
+            parte.append(reg)
+            if len(parte) == registros_por_parte:
+                estado["registros"] += len(parte)
+                yield parte
+                parte = []
+    except ValueError:
+        return
+    if len(parte) > 0:
+        estado["registros"] += len(parte)
+        yield parte
+    if estado["registros"] == 0:
+        estado["status"] = "empty"
+    else:
+        estado["status"] = "ok"
+
+
+def iniciar_worker(colas, detener):
+    # Inicializador de cada proceso worker: recibe las colas de partes (una
+    # por archivo de la ventana) y el evento que pide dejar de leer
+    global COLAS_WORKER, DETENER_WORKER
+    COLAS_WORKER = colas
+    DETENER_WORKER = detener
+    # Si se deja de leer, las partes sin consumir se descartan al terminar
+    # el proceso en lugar de esperar a que alguien las lea
+    for cola in colas:
+        cola.cancel_join_thread()
+
+
+def enviar_a_cola(cola, mensaje):
+    # Pone el mensaje en la cola esperando lugar; retorna False si el proceso
+    # principal pidio dejar de leer
+    while True:
+        try:
+            cola.put(mensaje, timeout=ESPERA_COLA_S)
+            return True
+        except queue.Full:
+            if DETENER_WORKER.is_set():
+                return False
+
+
+def leer_en_worker(tarea):
+    # Se ejecuta en un proceso worker: lee un archivo con su propio log
+    # (el proceso principal lo agrega a su log en el orden de los archivos)
+    # y envia sus partes a la cola de la tarea, terminando con ("fin", estado)
+    carpeta_log = os.path.dirname(tarea["ruta_log"])
+    nombre_log = os.path.basename(tarea["ruta_log"])
+    logger.inicializar(carpeta_log, nombre_log, asincronico=True)
+    logger.configurar_agregacion(tarea["max_warn"])
+    cola = COLAS_WORKER[tarea["cola"]]
+    estado = {}
+    try:
+        partes = iter_partes(
+            tarea["archivo"], estado, tarea["registros_por_parte"]
+        )
+        for parte in partes:
+            if not enviar_a_cola(cola, ("parte", parte)):
+                partes.close()
+                return None
+        logger.emitir_resumen_suprimidos()
+    finally:
+        logger.cerrar()
+    enviar_a_cola(cola, ("fin", estado))
+    return None
+
+
+def recibir_de_worker(cola, futuro):
+    # Generador: mensajes de la cola de un archivo hasta ("fin", estado)
+    # Si el worker termino sin enviar el fin (excepcion o proceso caido) se
+    # propaga su error
+    while True:
+        try:
+            mensaje = cola.get(timeout=ESPERA_COLA_S)
+        except queue.Empty:
+            if futuro.done() and futuro.exception() != None:
+                raise futuro.exception()
+            continue
+        yield mensaje
+        if mensaje[0] == "fin":
+            return
+
+
+def anotar_resultado(archivo, estado, resumen):
+    # Loguea el archivo con error y agrega su entrada al resumen
+    if estado["status"] == "error":
+        logger.error(MODULO, "Archivo omitido por error de lectura: " + archivo)
+    if resumen != None:
+        resumen.append(
+            {
+                "archivo": archivo,
+                "status": estado["status"],
+                "registros": estado["registros"],
+            }
+        )
+
+
+def iter_archivos(archivos, workers=None, resumen=None):
+    # Generador: registros de todos los archivos, etiquetados con CAMPO_ARCHIVO
+    # y CAMPO_LINEA, en el orden de la lista y de cada archivo
+    # workers: procesos que leen archivos a la vez (default: CPUs disponibles,
+    # como maximo uno por archivo). Con 1 se lee en este proceso
+    # resumen: lista opcional donde se agrega {archivo, status, registros} por
+    # archivo a medida que se entrega
+    if workers == None:
+        workers = os.cpu_count()
+        if workers == None:
+            workers = 1
+    if workers > len(archivos):
+        workers = len(archivos)
+
+    total = 0
+    if workers <= 1:
+        for archivo in archivos:
+            estado = {}
+            for parte in iter_partes(archivo, estado):
+                for reg in parte:
+                    yield reg
+            anotar_resultado(archivo, estado, resumen)
+            total += estado["registros"]
+        registrar_fin(len(archivos), total)
+        return
+
+    if logger.ARCHIVO_LOG == "":
+        logger.inicializar()
+    carpeta_logs = tempfile.mkdtemp(prefix="ingesta_multiple_")
+    # "spawn" evita heredar el hilo del logger asincronico del proceso principal
+    contexto = multiprocessing.get_context("spawn")
+    # Una cola acotada por archivo de la ventana: el archivo siguiente en el
+    # orden es el mas antiguo de la ventana, y los demas adelantan como mucho
+    # PARTES_POR_COLA partes
+    ventana = workers * ARCHIVOS_POR_WORKER
+    colas = []
+    for _ in range(ventana):
+        colas.append(contexto.Queue(maxsize=PARTES_POR_COLA))
+    detener = contexto.Event()
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=contexto,
+        initializer=iniciar_worker,
+        initargs=(colas, detener),
+    )
+    pendientes = []
+    siguiente = 0
+    try:
+        while siguiente < len(archivos) or len(pendientes) > 0:
+            # Mantener la ventana de archivos en lectura
+            while siguiente < len(archivos) and len(pendientes) < ventana:
+                tarea = {
+                    "archivo": archivos[siguiente],
+                    "cola": siguiente % ventana,
+                    "ruta_log": os.path.join(
+                        carpeta_logs, "archivo_" + str(siguiente) + ".log"
+                    ),
+                    "max_warn": logger.MAX_POR_TIPO,
+                    "registros_por_parte": REGISTROS_POR_PARTE,
+                }
+                pendientes.append((tarea, executor.submit(leer_en_worker, tarea)))
+                siguiente += 1
+
+            # El archivo mas antiguo de la ventana es el siguiente en el orden
+            tarea, futuro = pendientes.pop(0)
+            estado = None
+            for tipo, contenido in recibir_de_worker(colas[tarea["cola"]], futuro):
+                if tipo == "fin":
+                    estado = contenido
+                else:
+                    for reg in contenido:
+                        yield reg
+            futuro.result()
+            paralelo.anexar_logs([tarea["ruta_log"]])
+            anotar_resultado(tarea["archivo"], estado, resumen)
+            total += estado["registros"]
+    finally:
+        # Si el consumidor deja de iterar, no se leen los archivos restantes y
+        # los workers en curso dejan de esperar lugar en su cola
+        detener.set()
+        for pendiente in pendientes:
+            pendiente[1].cancel()
+        executor.shutdown()
+        for cola in colas:
+            cola.close()
+        shutil.rmtree(carpeta_logs, ignore_errors=True)
+    registrar_fin(len(archivos), total)
+
+
+def registrar_fin(cantidad_archivos, total):
+    # Loguea el cierre de la ingesta de todos los archivos
+    logger.info(
+        MODULO,
+        "Ingesta multiple completada - "
+        + str(total)
+        + " registros de "
+        + str(cantidad_archivos)
+        + " archivos",
+    )
+
+
+def leer_archivos(archivos, workers=None):
+    # Lee todos los archivos y retorna la lista unificada de registros
+    # Envoltorio de iter_archivos para quien necesite la lista completa
+    registros = []
+    for reg in iter_archivos(archivos, workers):
+        registros.append(reg)
+    return registros
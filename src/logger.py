@@ -1,7 +1,11 @@
 # logger.py - Sistema de logging (RNF-01)
 # Registra eventos del workflow con timestamps y niveles
 
+import atexit
 import os
+import queue
+import sys
+import threading
 from datetime import datetime
 
 # Carpeta de logs por defecto para uso manual (fuera de main.py)
@@ -15,11 +19,96 @@ CARPETA_LOGS_DEFAULT = os.path.join(
 # Archivo de log activo
 ARCHIVO_LOG = ""
 
-
-def inicializar(carpeta_logs=None, nombre_archivo=None):
+# Modo asincronico: las lineas se encolan y un hilo las escribe por lotes
+# con un unico archivo abierto. None si el modo asincronico no esta activo
+COLA = None
+HILO_ESCRITOR = None
+
+# Maximo de lineas que el hilo escritor junta en una sola escritura
+LINEAS_POR_LOTE = 10000
+
+# Maximo de lineas en cola: si el escritor se atrasa, registrar() espera en
+# lugar de acumular lineas en memoria sin limite
+MAX_LINEAS_EN_COLA = 100000
+
+# Error del hilo escritor (disco lleno, stdout cerrado, ...). Si no es None,
+# registrar() vuelve al modo sincronico
+ERROR_ESCRITOR = None
+
+
+def escribir_en_segundo_plano(cola, ruta):
+    # Hilo escritor: toma lineas de la cola y las escribe por lotes
+    # Termina al recibir None (lo encola cerrar())
+    # Si una escritura falla, guarda el error en ERROR_ESCRITOR y sigue
+    # vaciando la cola sin escribir: flush() y cerrar() nunca quedan esperando
+    global ERROR_ESCRITOR
+    arch = None
+    try:
+        arch = open(ruta, "a", encoding="utf-8")
+    except OSError as e:
+        ERROR_ESCRITOR = e
+    terminar = False
+    while not terminar:
+        lote = [cola.get()]
+        # Juntar todo lo que ya este encolado, sin bloquear
+        while len(lote) < LINEAS_POR_LOTE:
+            try:
+                lote.append(cola.get_nowait())
+            except queue.Empty:
+                break
+        lineas = []
+        for item in lote:
+            if item == None:
+                terminar = True
+            else:
+                lineas.append(item)
+        try:
+            if len(lineas) > 0 and ERROR_ESCRITOR == None:
+                texto = "\n".join(lineas) + "\n"
+                sys.stdout.write(texto)
+                arch.write(texto)
+                arch.flush()
+        except Exception as e:
+            ERROR_ESCRITOR = e
+        finally:
+            for item in lote:
+                cola.task_done()
+    if arch != None:
+        try:
+            arch.close()
+        except OSError as e:
+            ERROR_ESCRITOR = e
+
+
+def flush():
+    # Espera a que el hilo escritor haya escrito todo lo encolado
+    # En modo sincronico no hace nada (cada linea ya se escribe al momento)
+    if COLA != None:
+        COLA.join()
+
+
+def cerrar():
+    # Vacia la cola, detiene el hilo escritor y vuelve al modo sincronico
+    # El archivo de log activo se mantiene para los mensajes posteriores
+    global COLA, HILO_ESCRITOR
+    if COLA == None:
+        return
+    COLA.put(None)
+    HILO_ESCRITOR.join()
+    COLA = None
+    HILO_ESCRITOR = None
+
+
+def inicializar(carpeta_logs=None, nombre_archivo=None, asincronico=False):
     # Crea carpeta de logs y define archivo destino.
     # Si no se pasa carpeta/nombre, usa ubicacion por defecto en data/ejecuciones.
-    global ARCHIVO_LOG
+    # asincronico: las lineas se escriben desde un hilo en segundo plano
+    # (requiere llamar a flush()/cerrar() antes de leer el archivo)
+    global ARCHIVO_LOG, COLA, HILO_ESCRITOR, ERROR_ESCRITOR
+
+    # Si habia un escritor asincronico activo, terminar de escribir su archivo
+    cerrar()
+    ERROR_ESCRITOR = None
 
     if carpeta_logs == None:
         carpeta_logs = CARPETA_LOGS_DEFAULT
@@ -30,6 +119,13 @@ def inicializar(carpeta_logs=None, nombre_archivo=None):
         os.makedirs(carpeta_logs)
 
     ARCHIVO_LOG = os.path.join(carpeta_logs, nombre_archivo)
+
+    if asincronico:
+        COLA = queue.Queue(maxsize=MAX_LINEAS_EN_COLA)
+        HILO_ESCRITOR = threading.Thread(
+            target=escribir_en_segundo_plano, args=(COLA, ARCHIVO_LOG), daemon=True
+        )
+        HILO_ESCRITOR.start()
     return ARCHIVO_LOG
 
 
@@ -41,6 +137,10 @@ def registrar(nivel, modulo, mensaje):
         inicializar()
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     linea = "[" + ts + "] [" + nivel + "] [" + modulo + "] " + mensaje
+    if COLA != None and ERROR_ESCRITOR == None:
+        # Modo asincronico: el hilo escritor imprime y escribe a archivo
+        COLA.put(linea)
+        return linea
     print(linea)
     dir_log = os.path.dirname(ARCHIVO_LOG)
     if dir_log != "" and not os.path.exists(dir_log):
@@ -64,3 +164,70 @@ def warn(modulo, mensaje):
 def error(modulo, mensaje):
     # Atajo para registrar nivel ERROR
     return registrar("ERROR", modulo, mensaje)
+
+
+# Agregacion de WARN repetitivos por (modulo, tipo de mensaje): se registran
+# las primeras MAX_POR_TIPO ocurrencias de cada tipo, el resto se cuenta y se
+# resume cada INTERVALO_RESUMEN ocurrencias suprimidas. 0 = sin limite
+MAX_POR_TIPO = 0
+INTERVALO_RESUMEN = 100000
+OCURRENCIAS_POR_TIPO = {}
+SUPRIMIDOS_SIN_RESUMIR = {}
+
+
+def configurar_agregacion(max_por_tipo, intervalo_resumen=100000):
+    # Define el limite de WARN por tipo y reinicia los contadores
+    global MAX_POR_TIPO, INTERVALO_RESUMEN, OCURRENCIAS_POR_TIPO, SUPRIMIDOS_SIN_RESUMIR
+    MAX_POR_TIPO = max_por_tipo
+    INTERVALO_RESUMEN = intervalo_resumen
+    OCURRENCIAS_POR_TIPO = {}
+    SUPRIMIDOS_SIN_RESUMIR = {}
+
+
+def warn_agregado(modulo, tipo, mensaje):
+    # Registra un WARN sujeto al limite por (modulo, tipo)
+    # Retorna la linea registrada, o None si el mensaje fue suprimido
+    if MAX_POR_TIPO <= 0:
+        return warn(modulo, mensaje)
+    clave = (modulo, tipo)
+    cantidad = OCURRENCIAS_POR_TIPO.get(clave, 0) + 1
+    OCURRENCIAS_POR_TIPO[clave] = cantidad
+    if cantidad <= MAX_POR_TIPO:
+        return warn(modulo, mensaje)
+
+    pendientes = SUPRIMIDOS_SIN_RESUMIR.get(clave, 0) + 1
+    if pendientes >= INTERVALO_RESUMEN:
+        warn(modulo, tipo + ": " + str(pendientes) + " mensajes mas suprimidos")
+        pendientes = 0
+    SUPRIMIDOS_SIN_RESUMIR[clave] = pendientes
+    return None
+
+
+def emitir_resumen_suprimidos():
+    # Registra los suprimidos que quedaron sin resumir y el total por tipo
+    # Se llama al final de la ejecucion; deja los contadores en cero
+    global OCURRENCIAS_POR_TIPO, SUPRIMIDOS_SIN_RESUMIR
+    for clave in OCURRENCIAS_POR_TIPO.keys():
+        modulo = clave[0]
+        tipo = clave[1]
+        cantidad = OCURRENCIAS_POR_TIPO[clave]
+        if cantidad <= MAX_POR_TIPO:
+            continue
+        pendientes = SUPRIMIDOS_SIN_RESUMIR.get(clave, 0)
+        if pendientes > 0:
+            warn(modulo, tipo + ": " + str(pendientes) + " mensajes mas suprimidos")
+        info(
+            modulo,
+            tipo
+            + ": "
+            + str(cantidad)
+            + " ocurrencias en total ("
+            + str(cantidad - MAX_POR_TIPO)
+            + " suprimidas del log)",
+        )
+    OCURRENCIAS_POR_TIPO = {}
+    SUPRIMIDOS_SIN_RESUMIR = {}
+
+
+# Si el programa termina sin llamar a cerrar(), no perder lineas encoladas
+atexit.register(cerrar)
@@ -0,0 +1,283 @@
+# lote.py - Procesamiento por lotes (RF-05)
+# Procesa todos los archivos soportados de una carpeta (o de un patron glob)
+# en un solo interprete, o repartidos entre varios procesos, con una carpeta
+# de ejecucion por archivo y un resumen consolidado del lote en JSON
+
+import glob
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import checkpoint
+import ingesta
+import logger
+
+MODULO = "LOTE"
+
+
+def listar_entradas(patron):
+    # Retorna la lista ordenada de archivos soportados de una carpeta o de un
+    # patron glob (ej: "data/entrada/solicitudes_*.csv.gz")
+    if os.path.isdir(patron):
+        candidatos = []
+        for nombre in os.listdir(patron):
+            candidatos.append(os.path.join(patron, nombre))
+    else:
+        candidatos = glob.glob(patron)
+    archivos = []
+    for ruta in candidatos:
+        if os.path.isfile(ruta) and ingesta.detectar_formato(ruta) != None:
+            archivos.append(ruta)
+    archivos.sort()
+    return archivos
+
+
+def procesar_entrada(tarea):
+    # Procesa un archivo del lote con main.main (en este proceso o en un worker)
+    # Retorna el resumen del archivo para el reporte del lote
+    import main
+
+    inicio = time.perf_counter()
+    entrada = {"archivo": tarea["archivo"]}
+    try:
+        resultado = main.main(
+            archivo_entrada_param=tarea["archivo"],
+            dir_data_param=tarea["dir_data"],
+            **tarea["opciones"],
+        )
+    except Exception as e:
+        # Un archivo que falla no detiene el resto del lote
+        entrada["status"] = "error"
+        entrada["carpeta_ejecucion"] = None
+        entrada["error"] = str(e)
+        entrada["duracion_s"] = round(time.perf_counter() - inicio, 4)
+        return entrada
+    entrada["status"] = resultado["status"]
+    entrada["carpeta_ejecucion"] = resultado["carpeta_ejecucion"]
+    if resultado["status"] == "ok":
+        entrada["archivo_salida"] = resultado["archivo_salida"]
+        entrada["resumen"] = resultado["reporte"]["resumen"]
+    entrada["duracion_s"] = round(time.perf_counter() - inicio, 4)
+    return entrada
+
+
+def construir_resumen(patron, workers, entradas, duracion, total_archivos):
+    # Arma el resumen consolidado del lote a partir de los resumenes por archivo
+    # total_archivos: archivos del lote; si se interrumpio, los que no llegaron
+    # a procesarse no tienen entrada
+    cantidades = {"ok": 0, "empty": 0, "error": 0, "interrumpido": 0}
+    total = 0
+    validos = 0
+    invalidos = 0
+    for entrada in entradas:
+        cantidades[entrada["status"]] += 1
+        if entrada["status"] == "ok":
+            total += entrada["resumen"]["total_procesados"]
+            validos += entrada["resumen"]["total_validos"]
+            invalidos += entrada["resumen"]["total_invalidos"]
+    if total > 0:
+        pct = round((validos * 100.0) / total, 1)
+    else:
+        pct = 0.0
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "entrada": patron,
+        "workers": workers,
+        "duracion_s": round(duracion, 4),
+        "resumen": {
+            "total_archivos": total_archivos,
+            "archivos_ok": cantidades["ok"],
+            "archivos_vacios": cantidades["empty"],
+            "archivos_con_error": cantidades["error"],
+            "archivos_interrumpidos": cantidades["interrumpido"],
+            "archivos_sin_procesar": total_archivos - len(entradas),
+            "total_procesados": total,
+            "total_validos": validos,
+            "total_invalidos": invalidos,
+            "porcentaje_cumplimiento": pct,
+        },
+        "archivos": entradas,
+    }
+
+
+def registrar_entrada(entrada):
+    # Loguea el resultado de un archivo del lote
+    linea = entrada["archivo"] + " - " + entrada["status"]
+    if entrada["status"] == "ok":
+        linea = (
+            linea
+            + " - "
+            + str(entrada["resumen"]["total_procesados"])
+            + " procesados en "
+            + str(entrada["duracion_s"])
+            + "s"
+        )
+    if entrada["status"] == "error":
+        if "error" in entrada.keys():
+            linea = linea + " - " + entrada["error"]
+        logger.error(MODULO, linea)
+    elif entrada["status"] == "interrumpido":
+        logger.warn(
+            MODULO,
+            linea + " - para continuar: --reanudar " + entrada["carpeta_ejecucion"],
+        )
+    else:
+        logger.info(MODULO, linea)
+
+
+def ejecutar_en_workers(tareas, workers, usar_checkpoint, entradas):
+    # Procesa las tareas del lote en `workers` procesos y agrega a `entradas`
+    # sus resultados, en el orden de los archivos
+    # Si un archivo queda interrumpido (o llega SIGTERM/SIGINT con
+    # checkpoints), los archivos que no empezaron se cancelan y los que estan
+    # en curso terminan. Si un worker muere (OOM, senal), el pool queda roto y
+    # los archivos sin resultado se registran con status "error"
+    contexto = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=contexto)
+    try:
+        futuros = []
+        for tarea in tareas:
+            futuros.append(executor.submit(procesar_entrada, tarea))
+        detener = False
+        for i in range(len(futuros)):
+            if detener and futuros[i].cancel():
+                continue
+            try:
+                entrada = futuros[i].result()
+            except BrokenProcessPool as e:
+                entrada = {
+                    "archivo": tareas[i]["archivo"],
+                    "status": "error",
+                    "carpeta_ejecucion": None,
+                    "error": "El proceso worker termino inesperadamente: " + str(e),
+                    "duracion_s": 0.0,
+                }
+            registrar_entrada(entrada)
+            entradas.append(entrada)
+            if entrada["status"] == "interrumpido" or (
+                usar_checkpoint and checkpoint.INTERRUPCION.is_set()
+            ):
+                detener = True
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def ejecutar_lote(patron, dir_data, workers=1, opciones=None):
+    # Procesa todos los archivos soportados de `patron` (carpeta o glob)
+    # workers: archivos procesados en paralelo (1 = uno tras otro, en este
+    # mismo proceso). Cada archivo usa un solo proceso
+    # opciones: parametros de main.main para cada archivo (modo_streaming,
+    # max_warn_por_tipo, formato_salida, ...)
+    # Retorna el resultado del lote con el resumen consolidado; status "ok",
+    # "error" (algun archivo fallo) o "interrumpido" (SIGTERM/SIGINT con
+    # --checkpoint: quedan archivos para --reanudar o sin procesar)
+    import main
+
+    if opciones == None:
+        opciones = {}
+    if workers == None or workers < 1:
+        workers = 1
+    inicio = time.perf_counter()
+
+    carpeta_lote = main.crear_carpeta_unica(
+        os.path.join(dir_data, "ejecuciones"),
+        "lote_" + datetime.now().strftime("%Y%m%d_%H%M%S"),
+    )
+    archivo_log = logger.inicializar(carpeta_lote, "lote.log")
+
+    archivos = listar_entradas(patron)
+    if len(archivos) == 0:
+        logger.error(MODULO, "No se encontraron archivos de entrada en: " + patron)
+        return {
+            "status": "error",
+            "carpeta_ejecucion": carpeta_lote,
+            "archivo_resumen": None,
+            "archivo_log": archivo_log,
+            "resumen": None,
+        }
+    logger.info(
+        MODULO,
+        "Inicio del lote - "
+        + str(len(archivos))
+        + " archivos de "
+        + patron
+        + " con "
+        + str(workers)
+        + " workers",
+    )
+
+    tareas = []
+    for archivo in archivos:
+        tareas.append({"archivo": archivo, "dir_data": dir_data, "opciones": opciones})
+
+    # Con checkpoints, SIGTERM/SIGINT detienen el lote: el archivo en curso
+    # guarda su checkpoint y los que faltan no se procesan
+    usar_checkpoint = opciones.get("usar_checkpoint") == True
+    entradas = []
+    anteriores = None
+    if usar_checkpoint:
+        # Tambien entre un archivo y el siguiente
+        anteriores = checkpoint.instalar_senales()
+    try:
+        if workers == 1:
+            # Mismo interprete: los imports y el arranque se pagan una sola vez
+            for tarea in tareas:
+                if usar_checkpoint and checkpoint.INTERRUPCION.is_set():
+                    break
+                entrada = procesar_entrada(tarea)
+                # main.main deja activo el log del archivo: volver al del lote
+                logger.inicializar(carpeta_lote, "lote.log")
+                registrar_entrada(entrada)
+                entradas.append(entrada)
+                if entrada["status"] == "interrumpido":
+                    break
+        else:
+            ejecutar_en_workers(tareas, workers, usar_checkpoint, entradas)
+    finally:
+        checkpoint.restaurar_senales(anteriores)
+
+    resumen = construir_resumen(
+        patron, workers, entradas, time.perf_counter() - inicio, len(archivos)
+    )
+    archivo_resumen = os.path.join(carpeta_lote, "resumen_lote.json")
+    arch = open(archivo_resumen, "w", encoding="utf-8")
+    arch.write(json.dumps(resumen, indent=4, ensure_ascii=False))
+    arch.close()
+
+    r = resumen["resumen"]
+    logger.info(
+        MODULO,
+        "Lote completado en "
+        + str(resumen["duracion_s"])
+        + "s - "
+        + str(r["archivos_ok"])
+        + " ok, "
+        + str(r["archivos_vacios"])
+        + " vacios, "
+        + str(r["archivos_con_error"])
+        + " con error, "
+        + str(r["archivos_interrumpidos"])
+        + " interrumpidos, "
+        + str(r["archivos_sin_procesar"])
+        + " sin procesar - "
+        + str(r["total_procesados"])
+        + " registros procesados",
+    )
+    logger.info(MODULO, "Resumen del lote generado: " + archivo_resumen)
+
+    status = "ok"
+    if r["archivos_con_error"] > 0:
+        status = "error"
+    elif r["archivos_interrumpidos"] > 0 or r["archivos_sin_procesar"] > 0:
+        status = "interrumpido"
+    return {
+        "status": status,
+        "carpeta_ejecucion": carpeta_lote,
+        "archivo_resumen": archivo_resumen,
+        "archivo_log": archivo_log,
+        "resumen": resumen,
+    }
@@ -1,7 +1,12 @@
 # main.py - Orquestador del workflow (RF-05)
 # Ejecuta secuencialmente todas las etapas del workflow
 
+import gzip
+import itertools
+import json
 import os
+import re
+import shutil
 import sys
 import time
 from datetime import datetime
@@ -11,36 +16,60 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 import logger
 import ingesta
+import ingesta_multiple
 import normalizador
 import validador
+import procesador
 import calidad
+import paralelo
+import pipeline
+import indice
+import checkpoint
+import metricas
+import lote
+import cache
 
 MODULO = "MAIN"
 
+# Maximo de WARN por tipo de mensaje que se registran en el log por ejecucion
+# (el resto se resume con contadores). 0 = sin limite: por defecto se
+# registran todos; --max-warn N activa la agregacion
+MAX_WARN_POR_TIPO = 0
+
+
+# Caracteres que obligan a encerrar un campo CSV entre comillas
+REGEX_NECESITA_COMILLAS = re.compile('[,"\n]')
+
+# Cantidad de filas que se acumulan antes de cada escritura a disco
+FILAS_POR_ESCRITURA = 5000
+
+# Tamano del buffer del archivo de salida (bytes)
+BUFFER_SALIDA = 1024 * 1024
+
+# Formatos del archivo de salida (--formato-salida); el primero es el default
+FORMATOS_SALIDA = ["csv", "jsonl"]
+
+# Nivel de gzip para la salida comprimida (--comprimir-salida): 6 comprime casi
+# igual que 9 y es bastante mas rapido
+NIVEL_COMPRESION_SALIDA = 6
+
+# Funciones con memo LRU cuyos aciertos se informan en las metricas
+FUNCIONES_MEMO = {
+    "normalizacion_fecha": normalizador.resolver_fecha,
+    "validacion_fecha": validador.es_fecha_valida,
+}
+
+# Etapas medidas dentro de flujo_registros (streaming y workers), donde
+# normalizacion y validacion se hacen en una sola pasada (procesador.py)
+ETAPAS_FLUJO = ["ingesta", "normalizacion_validacion", "calidad"]
+
 
 def escapar_campo_csv(valor):
     # Escapa un campo para CSV: si contiene comas, comillas o saltos de linea
     # lo envuelve en comillas dobles y duplica las comillas internas
-    necesita_comillas = False
-    i = 0
-    while i < len(valor):
-        c = valor[i]
-        if c == "," or c == '"' or c == "\n":
-            necesita_comillas = True
-        i += 1
-    if not necesita_comillas:
+    if REGEX_NECESITA_COMILLAS.search(valor) == None:
         return valor
-    # Duplicar comillas internas
-    resultado = ""
-    i = 0
-    while i < len(valor):
-        c = valor[i]
-        if c == '"':
-            resultado = resultado + '""'
-        else:
-            resultado = resultado + c
-        i += 1
-    return '"' + resultado + '"'
+    return '"' + valor.replace('"', '""') + '"'
 
 
 def normalizar_nombre_para_ruta(nombre):
@@ -61,24 +90,30 @@ def normalizar_nombre_para_ruta(nombre):
 
 def crear_carpeta_ejecucion(dir_data, archivo_entrada):
     # Crea carpeta unica por ejecucion: data/ejecuciones/ejecucion_YYYYMMDD_HHMMSS_archivo
-    nombre_entrada = os.path.basename(archivo_entrada)
+    nombre_entrada = ingesta.quitar_compresion(os.path.basename(archivo_entrada))
     base_sin_ext = os.path.splitext(nombre_entrada)[0]
     base_sin_ext = normalizar_nombre_para_ruta(base_sin_ext)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
     dir_ejecuciones = os.path.join(dir_data, "ejecuciones")
-    if not os.path.exists(dir_ejecuciones):
-        os.makedirs(dir_ejecuciones)
-
     nombre_base = "ejecucion_" + timestamp + "_" + base_sin_ext
-    carpeta = os.path.join(dir_ejecuciones, nombre_base)
-    idx = 1
-    while os.path.exists(carpeta):
-        carpeta = os.path.join(dir_ejecuciones, nombre_base + "_" + str(idx))
-        idx += 1
+    return crear_carpeta_unica(dir_ejecuciones, nombre_base)
 
-    os.makedirs(carpeta)
-    return carpeta
+
+def crear_carpeta_unica(dir_padre, nombre_base):
+    # Crea dir_padre/nombre_base, o nombre_base_1, _2, ... si ya existe
+    # La carpeta se reserva con makedirs (falla si ya existe), asi dos procesos
+    # que arrancan en el mismo segundo no pueden quedarse con la misma
+    os.makedirs(dir_padre, exist_ok=True)
+    carpeta = os.path.join(dir_padre, nombre_base)
+    idx = 1
+    while True:
+        try:
+            os.makedirs(carpeta)
+            return carpeta
+        except FileExistsError:
+            carpeta = os.path.join(dir_padre, nombre_base + "_" + str(idx))
+            idx += 1
 
 
 # Campos para el CSV de salida
@@ -98,47 +133,619 @@ CAMPOS_SALIDA = [
 ]
 
 
-def exportar_csv(registros, ruta_salida):
+def armar_linea_csv(reg, campos):
+    # Arma la linea CSV (sin salto de linea) de un registro
+    valores = []
+    for campo in campos:
+        val = reg.get(campo)
+        if val == None:
+            val = ""
+        elif type(val) != str:
+            val = str(val)
+        valores.append(val)
+    linea = ",".join(valores)
+    # Chequeo unico sobre la linea: si no hay comillas ni saltos y la cantidad
+    # de comas coincide con los separadores, ningun campo necesita escape
+    if (
+        '"' not in linea
+        and "\n" not in linea
+        and linea.count(",") == len(campos) - 1
+    ):
+        return linea
+    escapados = []
+    for val in valores:
+        escapados.append(escapar_campo_csv(val))
+    return ",".join(escapados)
+
+
+def linea_header_csv():
+    # Linea de header del CSV de salida (con salto de linea)
+    encabezados = []
+    for campo in CAMPOS_SALIDA:
+        encabezados.append(escapar_campo_csv(campo))
+    return ",".join(encabezados) + "\n"
+
+
+def armar_linea_jsonl(reg, campos):
+    # Arma la linea JSONL (sin salto de linea) de un registro: un objeto JSON
+    # con los campos de salida en el mismo orden que el CSV
+    salida = {}
+    for campo in campos:
+        salida[campo] = reg.get(campo)
+    return json.dumps(salida, ensure_ascii=False)
+
+
+def abrir_salida(ruta_salida):
+    # Abre el archivo de salida en modo texto; si la ruta termina en .gz se
+    # comprime con gzip mientras se escribe
+    if ruta_salida.endswith(".gz"):
+        return gzip.open(
+            ruta_salida, "wt", encoding="utf-8", compresslevel=NIVEL_COMPRESION_SALIDA
+        )
+    return open(ruta_salida, "w", encoding="utf-8", buffering=BUFFER_SALIDA)
+
+
+def escribir_lineas(registros, ruta_salida, armar_linea, encabezado):
+    # Escribe una linea por registro con armar_linea(reg, CAMPOS_SALIDA)
+    # Las filas se acumulan y se escriben en bloques de FILAS_POR_ESCRITURA
+    # encabezado: texto a escribir antes de las filas ("" = ninguno)
+    # ruta_salida terminada en .gz: se escribe comprimido
+    # Retorna la cantidad de registros escritos
+    inicio = time.perf_counter()
+    dir_salida = os.path.dirname(ruta_salida)
+    if dir_salida != "" and not os.path.exists(dir_salida):
+        os.makedirs(dir_salida)
+    arch = abrir_salida(ruta_salida)
+
+    if encabezado != "":
+        arch.write(encabezado)
+
+    # Escribir registros (registros puede ser una lista o un iterador; si el
+    # iterador falla a mitad de la lectura, el archivo se cierra igual)
+    total = 0
+    bloque = []
+    try:
+        for reg in registros:
+            bloque.append(armar_linea(reg, CAMPOS_SALIDA))
+            if len(bloque) >= FILAS_POR_ESCRITURA:
+                bloque.append("")
+                arch.write("\n".join(bloque))
+                total += len(bloque) - 1
+                bloque = []
+        if len(bloque) > 0:
+            bloque.append("")
+            arch.write("\n".join(bloque))
+            total += len(bloque) - 1
+    finally:
+        arch.close()
+    duracion = time.perf_counter() - inicio
+    if duracion > 0:
+        filas_por_seg = int(total / duracion)
+    else:
+        filas_por_seg = total
+    logger.info(
+        MODULO,
+        "Datos exportados a: "
+        + ruta_salida
+        + " - "
+        + str(total)
+        + " registros ("
+        + str(filas_por_seg)
+        + " registros/s)",
+    )
+    return total
+
+
+def exportar_csv(registros, ruta_salida, con_header=True):
     # Exporta los registros normalizados y validados a un CSV de salida
+    # con_header=False escribe solo filas (fragmentos que luego se concatenan)
+    # Retorna la cantidad de registros escritos
+    encabezado = ""
+    if con_header:
+        encabezado = linea_header_csv()
+    return escribir_lineas(registros, ruta_salida, armar_linea_csv, encabezado)
+
+
+def exportar_jsonl(registros, ruta_salida):
+    # Exporta los registros a JSON Lines: un objeto por linea, sin header,
+    # asi la salida se puede leer o concatenar de a una linea
+    # Retorna la cantidad de registros escritos
+    return escribir_lineas(registros, ruta_salida, armar_linea_jsonl, "")
+
+
+def exportar_registros(registros, ruta_salida, formato_salida, con_header=True):
+    # Exporta en el formato de salida elegido ("csv" o "jsonl")
+    # con_header solo aplica a CSV
+    if formato_salida == "jsonl":
+        return exportar_jsonl(registros, ruta_salida)
+    return exportar_csv(registros, ruta_salida, con_header)
+
+
+def unir_csv_parciales(partes, ruta_salida, con_header=True):
+    # Escribe el header y concatena los CSV parciales (sin header) en orden
+    # con_header=False concatena sin header (salida JSONL)
+    # Con salida .gz los parciales ya estan comprimidos: un gzip puede tener
+    # varios miembros seguidos, asi que alcanza con concatenarlos
+    # Borra los parciales al terminar
     dir_salida = os.path.dirname(ruta_salida)
     if dir_salida != "" and not os.path.exists(dir_salida):
         os.makedirs(dir_salida)
-    arch = open(ruta_salida, "w", encoding="utf-8")
+    destino = open(ruta_salida, "wb")
+    if con_header:
+        header = linea_header_csv().encode("utf-8")
+        if ruta_salida.endswith(".gz"):
+            header = gzip.compress(header, compresslevel=NIVEL_COMPRESION_SALIDA)
+        destino.write(header)
+    for parte in partes:
+        arch = open(parte, "rb")
+        shutil.copyfileobj(arch, destino, BUFFER_SALIDA)
+        arch.close()
+        os.remove(parte)
+    destino.close()
+    logger.info(MODULO, "Datos exportados a: " + ruta_salida)
+
+
+def flujo_registros(iterador, acumulador, tiempos=None):
+    # Generador: cada registro pasa por normalizacion+validacion (una sola
+    # pasada, ver procesador.py) y calidad, y se entrega listo para exportar,
+    # sin acumular la lista en memoria
+    # tiempos: diccionario opcional donde se suman los segundos de cada etapa
+    # (ingesta, normalizacion_validacion, calidad) medidos con perf_counter
+    if tiempos == None:
+        for reg in iterador:
+            reg = procesador.procesar_registro(reg)
+            acumulador.agregar(reg)
+            yield reg
+        return
+
+    for etapa in ETAPAS_FLUJO:
+        if etapa not in tiempos.keys():
+            tiempos[etapa] = 0.0
+    reloj = time.perf_counter
+    t_ingesta = 0.0
+    t_procesamiento = 0.0
+    t_calidad = 0.0
+    try:
+        t0 = reloj()
+        for reg in iterador:
+            t1 = reloj()
+            reg = procesador.procesar_registro(reg)
+            t2 = reloj()
+            acumulador.agregar(reg)
+            t3 = reloj()
+            t_ingesta += t1 - t0
+            t_procesamiento += t2 - t1
+            t_calidad += t3 - t2
+            yield reg
+            t0 = reloj()
+        t_ingesta += reloj() - t0
+    finally:
+        tiempos["ingesta"] += t_ingesta
+        tiempos["normalizacion_validacion"] += t_procesamiento
+        tiempos["calidad"] += t_calidad
 
-    # Escribir header
-    linea_header = ""
+
+def ejecutar_streaming(
+    primero,
+    iterador,
+    archivo_salida,
+    nombre_entrada,
+    carpeta,
+    medidor=None,
+    formato_salida="csv",
+):
+    # Ejecuta normalizacion, validacion, calidad y exportacion en una sola pasada
+    # primero: primer registro ya leido (se uso para detectar archivo vacio)
+    # formato_salida: "csv" o "jsonl"
+    # medidor: MedidorEtapas opcional; las etapas se intercalan registro a
+    # registro, asi que se suman sus tiempos y la exportacion es el resto
+    # Retorna el acumulador de calidad y el reporte generado
+    acumulador = calidad.AcumuladorCalidad()
+    tiempos = None
+    if medidor != None:
+        tiempos = {}
+    flujo = flujo_registros(itertools.chain([primero], iterador), acumulador, tiempos)
+    inicio_pasada = time.perf_counter()
+    try:
+        exportar_registros(flujo, archivo_salida, formato_salida)
+    finally:
+        # Si la exportacion falla a mitad, cerrar el archivo de entrada ya (la
+        # cadena con el primer registro no tiene close)
+        if hasattr(iterador, "close"):
+            iterador.close()
+    duracion_pasada = time.perf_counter() - inicio_pasada
+
+    normalizador.registrar_resumen(acumulador.total)
+    validador.registrar_resumen(acumulador.total_validos, acumulador.total_invalidos)
+    inicio_reporte = time.perf_counter()
+    reporte = acumulador.reporte(nombre_entrada, carpeta)
+    duracion_reporte = time.perf_counter() - inicio_reporte
+
+    if medidor != None:
+        total = acumulador.total
+        en_flujo = 0.0
+        for etapa in ETAPAS_FLUJO:
+            en_flujo += tiempos[etapa]
+        # Lo que resta de la pasada es armar y escribir las lineas del CSV
+        exportacion = duracion_pasada - en_flujo
+        if exportacion < 0:
+            exportacion = 0.0
+        medidor.sumar("ingesta", tiempos["ingesta"], total)
+        medidor.sumar(
+            "normalizacion_validacion", tiempos["normalizacion_validacion"], total
+        )
+        medidor.sumar("calidad", tiempos["calidad"] + duracion_reporte, total)
+        medidor.sumar("exportacion", exportacion, total)
+    return acumulador, reporte
+
+
+def ejecutar_pipeline(
+    primero,
+    iterador,
+    archivo_salida,
+    nombre_entrada,
+    carpeta,
+    medidor,
+    formato_salida="csv",
+):
+    # Como ejecutar_streaming, pero ingesta, normalizacion+validacion y
+    # exportacion corren a la vez conectadas por colas acotadas (pipeline.py)
+    # Las etapas se solapan: la suma de sus duraciones puede superar el total
+    # Retorna el acumulador de calidad y el reporte generado
+    acumulador = calidad.AcumuladorCalidad()
+    estadisticas = {}
+    flujo = pipeline.flujo_pipeline(iterador, acumulador, estadisticas, [primero])
+    inicio_pasada = time.perf_counter()
+    exportar_registros(flujo, archivo_salida, formato_salida)
+    duracion_pasada = time.perf_counter() - inicio_pasada
+
+    normalizador.registrar_resumen(acumulador.total)
+    validador.registrar_resumen(acumulador.total_validos, acumulador.total_invalidos)
+    inicio_reporte = time.perf_counter()
+    reporte = acumulador.reporte(nombre_entrada, carpeta)
+    duracion_reporte = time.perf_counter() - inicio_reporte
+
+    total = acumulador.total
+    tiempos = estadisticas["tiempos"]
+    datos_pipeline = estadisticas["pipeline"]
+    # La exportacion corre en este hilo: es la pasada menos lo que espero
+    # a que llegaran lotes procesados
+    espera = datos_pipeline["etapas"]["exportacion"]["espera_entrada_s"]
+    exportacion = duracion_pasada - espera
+    if exportacion < 0:
+        exportacion = 0.0
+    medidor.sumar("ingesta", tiempos["ingesta"], total)
+    medidor.sumar(
+        "normalizacion_validacion", tiempos["normalizacion_validacion"], total
+    )
+    medidor.sumar("calidad", tiempos["calidad"] + duracion_reporte, total)
+    medidor.sumar("exportacion", exportacion, total)
+    medidor.registrar_pipeline(datos_pipeline)
+    return acumulador, reporte
+
+
+def ejecutar_con_checkpoints(
+    archivo_entrada,
+    formato,
+    archivo_salida,
+    nombre_entrada,
+    carpeta,
+    medidor,
+    formato_salida="csv",
+    estado_previo=None,
+):
+    # Como ejecutar_streaming, pero lee el archivo por bloques de lineas y, cada
+    # checkpoint.FILAS_POR_CHECKPOINT registros, confirma la salida y guarda un
+    # checkpoint en la carpeta (ver checkpoint.py). La salida se escribe en
+    # <archivo_salida>.parcial y se renombra al terminar
+    # estado_previo: checkpoint desde el que se reanuda (None = desde el inicio)
+    # Retorna (status, acumulador, reporte): status "ok", "empty" (sin
+    # registros) o "interrumpido" (SIGTERM/SIGINT; queda el checkpoint)
+    acumulador = calidad.AcumuladorCalidad()
+    lectura = ingesta.leer_header(archivo_entrada, formato)
+    if lectura == None:
+        ingesta.registrar_fin_ingesta(archivo_entrada, 0)
+        return "empty", acumulador, None
+    header = lectura[0]
+    ruta_parcial = archivo_salida + checkpoint.SUFIJO_PARCIAL
+    comprimir = archivo_salida.endswith(".gz")
+    armar_linea = armar_linea_csv
+    if formato_salida == "jsonl":
+        armar_linea = armar_linea_jsonl
+    estado = {
+        "archivo_entrada": os.path.abspath(archivo_entrada),
+        "firma_entrada": indice.firma_archivo(archivo_entrada),
+        "archivo_salida": os.path.abspath(archivo_salida),
+        "formato_salida": formato_salida,
+        "max_warn": logger.MAX_POR_TIPO,
+    }
+
+    if estado_previo == None:
+        salida = checkpoint.SalidaConfirmable(
+            ruta_parcial, None, comprimir, NIVEL_COMPRESION_SALIDA
+        )
+        if formato_salida == "csv":
+            salida.escribir(linea_header_csv())
+        offset = lectura[1]
+        total = 0
+    else:
+        acumulador.restaurar_estado(estado_previo["acumulador"])
+        salida = checkpoint.SalidaConfirmable(
+            ruta_parcial,
+            estado_previo["posicion_salida"],
+            comprimir,
+            NIVEL_COMPRESION_SALIDA,
+        )
+        offset = estado_previo["offset_entrada"]
+        total = estado_previo["registros"]
+
+    tiempos = {}
+    for etapa in ETAPAS_FLUJO:
+        tiempos[etapa] = 0.0
+    reloj = time.perf_counter
+    anteriores = checkpoint.instalar_senales()
+    interrumpido = False
+    inicio_pasada = reloj()
+    try:
+        if estado_previo == None:
+            guardar_checkpoint(
+                carpeta, estado, offset, total, salida.confirmar(), acumulador
+            )
+        pendientes = 0
+        t0 = reloj()
+        for lineas, fin_bloque in ingesta.iter_bloques_mmap(
+            archivo_entrada, offset, None, True
+        ):
+            registros = ingesta.registros_de_lineas(
+                lineas, formato, header, archivo_entrada
+            )
+            tiempos["ingesta"] += reloj() - t0
+            filas = []
+            for reg in flujo_registros(registros, acumulador, tiempos):
+                filas.append(armar_linea(reg, CAMPOS_SALIDA))
+            if len(filas) > 0:
+                filas.append("")
+                salida.escribir("\n".join(filas))
+            total += len(registros)
+            pendientes += len(registros)
+            # El checkpoint se guarda entre bloques: todo lo leido hasta
+            # fin_bloque ya esta sumado al acumulador y escrito en la salida
+            if (
+                pendientes >= checkpoint.FILAS_POR_CHECKPOINT
+                or checkpoint.INTERRUPCION.is_set()
+            ):
+                guardar_checkpoint(
+                    carpeta, estado, fin_bloque, total, salida.confirmar(), acumulador
+                )
+                pendientes = 0
+                if checkpoint.INTERRUPCION.is_set():
+                    interrumpido = True
+                    break
+            t0 = reloj()
+    finally:
+        salida.cerrar()
+        checkpoint.restaurar_senales(anteriores)
+    duracion_pasada = reloj() - inicio_pasada
+
+    if interrumpido:
+        logger.warn(
+            MODULO,
+            "Ejecucion interrumpida con "
+            + str(total)
+            + " registros procesados. Para continuar: --reanudar "
+            + carpeta,
+        )
+        return "interrumpido", acumulador, None
+
+    ingesta.registrar_fin_ingesta(archivo_entrada, total)
+    if total == 0:
+        os.remove(ruta_parcial)
+        checkpoint.borrar(carpeta)
+        return "empty", acumulador, None
+    os.replace(ruta_parcial, archivo_salida)
+    logger.info(
+        MODULO,
+        "Datos exportados a: "
+        + archivo_salida
+        + " - "
+        + str(total)
+        + " registros ("
+        + str(metricas.calcular_por_segundo(total, duracion_pasada))
+        + " registros/s)",
+    )
+
+    normalizador.registrar_resumen(acumulador.total)
+    validador.registrar_resumen(acumulador.total_validos, acumulador.total_invalidos)
+    inicio_reporte = reloj()
+    reporte = acumulador.reporte(nombre_entrada, carpeta)
+    duracion_reporte = reloj() - inicio_reporte
+
+    en_flujo = 0.0
+    for etapa in ETAPAS_FLUJO:
+        en_flujo += tiempos[etapa]
+    exportacion = duracion_pasada - en_flujo
+    if exportacion < 0:
+        exportacion = 0.0
+    medidor.sumar("ingesta", tiempos["ingesta"], total)
+    medidor.sumar(
+        "normalizacion_validacion", tiempos["normalizacion_validacion"], total
+    )
+    medidor.sumar("calidad", tiempos["calidad"] + duracion_reporte, total)
+    medidor.sumar("exportacion", exportacion, total)
+    return "ok", acumulador, reporte
+
+
+def guardar_checkpoint(carpeta, estado, offset, registros, posicion, acumulador):
+    # Guarda el checkpoint de ejecutar_con_checkpoints: byte de la entrada
+    # donde sigue la lectura, registros procesados, posicion de la salida ya
+    # confirmada y acumulador de calidad
+    datos = dict(estado)
+    datos["offset_entrada"] = offset
+    datos["registros"] = registros
+    datos["posicion_salida"] = posicion
+    datos["acumulador"] = acumulador.exportar_estado()
+    checkpoint.guardar(carpeta, datos)
+    logger.info(
+        checkpoint.MODULO,
+        "Checkpoint guardado: "
+        + str(registros)
+        + " registros, byte "
+        + str(offset)
+        + " de la entrada",
+    )
+
+
+def parsear_argumentos(argumentos):
+    # Interpreta los argumentos de linea de comandos
+    # Uso: python src/main.py [ruta/al/archivo] [--streaming] [--max-warn N]
+    #        [--workers N] [--medir-memoria] [--formato-salida csv|jsonl]
+    #        [--comprimir-salida] [--lote carpeta|patron] [--cache] [--compacto]
+    #        [--pipeline] [--indice] [--filas DESDE:HASTA] [--checkpoint]
+    #        [--reanudar carpeta_ejecucion] [--log-asincronico] [--unir]
+    # Retorna un diccionario de opciones o None si hay un argumento invalido
+    opciones = {
+        "archivo": None,
+        "streaming": False,
+        "pipeline": False,
+        "max_warn": None,
+        "workers": None,
+        "medir_memoria": False,
+        "formato_salida": None,
+        "comprimir_salida": False,
+        "lote": None,
+        "cache": False,
+        "compacto": False,
+        "indice": False,
+        "filas": None,
+        "checkpoint": False,
+        "reanudar": None,
+        "log_asincronico": False,
+        "unir": False,
+    }
     i = 0
-    for campo in CAMPOS_SALIDA:
-        if i > 0:
-            linea_header = linea_header + ","
-        linea_header = linea_header + escapar_campo_csv(campo)
+    while i < len(argumentos):
+        arg = argumentos[i]
+        if arg == "--streaming":
+            opciones["streaming"] = True
+        elif arg == "--pipeline":
+            opciones["pipeline"] = True
+        elif arg == "--medir-memoria":
+            opciones["medir_memoria"] = True
+        elif arg == "--comprimir-salida":
+            opciones["comprimir_salida"] = True
+        elif arg == "--cache":
+            opciones["cache"] = True
+        elif arg == "--compacto":
+            opciones["compacto"] = True
+        elif arg == "--indice":
+            opciones["indice"] = True
+        elif arg == "--checkpoint":
+            opciones["checkpoint"] = True
+        elif arg == "--log-asincronico":
+            opciones["log_asincronico"] = True
+        elif arg == "--unir":
+            opciones["unir"] = True
+        elif arg == "--reanudar":
+            if i + 1 >= len(argumentos):
+                print("La opcion --reanudar requiere la carpeta de la ejecucion")
+                return None
+            opciones["reanudar"] = argumentos[i + 1]
+            i += 1
+        elif arg == "--filas":
+            filas = None
+            if i + 1 < len(argumentos):
+                filas = parsear_filas(argumentos[i + 1])
+            if filas == None:
+                print(
+                    "La opcion --filas requiere un rango de lineas DESDE:HASTA "
+                    + "(ej: 1000:2000, o 1000: hasta el final)"
+                )
+                return None
+            opciones["filas"] = filas
+            i += 1
+        elif arg == "--lote":
+            if i + 1 >= len(argumentos):
+                print("La opcion --lote requiere una carpeta o un patron de archivos")
+                return None
+            opciones["lote"] = argumentos[i + 1]
+            i += 1
+        elif arg == "--formato-salida":
+            if i + 1 >= len(argumentos) or argumentos[i + 1] not in FORMATOS_SALIDA:
+                print(
+                    "La opcion --formato-salida requiere uno de: "
+                    + ", ".join(FORMATOS_SALIDA)
+                )
+                return None
+            opciones["formato_salida"] = argumentos[i + 1]
+            i += 1
+        elif arg == "--max-warn":
+            if i + 1 >= len(argumentos) or not argumentos[i + 1].isdigit():
+                print("La opcion --max-warn requiere un numero entero")
+                return None
+            opciones["max_warn"] = int(argumentos[i + 1])
+            i += 1
+        elif arg == "--workers":
+            if (
+                i + 1 >= len(argumentos)
+                or not argumentos[i + 1].isdigit()
+                or int(argumentos[i + 1]) < 1
+            ):
+                print("La opcion --workers requiere un numero entero mayor a 0")
+                return None
+            opciones["workers"] = int(argumentos[i + 1])
+            i += 1
+        elif arg[0:2] == "--":
+            print("Opcion no reconocida: " + arg)
+            return None
+        elif opciones["archivo"] == None:
+            opciones["archivo"] = arg
+        else:
+            print("Se esperaba un solo archivo de entrada, sobra: " + arg)
+            return None
         i += 1
-    arch.write(linea_header + "\n")
-
-    # Escribir registros
-    for reg in registros:
-        linea = ""
-        idx = 0
-        for campo in CAMPOS_SALIDA:
-            if campo in reg.keys():
-                val = reg[campo]
-            else:
-                val = ""
-            if val == None:
-                val = ""
-            if idx > 0:
-                linea = linea + ","
-            linea = linea + escapar_campo_csv(str(val))
-            idx += 1
-        arch.write(linea + "\n")
+    if opciones["lote"] != None and opciones["filas"] != None:
+        print("La opcion --filas no se puede usar con --lote")
+        return None
+    if opciones["unir"] and opciones["lote"] == None:
+        print("La opcion --unir requiere --lote")
+        return None
+    if opciones["unir"] and (
+        opciones["cache"] or opciones["checkpoint"] or opciones["indice"]
+    ):
+        print("La opcion --unir no se puede usar con --cache, --checkpoint ni --indice")
+        return None
+    if opciones["checkpoint"] and opciones["filas"] != None:
+        print("La opcion --checkpoint no se puede usar con --filas")
+        return None
+    if opciones["reanudar"] != None and opciones["filas"] != None:
+        print("La opcion --reanudar no se puede usar con --filas")
+        return None
+    if opciones["reanudar"] != None and (
+        opciones["archivo"] != None or opciones["lote"] != None
+    ):
+        print("La opcion --reanudar toma el archivo de entrada del checkpoint")
+        return None
+    return opciones
 
-    arch.close()
-    logger.info(MODULO, "Datos exportados a: " + ruta_salida)
+
+def parsear_filas(texto):
+    # Convierte "DESDE:HASTA" (lineas del archivo desde 1, incluidas) en la
+    # tupla (desde, hasta); "DESDE:" es hasta el final (hasta None)
+    # Retorna None si el texto no es un rango valido
+    partes = texto.split(":")
+    if len(partes) != 2 or not partes[0].isdigit() or int(partes[0]) < 1:
+        return None
+    desde = int(partes[0])
+    if partes[1] == "":
+        return desde, None
+    if not partes[1].isdigit() or int(partes[1]) < desde:
+        return None
+    return desde, int(partes[1])
 
 
 def listar_archivos_entrada(dir_data):
-    # Lista archivos con extension soportada (.csv, .json, .txt) en dir_data
-    extensiones = [".csv", ".json", ".txt"]
+    # Lista archivos con extension soportada (.csv, .json, .txt, .jsonl,
+    # .ndjson, tambien comprimidos: .csv.gz, .json.bz2, ...) en dir_data
     archivos = []
     if not os.path.exists(dir_data):
         return archivos
@@ -146,8 +753,7 @@ def listar_archivos_entrada(dir_data):
     i = 0
     while i < len(nombres):
         nombre = nombres[i]
-        ext = os.path.splitext(nombre)[1].lower()
-        if ext in extensiones:
+        if ingesta.detectar_formato(nombre) != None:
             archivos.append(nombre)
         i += 1
     archivos.sort()
@@ -159,7 +765,8 @@ def menu_interactivo(dir_data):
     archivos = listar_archivos_entrada(dir_data)
     if len(archivos) == 0:
         print(
-            "No se encontraron archivos de entrada (.csv, .json, .txt) en " + dir_data
+            "No se encontraron archivos de entrada (.csv, .json, .txt, .jsonl) en "
+            + dir_data
         )
         return None
     print("")
@@ -196,55 +803,31 @@ def menu_interactivo(dir_data):
     return ruta
 
 
-def main(archivo_entrada_param=None, archivo_salida_param=None, dir_data_param=None):
-    # Orquestador principal del workflow
-    # Acepta rutas opcionales para testing; si no se pasan, usa las por defecto
-
-    # Rutas
-    if dir_data_param != None:
-        dir_data = dir_data_param
-    else:
-        dir_base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        dir_data = os.path.join(dir_base, "data")
-    if archivo_entrada_param != None:
-        archivo_entrada = archivo_entrada_param
-    else:
-        archivo_entrada = None
-
-    # Si no se recibio archivo_entrada, intentar con sys.argv o menu interactivo
-    if archivo_entrada == None:
-        if len(sys.argv) > 1:
-            # Se paso por linea de comandos: python src/main.py ruta/al/archivo
-            archivo_entrada = sys.argv[1]
-        else:
-            # Menu interactivo
-            archivo_entrada = menu_interactivo(dir_data)
-            if archivo_entrada == None:
-                print("No se selecciono archivo. Saliendo.")
-                return {
-                    "status": "error",
-                    "archivo_entrada": None,
-                    "carpeta_ejecucion": None,
-                    "archivo_salida": None,
-                    "archivo_reporte": None,
-                    "archivo_log": None,
-                }
-
-    # Iniciar medicion una vez definido el archivo de entrada
-    inicio = time.time()
-
-    # Crear carpeta unica de ejecucion y centralizar todos los artefactos ahi
-    carpeta_ejecucion = crear_carpeta_ejecucion(dir_data, archivo_entrada)
-
-    if archivo_salida_param != None:
-        archivo_salida = archivo_salida_param
-    else:
-        archivo_salida = os.path.join(carpeta_ejecucion, "solicitudes_limpias.csv")
+def resultado_sin_salida(status, archivo_entrada, carpeta_ejecucion, archivo_log):
+    # Resultado de main cuando el workflow termina sin generar artefactos
+    return {
+        "status": status,
+        "archivo_entrada": archivo_entrada,
+        "carpeta_ejecucion": carpeta_ejecucion,
+        "archivo_salida": None,
+        "archivo_reporte": None,
+        "archivo_log": archivo_log,
+    }
 
-    archivo_reporte = os.path.join(carpeta_ejecucion, "reporte_calidad.json")
 
-    # Inicializar logger de esta ejecucion
-    archivo_log = logger.inicializar(carpeta_ejecucion, "workflow.log")
+def ejecutar_workflow(
+    archivo_entrada,
+    archivo_salida,
+    archivo_reporte,
+    carpeta_ejecucion,
+    archivo_log,
+    opciones,
+    medidor,
+):
+    # Ejecuta las etapas del workflow con la carpeta y el logger ya preparados
+    # opciones: diccionario con el modo de ejecucion (streaming, workers, ...)
+    # medidor: MedidorEtapas de la ejecucion (duracion y memoria por etapa)
+    # Retorna el diccionario de resultado de main
 
     # Paso 0: Inicio
     logger.info(
@@ -255,58 +838,388 @@ def main(archivo_entrada_param=None, archivo_salida_param=None, dir_data_param=N
         + carpeta_ejecucion,
     )
 
-    # Paso 1: Ingesta
-    logger.info(MODULO, "--- PASO 1: INGESTA ---")
-    registros = ingesta.leer_solicitudes(archivo_entrada)
-    if registros == None:
-        logger.error(MODULO, "No se pudo leer el archivo. Workflow detenido.")
-        return {
-            "status": "error",
-            "archivo_entrada": archivo_entrada,
-            "carpeta_ejecucion": carpeta_ejecucion,
-            "archivo_salida": None,
-            "archivo_reporte": None,
-            "archivo_log": archivo_log,
-        }
-    if len(registros) == 0:
-        logger.warn(MODULO, "No hay registros para procesar. Workflow detenido.")
-        return {
-            "status": "empty",
-            "archivo_entrada": archivo_entrada,
-            "carpeta_ejecucion": carpeta_ejecucion,
-            "archivo_salida": None,
-            "archivo_reporte": None,
-            "archivo_log": archivo_log,
-        }
-
-    # Paso 2: Normalizacion
-    logger.info(MODULO, "--- PASO 2: NORMALIZACION ---")
-    registros = normalizador.normalizar_registros(registros)
-
-    # Paso 3: Validacion
-    logger.info(MODULO, "--- PASO 3: VALIDACION ---")
-    registros = validador.validar_registros(registros)
-
-    # Paso 4: Control de calidad
-    logger.info(MODULO, "--- PASO 4: CONTROL DE CALIDAD ---")
     nombre_entrada = os.path.basename(archivo_entrada)
-    reporte = calidad.generar_reporte(registros, nombre_entrada, carpeta_ejecucion)
 
-    # Paso 5: Exportar datos
-    logger.info(MODULO, "--- PASO 5: EXPORTAR SALIDA ---")
-    exportar_csv(registros, archivo_salida)
+    # Cache de resultados: si esta entrada ya se proceso con las mismas reglas,
+    # se reutilizan la salida y el reporte sin recalcular
+    clave_cache = None
+    if opciones["dir_cache"] != None and opciones["filas"] != None:
+        logger.warn(
+            MODULO, "La cache de resultados no se usa al procesar un rango de lineas"
+        )
+    elif opciones["dir_cache"] != None:
+        medidor.iniciar("cache")
+        try:
+            clave_cache = cache.calcular_clave(
+                archivo_entrada,
+                opciones["formato_salida"],
+                opciones["comprimir_salida"],
+            )
+            carpeta_cache = cache.buscar(opciones["dir_cache"], clave_cache)
+        except OSError as e:
+            logger.warn(MODULO, "No se pudo usar la cache de resultados: " + str(e))
+            clave_cache = None
+            carpeta_cache = None
+        if carpeta_cache != None:
+            reporte = cache.restaurar(carpeta_cache, nombre_entrada, archivo_salida)
+            total = reporte["resumen"]["total_procesados"]
+            medidor.finalizar(total)
+            medidor.modo = "cache"
+            return resultado_final(
+                archivo_entrada,
+                archivo_salida,
+                archivo_reporte,
+                carpeta_ejecucion,
+                archivo_log,
+                reporte,
+                medidor,
+                True,
+            )
+        medidor.finalizar(0)
 
-    # Resumen final
-    fin = time.time()
-    duracion = round(fin - inicio, 2)
-    total = len(registros)
-    validos = 0
-    invalidos = 0
-    for reg in registros:
-        if reg["estado"] == "VALIDO":
-            validos += 1
+    medidor.observar_memo(FUNCIONES_MEMO)
+    normalizador.reiniciar_categorias()
+
+    workers = opciones["workers"]
+    archivos_unidos = opciones["archivos_unidos"]
+    workers_lectura = 1
+    if archivos_unidos != None:
+        # Con archivos unidos los workers leen archivos (ingesta_multiple), no
+        # fragmentos de un archivo
+        workers_lectura = workers
+        workers = 1
+    if workers > 1 and opciones["filas"] != None:
+        logger.warn(
+            MODULO,
+            "Un rango de lineas se procesa en un solo proceso (streaming)",
+        )
+        workers = 1
+
+    # Checkpoints: solo de archivos que se pueden leer desde un offset
+    usar_checkpoint = opciones["checkpoint"]
+    if usar_checkpoint and not indice.es_indexable(archivo_entrada):
+        logger.warn(
+            MODULO,
+            "Solo se guardan checkpoints de archivos CSV, TXT o JSONL sin "
+            + "comprimir, se procesa en streaming sin checkpoints",
+        )
+        usar_checkpoint = False
+    if usar_checkpoint and (workers > 1 or opciones["pipeline"]):
+        logger.warn(
+            MODULO,
+            "Con checkpoints se procesa en un solo proceso y una sola pasada "
+            + "(se ignoran --workers y --pipeline)",
+        )
+        workers = 1
+    if workers > 1:
+        formato = ingesta.verificar_archivo(archivo_entrada)
+        if formato == None:
+            logger.error(MODULO, "No se pudo leer el archivo. Workflow detenido.")
+            return resultado_sin_salida(
+                "error", archivo_entrada, carpeta_ejecucion, archivo_log
+            )
+        if formato not in paralelo.FORMATOS_FRAGMENTABLES:
+            logger.warn(
+                MODULO,
+                "El formato "
+                + formato
+                + " no se puede fragmentar, se procesa en un solo proceso (streaming)",
+            )
+            workers = 1
+        elif ingesta.detectar_compresion(archivo_entrada) != None:
+            # Un archivo comprimido no se puede leer a partir de un offset
+            logger.warn(
+                MODULO,
+                "El archivo esta comprimido y no se puede fragmentar, se procesa "
+                + "en un solo proceso (streaming)",
+            )
+            workers = 1
+
+    # Si se pidieron workers pero el archivo no se puede fragmentar,
+    # se usa el modo streaming (tambien acota la memoria); un rango de
+    # lineas tambien se procesa en streaming
+    usar_streaming = (
+        opciones["streaming"]
+        or archivos_unidos != None
+        or workers != opciones["workers"]
+        or opciones["filas"] != None
+        or opciones["checkpoint"]
+    )
+
+    if workers > 1:
+        # Modo paralelo: fragmentos del archivo procesados en varios procesos
+        logger.info(
+            MODULO, "--- MODO PARALELO: PASOS 1 A 5 CON " + str(workers) + " WORKERS ---"
+        )
+        # Las etapas corren intercaladas dentro de los workers: se mide el
+        # procesamiento completo, la union de las salidas y el reporte
+        medidor.modo = "paralelo"
+        # Con --indice los fragmentos se calculan con la tabla de offsets de
+        # lineas guardada junto al archivo (se arma en la primera ejecucion)
+        tabla = None
+        if opciones["indice"]:
+            medidor.iniciar("indice")
+            tabla = indice.obtener_indice(archivo_entrada)
+            medidor.finalizar(0)
+        medidor.iniciar("procesamiento_paralelo")
+        acumulador, partes, estadisticas = paralelo.ejecutar_en_paralelo(
+            archivo_entrada,
+            formato,
+            carpeta_ejecucion,
+            workers,
+            logger.MAX_POR_TIPO,
+            opciones["formato_salida"],
+            opciones["comprimir_salida"],
+            tabla,
+        )
+        medidor.finalizar(acumulador.total)
+        for estadisticas_fragmento in estadisticas:
+            medidor.sumar_memo(estadisticas_fragmento["memo"])
+            medidor.sumar_categorias(
+                estadisticas_fragmento["categorias"],
+                estadisticas_fragmento["categorias_desbordadas"],
+            )
+        ingesta.registrar_fin_ingesta(archivo_entrada, acumulador.total)
+        if acumulador.total == 0:
+            for parte in partes:
+                os.remove(parte)
+            logger.warn(MODULO, "No hay registros para procesar. Workflow detenido.")
+            return resultado_sin_salida(
+                "empty", archivo_entrada, carpeta_ejecucion, archivo_log
+            )
+        medidor.iniciar("union_salida")
+        unir_csv_parciales(
+            partes, archivo_salida, opciones["formato_salida"] == "csv"
+        )
+        medidor.finalizar(acumulador.total)
+        normalizador.registrar_resumen(acumulador.total)
+        validador.registrar_resumen(acumulador.total_validos, acumulador.total_invalidos)
+        medidor.iniciar("calidad")
+        reporte = acumulador.reporte(nombre_entrada, carpeta_ejecucion)
+        medidor.finalizar(acumulador.total)
+    elif usar_checkpoint:
+        # Modo streaming con checkpoints: se puede reanudar con --reanudar
+        logger.info(
+            MODULO, "--- MODO CHECKPOINT: PASOS 1 A 5 EN UNA SOLA PASADA ---"
+        )
+        medidor.modo = "checkpoint"
+        formato = ingesta.verificar_archivo(archivo_entrada)
+        if formato == None:
+            logger.error(MODULO, "No se pudo leer el archivo. Workflow detenido.")
+            return resultado_sin_salida(
+                "error", archivo_entrada, carpeta_ejecucion, archivo_log
+            )
+        estado_previo = opciones["reanudar"]
+        if estado_previo != None:
+            logger.info(
+                MODULO,
+                "Reanudando desde el checkpoint del "
+                + estado_previo["timestamp"]
+                + ": "
+                + str(estado_previo["registros"])
+                + " registros procesados, byte "
+                + str(estado_previo["offset_entrada"])
+                + " de la entrada",
+            )
+        try:
+            status, acumulador, reporte = ejecutar_con_checkpoints(
+                archivo_entrada,
+                formato,
+                archivo_salida,
+                nombre_entrada,
+                carpeta_ejecucion,
+                medidor,
+                opciones["formato_salida"],
+                estado_previo,
+            )
+        except ValueError:
+            # Error de lectura a mitad del archivo: reanudar volveria a fallar
+            parcial = archivo_salida + checkpoint.SUFIJO_PARCIAL
+            if os.path.exists(parcial):
+                os.remove(parcial)
+            checkpoint.borrar(carpeta_ejecucion)
+            logger.error(MODULO, "No se pudo leer el archivo. Workflow detenido.")
+            return resultado_sin_salida(
+                "error", archivo_entrada, carpeta_ejecucion, archivo_log
+            )
+        if status == "empty":
+            logger.warn(MODULO, "No hay registros para procesar. Workflow detenido.")
+            return resultado_sin_salida(
+                "empty", archivo_entrada, carpeta_ejecucion, archivo_log
+            )
+        if status == "interrumpido":
+            return resultado_sin_salida(
+                "interrumpido", archivo_entrada, carpeta_ejecucion, archivo_log
+            )
+    elif usar_streaming or opciones["pipeline"]:
+        # Modo streaming: todas las etapas en una sola pasada por registro
+        # Con --pipeline las etapas corren en hilos conectados por colas
+        if opciones["pipeline"]:
+            logger.info(
+                MODULO, "--- MODO PIPELINE: PASOS 1 A 5 EN ETAPAS CONCURRENTES ---"
+            )
+            medidor.modo = "pipeline"
+            ejecutar_pasada = ejecutar_pipeline
+        else:
+            logger.info(
+                MODULO, "--- MODO STREAMING: PASOS 1 A 5 EN UNA SOLA PASADA ---"
+            )
+            medidor.modo = "streaming"
+            ejecutar_pasada = ejecutar_streaming
+        medidor.iniciar("ingesta")
+        if opciones["filas"] != None:
+            # Solo las lineas pedidas, buscadas con la tabla de offsets
+            desde, hasta = opciones["filas"]
+            rango = str(desde) + ":"
+            if hasta != None:
+                rango = rango + str(hasta)
+            logger.info(MODULO, "Procesando las lineas " + rango + " del archivo")
+            tabla = None
+            if indice.es_indexable(archivo_entrada):
+                tabla = indice.obtener_indice(archivo_entrada, opciones["indice"])
+            iterador = indice.iter_lineas(archivo_entrada, desde, hasta, tabla)
+        elif archivos_unidos != None:
+            logger.info(
+                MODULO,
+                "Procesando "
+                + str(len(archivos_unidos))
+                + " archivos como un solo conjunto de datos",
+            )
+            iterador = ingesta_multiple.iter_archivos(archivos_unidos, workers_lectura)
         else:
-            invalidos += 1
+            iterador = ingesta.iter_solicitudes(archivo_entrada)
+        if iterador == None:
+            logger.error(MODULO, "No se pudo leer el archivo. Workflow detenido.")
+            return resultado_sin_salida(
+                "error", archivo_entrada, carpeta_ejecucion, archivo_log
+            )
+        # Leer el primer registro para detectar archivo vacio antes de exportar
+        # Un JSON invalido a mitad del archivo corta la lectura con ValueError:
+        # se descarta la salida parcial y se detiene el workflow
+        try:
+            primero = next(iterador, None)
+            medidor.finalizar(0)
+            if primero == None:
+                logger.warn(
+                    MODULO, "No hay registros para procesar. Workflow detenido."
+                )
+                return resultado_sin_salida(
+                    "empty", archivo_entrada, carpeta_ejecucion, archivo_log
+                )
+            acumulador, reporte = ejecutar_pasada(
+                primero,
+                iterador,
+                archivo_salida,
+                nombre_entrada,
+                carpeta_ejecucion,
+                medidor,
+                opciones["formato_salida"],
+            )
+        except ValueError:
+            if os.path.exists(archivo_salida):
+                os.remove(archivo_salida)
+            logger.error(MODULO, "No se pudo leer el archivo. Workflow detenido.")
+            return resultado_sin_salida(
+                "error", archivo_entrada, carpeta_ejecucion, archivo_log
+            )
+    else:
+        # Paso 1: Ingesta
+        logger.info(MODULO, "--- PASO 1: INGESTA ---")
+        medidor.modo = "etapas"
+        medidor.iniciar("ingesta")
+        registros = ingesta.leer_solicitudes(archivo_entrada)
+        if registros == None:
+            logger.error(MODULO, "No se pudo leer el archivo. Workflow detenido.")
+            return resultado_sin_salida(
+                "error", archivo_entrada, carpeta_ejecucion, archivo_log
+            )
+        if len(registros) == 0:
+            logger.warn(MODULO, "No hay registros para procesar. Workflow detenido.")
+            return resultado_sin_salida(
+                "empty", archivo_entrada, carpeta_ejecucion, archivo_log
+            )
+
+        total = len(registros)
+        medidor.finalizar(total)
+
+        # Paso 2: Normalizacion
+        logger.info(MODULO, "--- PASO 2: NORMALIZACION ---")
+        medidor.iniciar("normalizacion")
+        registros = normalizador.normalizar_registros(registros, opciones["compacto"])
+        medidor.finalizar(total)
+
+        # Paso 3: Validacion
+        logger.info(MODULO, "--- PASO 3: VALIDACION ---")
+        medidor.iniciar("validacion")
+        registros = validador.validar_registros(registros)
+        medidor.finalizar(total)
+
+        # Paso 4: Control de calidad
+        logger.info(MODULO, "--- PASO 4: CONTROL DE CALIDAD ---")
+        medidor.iniciar("calidad")
+        reporte = calidad.generar_reporte(registros, nombre_entrada, carpeta_ejecucion)
+        medidor.finalizar(total)
+
+        # Paso 5: Exportar datos
+        logger.info(MODULO, "--- PASO 5: EXPORTAR SALIDA ---")
+        medidor.iniciar("exportacion")
+        exportar_registros(registros, archivo_salida, opciones["formato_salida"])
+        medidor.finalizar(total)
+
+    # Cardinalidad de las columnas categoricas normalizadas en este proceso
+    valores, desbordadas = normalizador.valores_categorias()
+    medidor.sumar_categorias(valores, desbordadas)
+
+    if clave_cache != None:
+        try:
+            cache.guardar(opciones["dir_cache"], clave_cache, archivo_salida, reporte)
+        except OSError as e:
+            logger.warn(
+                MODULO, "No se pudo guardar en la cache de resultados: " + str(e)
+            )
+
+    resultado = resultado_final(
+        archivo_entrada,
+        archivo_salida,
+        archivo_reporte,
+        carpeta_ejecucion,
+        archivo_log,
+        reporte,
+        medidor,
+        False,
+    )
+    # Con el reporte y las metricas ya escritos, el checkpoint no hace falta
+    if usar_checkpoint:
+        checkpoint.borrar(carpeta_ejecucion)
+    return resultado
+
+
+def resultado_final(
+    archivo_entrada,
+    archivo_salida,
+    archivo_reporte,
+    carpeta_ejecucion,
+    archivo_log,
+    reporte,
+    medidor,
+    desde_cache,
+):
+    # Cierra una ejecucion exitosa: metricas por etapa, resumen en el log y
+    # diccionario de resultado de main
+    # desde_cache: la salida y el reporte se reutilizaron de la cache
+    nombre_entrada = os.path.basename(archivo_entrada)
+    total = reporte["resumen"]["total_procesados"]
+    validos = reporte["resumen"]["total_validos"]
+    invalidos = reporte["resumen"]["total_invalidos"]
+
+    # Metricas por etapa: en el log, en el reporte y en metricas.json
+    metricas_ejecucion = medidor.resumen(total)
+    metricas.registrar_en_log(metricas_ejecucion)
+    calidad.agregar_metricas(reporte, metricas_ejecucion, carpeta_ejecucion)
+    metricas.guardar_metricas(metricas_ejecucion, nombre_entrada, carpeta_ejecucion)
+
+    # Resumen final
+    duracion = round(metricas_ejecucion["total"]["duracion_s"], 3)
 
     logger.info(
         MODULO,
@@ -340,16 +1253,270 @@ def main(archivo_entrada_param=None, archivo_salida_param=None, dir_data_param=N
             "total_invalidos": invalidos,
         },
         "reporte": reporte,
+        "metricas": metricas_ejecucion,
+        "desde_cache": desde_cache,
     }
 
 
+def main(
+    archivo_entrada_param=None,
+    archivo_salida_param=None,
+    dir_data_param=None,
+    modo_streaming=None,
+    log_asincronico=None,
+    max_warn_por_tipo=None,
+    workers=None,
+    medir_memoria=None,
+    formato_salida=None,
+    comprimir_salida=None,
+    usar_cache=None,
+    compacto=None,
+    modo_pipeline=None,
+    usar_indice=None,
+    filas=None,
+    usar_checkpoint=None,
+    reanudar=None,
+    archivos_unidos=None,
+):
+    # Orquestador principal del workflow
+    # Acepta rutas opcionales para testing; si no se pasan, usa las por defecto
+    # modo_streaming: procesa registro a registro en una sola pasada (memoria
+    # constante) en lugar de etapas sobre la lista completa
+    # log_asincronico: el log se escribe por lotes desde un hilo en segundo plano
+    # (workflow.log queda completo recien al terminar main)
+    # max_warn_por_tipo: WARN por tipo de mensaje antes de resumir (0 = todos)
+    # workers: cantidad de procesos para archivos CSV/TXT/JSONL (1 = un solo proceso)
+    # medir_memoria: agrega el pico de memoria por etapa (tracemalloc) a las
+    # metricas; es mas lento, por eso esta desactivado por defecto
+    # formato_salida: "csv" (default) o "jsonl"
+    # comprimir_salida: escribe la salida con gzip (solicitudes_limpias.csv.gz)
+    # usar_cache: reutiliza la salida y el reporte de una ejecucion anterior con
+    # la misma entrada y las mismas reglas (cache en data/cache)
+    # compacto: en el modo por etapas guarda los registros como RegistroCompacto
+    # (__slots__) en lugar de dicts; la salida es identica y usa menos memoria
+    # modo_pipeline: ingesta, normalizacion+validacion y exportacion corren a
+    # la vez en hilos conectados por colas acotadas de lotes de registros
+    # usar_indice: guarda (o reutiliza) junto al archivo de entrada el indice de
+    # offsets de lineas (.idx) para calcular los fragmentos de --workers
+    # filas: (desde, hasta) procesa solo esas lineas del archivo (desde 1,
+    # incluidas; hasta None = hasta el final) en streaming
+    # usar_checkpoint: procesa en streaming guardando checkpoints periodicos en
+    # la carpeta de ejecucion (checkpoint.py)
+    # reanudar: carpeta de una ejecucion con checkpoint interrumpida; se sigue
+    # desde el ultimo checkpoint con el archivo y las opciones de salida
+    # guardados en el
+    # archivos_unidos: lista de archivos que se procesan como un solo conjunto
+    # de datos (ingesta_multiple.py) en streaming; workers son los procesos que
+    # leen archivos y archivo_entrada_param solo da nombre a la ejecucion
+
+    # Rutas
+    if dir_data_param != None:
+        dir_data = dir_data_param
+    else:
+        dir_base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        dir_data = os.path.join(dir_base, "data")
+    if archivo_entrada_param != None:
+        archivo_entrada = archivo_entrada_param
+    elif archivos_unidos != None:
+        archivo_entrada = "union_" + str(len(archivos_unidos)) + "_archivos"
+    else:
+        archivo_entrada = None
+
+    # Si no se recibio archivo_entrada, intentar con sys.argv o menu interactivo
+    if archivo_entrada == None and reanudar == None:
+        if len(sys.argv) > 1:
+            # Se paso por linea de comandos: python src/main.py ruta/al/archivo
+            opciones = parsear_argumentos(sys.argv[1:])
+            if opciones == None:
+                return resultado_sin_salida("error", None, None, None)
+            if opciones["lote"] != None and opciones["unir"]:
+                # Modo lote unido: los archivos son un solo conjunto de datos
+                archivos_unidos = lote.listar_entradas(opciones["lote"])
+                if len(archivos_unidos) == 0:
+                    print("No hay archivos soportados en: " + opciones["lote"])
+                    return resultado_sin_salida("error", None, None, None)
+                opciones["archivo"] = os.path.normpath(opciones["lote"])
+            elif opciones["lote"] != None:
+                # Modo lote: --workers reparte archivos entre procesos
+                return lote.ejecutar_lote(
+                    opciones["lote"],
+                    dir_data,
+                    opciones["workers"],
+                    {
+                        "modo_streaming": opciones["streaming"],
+                        "max_warn_por_tipo": opciones["max_warn"],
+                        "medir_memoria": opciones["medir_memoria"],
+                        "formato_salida": opciones["formato_salida"],
+                        "comprimir_salida": opciones["comprimir_salida"],
+                        "usar_cache": opciones["cache"],
+                        "compacto": opciones["compacto"],
+                        "modo_pipeline": opciones["pipeline"],
+                        "usar_indice": opciones["indice"],
+                        "usar_checkpoint": opciones["checkpoint"],
+                        "log_asincronico": opciones["log_asincronico"],
+                    },
+                )
+            archivo_entrada = opciones["archivo"]
+            if modo_streaming == None:
+                modo_streaming = opciones["streaming"]
+            if max_warn_por_tipo == None:
+                max_warn_por_tipo = opciones["max_warn"]
+            if workers == None:
+                workers = opciones["workers"]
+            if medir_memoria == None:
+                medir_memoria = opciones["medir_memoria"]
+            if formato_salida == None:
+                formato_salida = opciones["formato_salida"]
+            if comprimir_salida == None:
+                comprimir_salida = opciones["comprimir_salida"]
+            if usar_cache == None:
+                usar_cache = opciones["cache"]
+            if compacto == None:
+                compacto = opciones["compacto"]
+            if modo_pipeline == None:
+                modo_pipeline = opciones["pipeline"]
+            if usar_indice == None:
+                usar_indice = opciones["indice"]
+            if filas == None:
+                filas = opciones["filas"]
+            if usar_checkpoint == None:
+                usar_checkpoint = opciones["checkpoint"]
+            if reanudar == None:
+                reanudar = opciones["reanudar"]
+            if log_asincronico == None:
+                log_asincronico = opciones["log_asincronico"]
+        if archivo_entrada == None and reanudar == None:
+            # Menu interactivo
+            archivo_entrada = menu_interactivo(dir_data)
+            if archivo_entrada == None:
+                print("No se selecciono archivo. Saliendo.")
+                return resultado_sin_salida("error", None, None, None)
+
+    if modo_streaming == None:
+        modo_streaming = False
+    if log_asincronico == None:
+        log_asincronico = False
+    if max_warn_por_tipo == None:
+        max_warn_por_tipo = MAX_WARN_POR_TIPO
+    if workers == None:
+        workers = 1
+    if medir_memoria == None:
+        medir_memoria = False
+    if formato_salida == None:
+        formato_salida = FORMATOS_SALIDA[0]
+    if comprimir_salida == None:
+        comprimir_salida = False
+    if compacto == None:
+        compacto = False
+    if modo_pipeline == None:
+        modo_pipeline = False
+    if usar_indice == None:
+        usar_indice = False
+    if usar_checkpoint == None:
+        usar_checkpoint = False
+    if archivos_unidos != None:
+        # Los archivos unidos se leen en streaming con ingesta_multiple: no
+        # aplican la cache, los checkpoints, el indice ni el rango de lineas
+        usar_cache = False
+        usar_checkpoint = False
+        usar_indice = False
+        filas = None
+
+    # Reanudar: el archivo de entrada, la salida y el limite de WARN son los de
+    # la ejecucion interrumpida
+    estado_previo = None
+    if reanudar != None:
+        estado_previo, motivo = checkpoint.cargar(reanudar)
+        if estado_previo == None:
+            print("No se puede reanudar la ejecucion: " + motivo)
+            return resultado_sin_salida("error", None, reanudar, None)
+        archivo_entrada = estado_previo["archivo_entrada"]
+        formato_salida = estado_previo["formato_salida"]
+        max_warn_por_tipo = estado_previo["max_warn"]
+        usar_checkpoint = True
+        usar_cache = False
+
+    dir_cache = None
+    if usar_cache:
+        dir_cache = os.path.join(dir_data, "cache")
+
+    # Iniciar medicion una vez definido el archivo de entrada
+    medidor = metricas.MedidorEtapas(medir_memoria)
+
+    # Crear carpeta unica de ejecucion y centralizar todos los artefactos ahi
+    # (al reanudar, se sigue en la carpeta de la ejecucion interrumpida)
+    if estado_previo != None:
+        carpeta_ejecucion = reanudar
+    else:
+        carpeta_ejecucion = crear_carpeta_ejecucion(dir_data, archivo_entrada)
+
+    if estado_previo != None:
+        archivo_salida = estado_previo["archivo_salida"]
+    elif archivo_salida_param != None:
+        archivo_salida = archivo_salida_param
+    else:
+        nombre_salida = "solicitudes_limpias." + formato_salida
+        if comprimir_salida:
+            nombre_salida = nombre_salida + ".gz"
+        archivo_salida = os.path.join(carpeta_ejecucion, nombre_salida)
+
+    archivo_reporte = os.path.join(carpeta_ejecucion, "reporte_calidad.json")
+
+    # Inicializar logger de esta ejecucion
+    archivo_log = logger.inicializar(
+        carpeta_ejecucion, "workflow.log", asincronico=log_asincronico
+    )
+    logger.configurar_agregacion(max_warn_por_tipo)
+
+    try:
+        return ejecutar_workflow(
+            archivo_entrada,
+            archivo_salida,
+            archivo_reporte,
+            carpeta_ejecucion,
+            archivo_log,
+            {
+                "streaming": modo_streaming,
+                "pipeline": modo_pipeline,
+                "workers": workers,
+                "formato_salida": formato_salida,
+                "comprimir_salida": comprimir_salida,
+                "dir_cache": dir_cache,
+                "compacto": compacto,
+                "indice": usar_indice,
+                "filas": filas,
+                "checkpoint": usar_checkpoint,
+                "reanudar": estado_previo,
+                "archivos_unidos": archivos_unidos,
+            },
+            medidor,
+        )
+    finally:
+        medidor.detener()
+        # Resumir los WARN suprimidos y dejar el log completo en disco
+        logger.emitir_resumen_suprimidos()
+        logger.configurar_agregacion(0)
+        logger.cerrar()
+
+
 # Ejecutar el workflow
 if __name__ == "__main__":
     resultado = main()
-    if resultado["status"] == "ok":
+    if "archivo_resumen" in resultado.keys():
+        # Modo lote
+        if resultado["archivo_resumen"] != None:
+            print("Lote completado. Resumen: " + resultado["archivo_resumen"])
+        if resultado["status"] == "interrumpido":
+            print("Lote interrumpido: los archivos pendientes no se procesaron.")
+        elif resultado["status"] != "ok":
+            print("Hubo archivos con error en el lote (ver lote.log).")
+    elif resultado["status"] == "ok":
         print("Workflow completado exitosamente.")
         print("Carpeta de ejecucion: " + resultado["carpeta_ejecucion"])
     elif resultado["status"] == "empty":
         print("Archivo vacio o sin registros.")
+    elif resultado["status"] == "interrumpido":
+        print("Ejecucion interrumpida. Para continuar:")
+        print("  python src/main.py --reanudar " + resultado["carpeta_ejecucion"])
     else:
         print("Error en el workflow.")
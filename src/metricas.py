@@ -0,0 +1,329 @@
+# metricas.py - Metricas de rendimiento por etapa (RNF-02)
+# Mide duracion (perf_counter), registros/s y pico de memoria (tracemalloc,
+# opcional) de cada etapa del workflow, los aciertos de los memos LRU, la
+# cardinalidad de las columnas categoricas y las esperas y colas del modo
+# pipeline, y las guarda en metricas.json
+
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+import logger
+
+MODULO = "METRICAS"
+
+
+def redondear_mb(cantidad_bytes):
+    # Convierte bytes a MB con 2 decimales
+    return round(cantidad_bytes / 1048576.0, 2)
+
+
+class MedidorEtapas:
+    # Acumula la duracion y los registros de cada etapa de una ejecucion
+    # medir_memoria: activa tracemalloc (hace mas lenta la ejecucion)
+    # modo: "etapas", "streaming", "pipeline", "checkpoint" o "paralelo"; lo completa el
+    # workflow cuando decide como procesar el archivo (se informa en las metricas)
+
+    def __init__(self, medir_memoria=False):
+        self.modo = None
+        self.medir_memoria = medir_memoria
+        self.etapas = {}
+        self.orden = []
+        self.etapa_actual = None
+        self.inicio_etapa = 0.0
+        self.memo = {}
+        self.funciones_memo = None
+        self.memo_inicial = None
+        self.categorias = {}
+        self.categorias_desbordadas = []
+        self.pipeline = None
+        self.pico_total = 0
+        self.inicio_tracemalloc = False
+        if medir_memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.inicio_tracemalloc = True
+        self.inicio = time.perf_counter()
+
+    def iniciar(self, etapa):
+        # Marca el comienzo de una etapa (reinicia el pico de memoria)
+        self.etapa_actual = etapa
+        if self.medir_memoria:
+            tracemalloc.reset_peak()
+        self.inicio_etapa = time.perf_counter()
+
+    def finalizar(self, registros):
+        # Cierra la etapa iniciada con iniciar() y registra sus metricas
+        duracion = time.perf_counter() - self.inicio_etapa
+        pico = None
+        if self.medir_memoria:
+            pico = tracemalloc.get_traced_memory()[1]
+        self.sumar(self.etapa_actual, duracion, registros, pico)
+        self.etapa_actual = None
+
+    def sumar(self, etapa, duracion, registros, pico=None):
+        # Suma duracion a una etapa (en streaming las etapas se intercalan y
+        # se miden por partes). pico: bytes maximos asignados durante la etapa
+        if etapa not in self.etapas.keys():
+            self.etapas[etapa] = {"duracion_s": 0.0, "registros": 0}
+            self.orden.append(etapa)
+        datos = self.etapas[etapa]
+        datos["duracion_s"] += duracion
+        if registros > datos["registros"]:
+            datos["registros"] = registros
+        if pico != None:
+            pico_mb = redondear_mb(pico)
+            if "pico_memoria_mb" not in datos.keys():
+                datos["pico_memoria_mb"] = pico_mb
+            elif pico_mb > datos["pico_memoria_mb"]:
+                datos["pico_memoria_mb"] = pico_mb
+            if pico > self.pico_total:
+                self.pico_total = pico
+
+    def observar_memo(self, funciones):
+        # funciones: {nombre: funcion con functools.lru_cache}. Los aciertos y
+        # fallos de cada memo se cuentan desde este momento hasta resumen()
+        self.funciones_memo = funciones
+        self.memo_inicial = contadores_memo(funciones)
+
+    def sumar_memo(self, contadores):
+        # Suma aciertos y fallos de memos (ej: los de un proceso worker)
+        for nombre in contadores.keys():
+            if nombre not in self.memo.keys():
+                self.memo[nombre] = {"aciertos": 0, "fallos": 0}
+            self.memo[nombre]["aciertos"] += contadores[nombre]["aciertos"]
+            self.memo[nombre]["fallos"] += contadores[nombre]["fallos"]
+
+    def sumar_categorias(self, valores, desbordadas):
+        # Une los valores normalizados vistos por columna categorica
+        # valores: {columna: lista de valores}; desbordadas: columnas que
+        # superaron el limite del memo (la cardinalidad es un minimo)
+        for columna in valores.keys():
+            if columna not in self.categorias.keys():
+                self.categorias[columna] = set()
+            self.categorias[columna].update(valores[columna])
+        for columna in desbordadas:
+            if columna not in self.categorias_desbordadas:
+                self.categorias_desbordadas.append(columna)
+
+    def registrar_pipeline(self, datos):
+        # datos: esperas por etapa y profundidad de colas (pipeline.py)
+        self.pipeline = datos
+
+    def duracion_total(self):
+        # Segundos transcurridos desde que se creo el medidor
+        return time.perf_counter() - self.inicio
+
+    def detener(self):
+        # Detiene tracemalloc si lo inicio este medidor (se puede llamar varias
+        # veces; main lo llama siempre al terminar, aun si el workflow falla)
+        if self.inicio_tracemalloc:
+            tracemalloc.stop()
+            self.inicio_tracemalloc = False
+
+    def resumen(self, registros_total):
+        # Retorna el diccionario de metricas (seccion "metricas" del reporte)
+        # y detiene tracemalloc si lo inicio este medidor
+        duracion_total = self.duracion_total()
+        if self.medir_memoria and tracemalloc.is_tracing():
+            pico = tracemalloc.get_traced_memory()[1]
+            if pico > self.pico_total:
+                self.pico_total = pico
+        self.detener()
+        if self.funciones_memo != None:
+            actuales = contadores_memo(self.funciones_memo)
+            self.sumar_memo(restar_contadores(actuales, self.memo_inicial))
+            self.funciones_memo = None
+
+        # Las etapas se informan en el orden en que se midieron
+        etapas = {}
+        for etapa in self.orden:
+            datos = self.etapas[etapa]
+            salida = {
+                "duracion_s": round(datos["duracion_s"], 4),
+                "registros": datos["registros"],
+                "registros_por_s": calcular_por_segundo(
+                    datos["registros"], datos["duracion_s"]
+                ),
+            }
+            if "pico_memoria_mb" in datos.keys():
+                salida["pico_memoria_mb"] = datos["pico_memoria_mb"]
+            etapas[etapa] = salida
+
+        total = {
+            "duracion_s": round(duracion_total, 4),
+            "registros": registros_total,
+            "registros_por_s": calcular_por_segundo(registros_total, duracion_total),
+        }
+        if self.medir_memoria:
+            total["pico_memoria_mb"] = redondear_mb(self.pico_total)
+
+        resultado = {
+            "modo": self.modo,
+            "medicion_memoria": self.medir_memoria,
+            "etapas": etapas,
+            "total": total,
+        }
+        if len(self.memo) > 0:
+            memo = {}
+            for nombre in self.memo.keys():
+                datos = self.memo[nombre]
+                memo[nombre] = {
+                    "aciertos": datos["aciertos"],
+                    "fallos": datos["fallos"],
+                    "porcentaje_aciertos": calcular_porcentaje(
+                        datos["aciertos"], datos["aciertos"] + datos["fallos"]
+                    ),
+                }
+            resultado["memo"] = memo
+        if len(self.categorias) > 0:
+            cardinalidad = {}
+            for columna in self.categorias.keys():
+                cardinalidad[columna] = {
+                    "valores_distintos": len(self.categorias[columna]),
+                    "limite_alcanzado": columna in self.categorias_desbordadas,
+                }
+            resultado["cardinalidad"] = cardinalidad
+        if self.pipeline != None:
+            resultado["pipeline"] = self.pipeline
+        return resultado
+
+
+def contadores_memo(funciones):
+    # Lee aciertos y fallos acumulados de funciones con functools.lru_cache
+    # Retorna {nombre: {"aciertos": N, "fallos": N}}
+    contadores = {}
+    for nombre in funciones.keys():
+        info = funciones[nombre].cache_info()
+        contadores[nombre] = {"aciertos": info.hits, "fallos": info.misses}
+    return contadores
+
+
+def restar_contadores(actuales, iniciales):
+    # Aciertos y fallos ocurridos entre dos lecturas de contadores_memo
+    diferencia = {}
+    for nombre in actuales.keys():
+        diferencia[nombre] = {
+            "aciertos": actuales[nombre]["aciertos"] - iniciales[nombre]["aciertos"],
+            "fallos": actuales[nombre]["fallos"] - iniciales[nombre]["fallos"],
+        }
+    return diferencia
+
+
+def calcular_porcentaje(parte, total):
+    # Porcentaje con 1 decimal; 0.0 si el total es 0
+    if total <= 0:
+        return 0.0
+    return round((parte * 100.0) / total, 1)
+
+
+def calcular_por_segundo(registros, duracion):
+    # Registros por segundo (entero); 0 si la duracion es 0
+    if duracion <= 0:
+        return 0
+    return int(registros / duracion)
+
+
+def registrar_en_log(metricas_ejecucion):
+    # Loguea una linea INFO por etapa con duracion y registros/s, una por
+    # memo con su porcentaje de aciertos y una por columna categorica
+    etapas = metricas_ejecucion["etapas"]
+    for etapa in etapas.keys():
+        datos = etapas[etapa]
+        linea = (
+            "Etapa "
+            + etapa
+            + ": "
+            + str(datos["duracion_s"])
+            + "s - "
+            + str(datos["registros_por_s"])
+            + " registros/s"
+        )
+        if "pico_memoria_mb" in datos.keys():
+            linea = linea + " - pico memoria " + str(datos["pico_memoria_mb"]) + " MB"
+        logger.info(MODULO, linea)
+    if "memo" in metricas_ejecucion.keys():
+        memo = metricas_ejecucion["memo"]
+        for nombre in memo.keys():
+            datos = memo[nombre]
+            logger.info(
+                MODULO,
+                "Memo "
+                + nombre
+                + ": "
+                + str(datos["porcentaje_aciertos"])
+                + "% aciertos ("
+                + str(datos["aciertos"])
+                + " aciertos, "
+                + str(datos["fallos"])
+                + " fallos)",
+            )
+    if "cardinalidad" in metricas_ejecucion.keys():
+        cardinalidad = metricas_ejecucion["cardinalidad"]
+        for columna in cardinalidad.keys():
+            datos = cardinalidad[columna]
+            linea = (
+                "Cardinalidad "
+                + columna
+                + ": "
+                + str(datos["valores_distintos"])
+                + " valores distintos"
+            )
+            if datos["limite_alcanzado"]:
+                linea = linea + " (limite del memo alcanzado, es un minimo)"
+            logger.info(MODULO, linea)
+    if "pipeline" in metricas_ejecucion.keys():
+        registrar_pipeline_en_log(metricas_ejecucion["pipeline"])
+
+
+def registrar_pipeline_en_log(datos_pipeline):
+    # Loguea una linea INFO por etapa del pipeline con su tiempo de espera y
+    # una por cola con su profundidad
+    etapas = datos_pipeline["etapas"]
+    for etapa in etapas.keys():
+        datos = etapas[etapa]
+        logger.info(
+            MODULO,
+            "Pipeline "
+            + etapa
+            + ": ocupado "
+            + str(datos["ocupado_s"])
+            + "s, esperando entrada "
+            + str(datos["espera_entrada_s"])
+            + "s, esperando salida "
+            + str(datos["espera_salida_s"])
+            + "s",
+        )
+    colas = datos_pipeline["colas"]
+    for cola in colas.keys():
+        datos = colas[cola]
+        logger.info(
+            MODULO,
+            "Cola "
+            + cola
+            + ": "
+            + str(datos["lotes"])
+            + " lotes, profundidad maxima "
+            + str(datos["profundidad_max"])
+            + "/"
+            + str(datos["capacidad"])
+            + ", media "
+            + str(datos["profundidad_media"]),
+        )
+
+
+def guardar_metricas(metricas_ejecucion, archivo_entrada, carpeta_salida):
+    # Guarda las metricas en carpeta_salida/metricas.json
+    datos = {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "archivo_entrada": archivo_entrada,
+    }
+    for clave in metricas_ejecucion.keys():
+        datos[clave] = metricas_ejecucion[clave]
+    ruta = os.path.join(carpeta_salida, "metricas.json")
+    arch = open(ruta, "w", encoding="utf-8")
+    arch.write(json.dumps(datos, indent=4, ensure_ascii=False))
+    arch.close()
+    logger.info(MODULO, "Metricas de rendimiento guardadas: " + ruta)
+    return ruta
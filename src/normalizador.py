@@ -1,13 +1,40 @@
 # normalizador.py - Normalizacion de campos (RF-02)
 # Normaliza fechas, trimming, mayusculas/minusculas y campo calculado
 
+import functools
+import sys
+
 import logger
+import registro
 
 MODULO = "NORMALIZADOR"
 
 # Formatos de fecha que acepta el sistema
 # DD/MM/YYYY, YYYY-MM-DD, DD-MM-YYYY
 
+# Umbrales de monto para la categoria de riesgo (ver calcular_categoria_riesgo)
+UMBRAL_RIESGO_MEDIO = 50000
+UMBRAL_RIESGO_ALTO = 500000
+
+# Maximo de fechas distintas que se recuerdan ya normalizadas (memo LRU)
+# Los archivos reales repiten unos pocos cientos de fechas en millones de filas
+MAX_FECHAS_MEMO = 4096
+
+# Columnas categoricas (pocas decenas de valores distintos): cada valor crudo se
+# normaliza una sola vez y el resultado se interna con sys.intern, asi todos los
+# registros comparten el mismo objeto string
+COLUMNAS_CATEGORICAS = ["tipo_producto", "moneda", "pais"]
+
+# Maximo de valores crudos distintos que se recuerdan por columna; pasado el
+# limite los valores nuevos se normalizan sin guardarlos
+MAX_VALORES_CATEGORIA = 1000
+
+# Memo por columna: valor crudo (sin espacios) -> valor normalizado
+MEMO_CATEGORIAS = {"tipo_producto": {}, "moneda": {}, "pais": {}}
+
+# Columnas que llegaron a MAX_VALORES_CATEGORIA en la ejecucion
+CATEGORIAS_DESBORDADAS = []
+
 
 def detectar_formato_fecha(fecha):
     # Detecta el formato de una fecha y retorna sus partes (dia, mes, anio)
@@ -38,20 +65,15 @@ def detectar_formato_fecha(fecha):
     return None
 
 
-def normalizar_fecha(fecha, id_sol):
-    # Convierte una fecha a formato DD/MM/YYYY
-    # Retorna la fecha normalizada o la original si no se puede convertir
+@functools.lru_cache(maxsize=MAX_FECHAS_MEMO)
+def resolver_fecha(fecha):
+    # Convierte una fecha a formato DD/MM/YYYY sin loguear, con memo por texto
+    # Retorna (resultado, evento): evento es el tipo de WARN a registrar
+    # ("fecha no reconocida", "fecha con valores invalidos", "fecha convertida")
+    # o None. Si no se puede convertir, resultado es la fecha original
     partes = detectar_formato_fecha(fecha)
     if partes == None:
-        logger.warn(
-            MODULO,
-            "Formato de fecha no reconocido en registro "
-            + id_sol
-            + ": '"
-            + fecha
-            + "'",
-        )
-        return fecha
+        return fecha, "fecha no reconocida"
 
     dia = partes[0]
     mes = partes[1]
@@ -67,18 +89,51 @@ def normalizar_fecha(fecha, id_sol):
         es_valida = False
 
     if not es_valida:
-        logger.warn(
-            MODULO,
-            "Fecha con valores invalidos en registro " + id_sol + ": '" + fecha + "'",
-        )
-        return fecha
+        return fecha, "fecha con valores invalidos"
 
     resultado = dia + "/" + mes + "/" + anio
 
-    # Loguear si la fecha fue convertida (estaba en otro formato)
+    # La fecha fue convertida (estaba en otro formato)
     if resultado != fecha.strip():
-        logger.warn(
+        return resultado, "fecha convertida"
+
+    return resultado, None
+
+
+def normalizar_fecha(fecha, id_sol):
+    # Convierte una fecha a formato DD/MM/YYYY
+    # Retorna la fecha normalizada o la original si no se puede convertir
+    # El parseo se memoiza en resolver_fecha; los WARN se registran siempre
+    # porque llevan el id del registro
+    resultado, evento = resolver_fecha(fecha)
+    if evento != None:
+        registrar_evento_fecha(evento, fecha, resultado, id_sol)
+    return resultado
+
+
+def registrar_evento_fecha(evento, fecha, resultado, id_sol):
+    # Loguea el WARN de una fecha no reconocida, invalida o convertida
+    # evento: tipo retornado por resolver_fecha
+    if evento == "fecha no reconocida":
+        logger.warn_agregado(
+            MODULO,
+            evento,
+            "Formato de fecha no reconocido en registro "
+            + id_sol
+            + ": '"
+            + fecha
+            + "'",
+        )
+    elif evento == "fecha con valores invalidos":
+        logger.warn_agregado(
             MODULO,
+            evento,
+            "Fecha con valores invalidos en registro " + id_sol + ": '" + fecha + "'",
+        )
+    else:
+        logger.warn_agregado(
+            MODULO,
+            evento,
             "Fecha convertida en registro "
             + id_sol
             + ": '"
@@ -88,96 +143,137 @@ def normalizar_fecha(fecha, id_sol):
             + "'",
         )
 
-    return resultado
-
 
 def calcular_categoria_riesgo(monto):
     # Deriva la categoria de riesgo segun el monto
-    # BAJO: <= 50000, MEDIO: > 50000 y <= 500000, ALTO: > 500000
+    # BAJO: <= UMBRAL_RIESGO_MEDIO, MEDIO: > UMBRAL_RIESGO_MEDIO y
+    # <= UMBRAL_RIESGO_ALTO, ALTO: > UMBRAL_RIESGO_ALTO
     cat = "BAJO"
-    if monto > 500000:
+    if monto > UMBRAL_RIESGO_ALTO:
         cat = "ALTO"
-    elif monto > 50000:
+    elif monto > UMBRAL_RIESGO_MEDIO:
         cat = "MEDIO"
     return cat
 
 
-def normalizar_registros(registros):
-    # Normaliza todos los campos de cada registro
-    # Retorna la lista de registros normalizados
-    resultado = []
+def titulo_pais(pais):
+    # pais con primera letra mayuscula en cada palabra (Title Case manual)
+    palabras = pais.split(" ")
+    ls_pal = []
+    for p in palabras:
+        if len(p) > 0:
+            pal = p[0].upper() + p[1:].lower()
+            ls_pal.append(pal)
+    return " ".join(ls_pal)
 
-    for reg in registros:
+
+def normalizar_categoria(columna, valor):
+    # Normaliza un valor de una columna categorica usando el memo de la columna
+    # tipo_producto y moneda en MAYUSCULAS, pais en Title Case
+    memo = MEMO_CATEGORIAS[columna]
+    normalizado = memo.get(valor)
+    if normalizado != None:
+        return normalizado
+    if columna == "pais":
+        normalizado = titulo_pais(valor)
+    else:
+        normalizado = valor.upper()
+    if len(memo) < MAX_VALORES_CATEGORIA:
+        normalizado = sys.intern(normalizado)
+        memo[valor] = normalizado
+    elif columna not in CATEGORIAS_DESBORDADAS:
+        CATEGORIAS_DESBORDADAS.append(columna)
+    return normalizado
+
+
+def reiniciar_categorias():
+    # Vacia los memos de columnas categoricas (al iniciar cada ejecucion, para
+    # que la cardinalidad informada sea la del archivo)
+    for columna in COLUMNAS_CATEGORICAS:
+        MEMO_CATEGORIAS[columna].clear()
+    del CATEGORIAS_DESBORDADAS[:]
+
+
+def valores_categorias():
+    # Retorna {columna: lista ordenada de valores normalizados vistos} y la
+    # lista de columnas que superaron MAX_VALORES_CATEGORIA
+    valores = {}
+    for columna in COLUMNAS_CATEGORICAS:
+        valores[columna] = sorted(set(MEMO_CATEGORIAS[columna].values()))
+    return valores, list(CATEGORIAS_DESBORDADAS)
+
+
+def normalizar_registro(reg, compacto=False):
+    # Normaliza todos los campos de un registro
+    # Retorna un registro nuevo (no modifica el original)
+    # compacto: el registro nuevo es un registro.RegistroCompacto en lugar de
+    # un dict (menos memoria cuando se guardan todos los registros)
+    if compacto:
+        d = registro.RegistroCompacto()
+    else:
         d = {}
 
-        # Copiar todos los campos con trimming
-        for campo in reg.keys():
-            valor = reg[campo]
-            if valor != None:
-                valor = valor.strip()
-            d[campo] = valor
+    # Copiar todos los campos con trimming
+    for campo in reg.keys():
+        valor = reg[campo]
+        if valor != None:
+            valor = valor.strip()
+        d[campo] = valor
+
+    # Obtener id para logs
+    if "id_solicitud" in d.keys():
+        id_sol = d["id_solicitud"]
+    else:
+        id_sol = "DESCONOCIDO"
+
+    # Normalizar fecha
+    if "fecha_solicitud" in d.keys() and d["fecha_solicitud"] != "":
+        d["fecha_solicitud"] = normalizar_fecha(d["fecha_solicitud"], id_sol)
 
-        # Obtener id para logs
-        if "id_solicitud" in d.keys():
-            id_sol = d["id_solicitud"]
+    # tipo_producto y moneda en MAYUSCULAS, pais en Title Case
+    for columna in COLUMNAS_CATEGORICAS:
+        if columna in d.keys() and d[columna] != "":
+            d[columna] = normalizar_categoria(columna, d[columna])
+
+    # Campo calculado: categoria_riesgo
+    d["categoria_riesgo"] = ""
+    if "monto_o_limite" in d.keys() and d["monto_o_limite"] != "":
+        es_numero = True
+        val = d["monto_o_limite"]
+        # Verificar si es numero (puede ser negativo)
+        if val == "":
+            es_numero = False
+        elif val[0] == "-":
+            rest = val[1:]
+            if rest == "" or not rest.isdigit():
+                es_numero = False
         else:
-            id_sol = "DESCONOCIDO"
-
-        # Normalizar fecha
-        if "fecha_solicitud" in d.keys() and d["fecha_solicitud"] != "":
-            d["fecha_solicitud"] = normalizar_fecha(d["fecha_solicitud"], id_sol)
-
-        # tipo_producto y moneda en MAYUSCULAS
-        if "tipo_producto" in d.keys() and d["tipo_producto"] != "":
-            d["tipo_producto"] = d["tipo_producto"].upper()
-
-        if "moneda" in d.keys() and d["moneda"] != "":
-            d["moneda"] = d["moneda"].upper()
-
-        # pais con primera letra mayuscula (Title Case)
-        if "pais" in d.keys() and d["pais"] != "":
-            d["pais"] = d["pais"].strip()
-            # Title case manual
-            palabras = d["pais"].split(" ")
-            ls_pal = []
-            for p in palabras:
-                if len(p) > 0:
-                    pal = p[0].upper() + p[1:].lower()
-                    ls_pal.append(pal)
-            # Unir palabras con espacio usando concatenacion
-            pais_final = ""
-            idx = 0
-            for p in ls_pal:
-                if idx > 0:
-                    pais_final = pais_final + " "
-                pais_final = pais_final + p
-                idx += 1
-            d["pais"] = pais_final
-
-        # Campo calculado: categoria_riesgo
-        d["categoria_riesgo"] = ""
-        if "monto_o_limite" in d.keys() and d["monto_o_limite"] != "":
-            es_numero = True
-            val = d["monto_o_limite"]
-            # Verificar si es numero (puede ser negativo)
-            if val == "":
+            rest = val
+            if not rest.isdigit():
                 es_numero = False
-            elif val[0] == "-":
-                rest = val[1:]
-                if rest == "" or not rest.isdigit():
-                    es_numero = False
-            else:
-                rest = val
-                if not rest.isdigit():
-                    es_numero = False
-            if es_numero:
-                monto = int(val)
-                d["categoria_riesgo"] = calcular_categoria_riesgo(monto)
-
-        resultado.append(d)
+        if es_numero:
+            monto = int(val)
+            d["categoria_riesgo"] = calcular_categoria_riesgo(monto)
+
+    return d
+
 
+def registrar_resumen(total):
+    # Loguea el cierre de la etapa de normalizacion
     logger.info(
         MODULO,
-        "Normalizacion completada - " + str(len(resultado)) + " registros normalizados",
+        "Normalizacion completada - " + str(total) + " registros normalizados",
     )
+
+
+def normalizar_registros(registros, compacto=False):
+    # Normaliza todos los campos de cada registro
+    # Retorna la lista de registros normalizados
+    # compacto: registros RegistroCompacto en lugar de dicts
+    resultado = []
+
+    for reg in registros:
+        resultado.append(normalizar_registro(reg, compacto))
+
+    registrar_resumen(len(resultado))
     return resultado
@@ -0,0 +1,203 @@
+# paralelo.py - Ejecucion multi-proceso por fragmentos (RF-05)
+# Divide un archivo CSV/TXT/JSONL en rangos de bytes alineados a inicio de linea y
+# procesa cada rango (normalizacion, validacion, calidad y exportacion) en un
+# proceso separado. Los resultados se unen en el orden original del archivo.
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import calidad
+import indice
+import ingesta
+import logger
+import metricas
+import normalizador
+
+MODULO = "PARALELO"
+
+# Formatos que se pueden dividir por lineas (JSON es un unico array)
+FORMATOS_FRAGMENTABLES = ["csv", "txt", "jsonl"]
+
+# Fragmentos por worker: mas fragmentos que procesos reparte mejor la carga
+FRAGMENTOS_POR_WORKER = 4
+
+
+def calcular_fragmentos(archivo, offset_datos, cantidad, tabla=None):
+    # Divide [offset_datos, fin de archivo) en hasta `cantidad` rangos de bytes
+    # de tamano similar, cada uno empezando en un inicio de linea
+    # tabla: tabla de offsets de lineas (indice.py); si se pasa, los inicios de
+    # linea se buscan en la tabla sin leer el archivo (mismos fragmentos)
+    # Retorna lista de tuplas (inicio, fin)
+    tamano = os.path.getsize(archivo)
+    if cantidad < 1:
+        cantidad = 1
+    arch = None
+    if tabla == None:
+        arch = open(archivo, "rb")
+    limites = [offset_datos]
+    i = 1
+    while i < cantidad:
+        objetivo = offset_datos + ((tamano - offset_datos) * i) // cantidad
+        if tabla == None:
+            pos = ingesta.alinear_a_linea(arch, objetivo)
+        else:
+            pos = indice.alinear_a_linea(tabla, objetivo)
+        # Descartar limites repetidos (lineas mas largas que un fragmento)
+        if pos > limites[-1] and pos < tamano:
+            limites.append(pos)
+        i += 1
+    if arch != None:
+        arch.close()
+    limites.append(tamano)
+
+    fragmentos = []
+    i = 0
+    while i < len(limites) - 1:
+        fragmentos.append((limites[i], limites[i + 1]))
+        i += 1
+    return fragmentos
+
+
+def procesar_fragmento(tarea):
+    # Se ejecuta en un proceso worker: procesa un rango de bytes del archivo
+    # y escribe sus filas (sin header) en tarea["ruta_salida"], en el formato
+    # tarea["formato_salida"]
+    # Retorna (acumulador, estadisticas): el AcumuladorCalidad del fragmento y
+    # los contadores del worker para las metricas: aciertos/fallos de los memos
+    # de main.FUNCIONES_MEMO en el fragmento y valores de columnas categoricas
+    import main
+
+    carpeta_log = os.path.dirname(tarea["ruta_log"])
+    nombre_log = os.path.basename(tarea["ruta_log"])
+    logger.inicializar(carpeta_log, nombre_log, asincronico=True)
+    logger.configurar_agregacion(tarea["max_warn"])
+    try:
+        memo_inicial = metricas.contadores_memo(main.FUNCIONES_MEMO)
+        acumulador = calidad.AcumuladorCalidad()
+        registros = ingesta.iter_rango_bytes(
+            tarea["archivo"],
+            tarea["formato"],
+            tarea["header"],
+            tarea["inicio"],
+            tarea["fin"],
+        )
+        main.exportar_registros(
+            main.flujo_registros(registros, acumulador),
+            tarea["ruta_salida"],
+            tarea["formato_salida"],
+            con_header=False,
+        )
+        logger.emitir_resumen_suprimidos()
+        valores, desbordadas = normalizador.valores_categorias()
+        estadisticas = {
+            "memo": metricas.restar_contadores(
+                metricas.contadores_memo(main.FUNCIONES_MEMO), memo_inicial
+            ),
+            "categorias": valores,
+            "categorias_desbordadas": desbordadas,
+        }
+    finally:
+        logger.cerrar()
+    return acumulador, estadisticas
+
+
+def anexar_logs(rutas_logs):
+    # Agrega al log activo el contenido de los logs de cada fragmento, en orden,
+    # y borra los archivos de fragmento
+    logger.flush()
+    destino = open(logger.ARCHIVO_LOG, "a", encoding="utf-8")
+    for ruta in rutas_logs:
+        if not os.path.exists(ruta):
+            continue
+        arch = open(ruta, "r", encoding="utf-8")
+        destino.write(arch.read())
+        arch.close()
+        os.remove(ruta)
+    destino.close()
+
+
+def ejecutar_en_paralelo(
+    archivo,
+    formato,
+    carpeta,
+    workers,
+    max_warn,
+    formato_salida="csv",
+    comprimir_salida=False,
+    tabla=None,
+):
+    # Procesa un archivo CSV/TXT/JSONL con `workers` procesos
+    # comprimir_salida: cada parcial se escribe como un miembro gzip
+    # tabla: tabla de offsets de lineas (indice.py) para calcular los fragmentos
+    # Retorna (acumulador, rutas_salida, estadisticas): el AcumuladorCalidad de
+    # todo el archivo, las salidas parciales sin header, en el orden del
+    # archivo, y la lista de estadisticas de cada fragmento (procesar_fragmento)
+    acumulador = calidad.AcumuladorCalidad()
+    lectura = ingesta.leer_header(archivo, formato)
+    if lectura == None:
+        return acumulador, [], []
+    header = lectura[0]
+    offset_datos = lectura[1]
+
+    fragmentos = calcular_fragmentos(
+        archivo, offset_datos, workers * FRAGMENTOS_POR_WORKER, tabla
+    )
+    logger.info(
+        MODULO,
+        "Procesando "
+        + str(len(fragmentos))
+        + " fragmentos con "
+        + str(workers)
+        + " workers",
+    )
+
+    # El limite de WARN por tipo se reparte entre los fragmentos para que el
+    # log total tenga un volumen similar al de una ejecucion en un solo proceso
+    max_warn_fragmento = max_warn
+    if max_warn > 0:
+        max_warn_fragmento = -(-max_warn // len(fragmentos))
+
+    extension_salida = "." + formato_salida
+    if comprimir_salida:
+        extension_salida = extension_salida + ".gz"
+
+    tareas = []
+    rutas_salida = []
+    rutas_logs = []
+    i = 0
+    while i < len(fragmentos):
+        ruta_salida = os.path.join(carpeta, "fragmento_" + str(i) + extension_salida)
+        ruta_log = os.path.join(carpeta, "fragmento_" + str(i) + ".log")
+        tareas.append(
+            {
+                "archivo": archivo,
+                "formato": formato,
+                "header": header,
+                "inicio": fragmentos[i][0],
+                "fin": fragmentos[i][1],
+                "ruta_salida": ruta_salida,
+                "ruta_log": ruta_log,
+                "max_warn": max_warn_fragmento,
+                "formato_salida": formato_salida,
+            }
+        )
+        rutas_salida.append(ruta_salida)
+        rutas_logs.append(ruta_log)
+        i += 1
+
+    # "spawn" evita heredar el hilo del logger asincronico del proceso principal
+    contexto = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=contexto)
+    try:
+        # map respeta el orden de las tareas, que es el orden del archivo
+        parciales = list(executor.map(procesar_fragmento, tareas))
+    finally:
+        executor.shutdown()
+        anexar_logs(rutas_logs)
+
+    estadisticas = []
+    for parcial in parciales:
+        acumulador.fusionar(parcial[0])
+        estadisticas.append(parcial[1])
+    return acumulador, rutas_salida, estadisticas
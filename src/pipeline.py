@@ -0,0 +1,252 @@
+# pipeline.py - Ejecucion por etapas concurrentes con colas acotadas (--pipeline)
+# Ingesta, normalizacion+validacion (con calidad) y exportacion corren a la vez,
+# conectadas por colas de lotes de registros con capacidad fija: la lectura del
+# archivo y la escritura de la salida se solapan con el procesamiento, y si una
+# etapa va mas lenta las anteriores se bloquean al llenar su cola (la memoria
+# queda acotada). Se mide cuanto espera cada etapa y cuan llenas van las colas
+
+import itertools
+import queue
+import threading
+import time
+
+import procesador
+
+MODULO = "PIPELINE"
+
+# Registros que viajan juntos por las colas (un put/get por lote, no por fila)
+REGISTROS_POR_LOTE = 1000
+
+# Lotes que entran en cada cola antes de bloquear a la etapa que la llena
+CAPACIDAD_COLA = 8
+
+# Segundos entre chequeos de cancelacion mientras una etapa espera en una cola
+ESPERA_CANCELACION = 0.1
+
+# Etapas en orden y la cola que conecta cada una con la siguiente
+ETAPAS_PIPELINE = ["ingesta", "normalizacion_validacion", "exportacion"]
+COLAS_PIPELINE = ["ingesta_a_procesamiento", "procesamiento_a_exportacion"]
+
+
+class ColaMedida:
+    # Cola acotada de lotes que mide la profundidad (lotes encolados despues de
+    # cada put) y cuanto esperan las etapas que la llenan y la vacian
+    # Fin de los datos: el lote None. Error en una etapa: se encola la excepcion
+
+    def __init__(self, capacidad, cancelado):
+        self.cola = queue.Queue(maxsize=capacidad)
+        self.capacidad = capacidad
+        self.cancelado = cancelado
+        self.lotes = 0
+        self.profundidad_max = 0
+        self.suma_profundidad = 0
+
+    def poner(self, item):
+        # Encola un item; bloquea mientras la cola este llena
+        # Retorna los segundos de espera, o None si el pipeline se cancelo
+        inicio = time.perf_counter()
+        while True:
+            try:
+                self.cola.put(item, timeout=ESPERA_CANCELACION)
+                break
+            except queue.Full:
+                if self.cancelado.is_set():
+                    return None
+        espera = time.perf_counter() - inicio
+        # Solo los lotes de registros cuentan para la profundidad (no el fin
+        # de datos ni un error)
+        if type(item) == list:
+            profundidad = self.cola.qsize()
+            self.lotes += 1
+            self.suma_profundidad += profundidad
+            if profundidad > self.profundidad_max:
+                self.profundidad_max = profundidad
+        return espera
+
+    def tomar(self):
+        # Desencola un item; bloquea mientras la cola este vacia
+        # Retorna (item, segundos de espera); item None si se cancelo
+        inicio = time.perf_counter()
+        while True:
+            try:
+                item = self.cola.get(timeout=ESPERA_CANCELACION)
+                break
+            except queue.Empty:
+                if self.cancelado.is_set():
+                    item = None
+                    break
+        return item, time.perf_counter() - inicio
+
+    def resumen(self):
+        # Diccionario de la cola para las metricas
+        media = 0.0
+        if self.lotes > 0:
+            media = round(self.suma_profundidad / self.lotes, 2)
+        return {
+            "capacidad": self.capacidad,
+            "lotes": self.lotes,
+            "profundidad_max": self.profundidad_max,
+            "profundidad_media": media,
+        }
+
+
+def nueva_etapa():
+    # Contadores de una etapa: tiempo trabajando y esperando en cada cola
+    return {"ocupado_s": 0.0, "espera_entrada_s": 0.0, "espera_salida_s": 0.0}
+
+
+def etapa_ingesta(iterador, leidos, salida, etapa):
+    # Hilo de ingesta: arma lotes de REGISTROS_POR_LOTE registros leidos
+    # leidos: registros ya tomados de `iterador` que van primero
+    reloj = time.perf_counter
+    try:
+        lote = []
+        t0 = reloj()
+        for reg in itertools.chain(leidos, iterador):
+            lote.append(reg)
+            if len(lote) >= REGISTROS_POR_LOTE:
+                etapa["ocupado_s"] += reloj() - t0
+                espera = salida.poner(lote)
+                if espera == None:
+                    return
+                etapa["espera_salida_s"] += espera
+                lote = []
+                t0 = reloj()
+        etapa["ocupado_s"] += reloj() - t0
+        if len(lote) > 0:
+            espera = salida.poner(lote)
+            if espera == None:
+                return
+            etapa["espera_salida_s"] += espera
+        salida.poner(None)
+    except Exception as e:
+        # El error (ej: JSON invalido a mitad del archivo) se relanza en el
+        # hilo que consume la salida
+        salida.poner(e)
+    finally:
+        # Si se cancelo a mitad de la lectura, cerrar el archivo en este hilo
+        # (se cierra el generador de la ingesta, no un envoltorio sin close)
+        if hasattr(iterador, "close"):
+            iterador.close()
+
+
+def etapa_procesamiento(entrada, salida, acumulador, etapa, tiempos, cancelado):
+    # Hilo de procesamiento: normaliza y valida cada lote (una sola pasada, ver
+    # procesador.py) y lo suma al acumulador de calidad, en el orden de llegada
+    reloj = time.perf_counter
+    try:
+        while True:
+            lote, espera = entrada.tomar()
+            etapa["espera_entrada_s"] += espera
+            if lote == None or isinstance(lote, Exception):
+                if not cancelado.is_set():
+                    salida.poner(lote)
+                return
+            t0 = reloj()
+            procesados = []
+            for reg in lote:
+                procesados.append(procesador.procesar_registro(reg))
+            t1 = reloj()
+            for reg in procesados:
+                acumulador.agregar(reg)
+            t2 = reloj()
+            tiempos["normalizacion_validacion"] += t1 - t0
+            tiempos["calidad"] += t2 - t1
+            etapa["ocupado_s"] += t2 - t0
+            espera = salida.poner(procesados)
+            if espera == None:
+                return
+            etapa["espera_salida_s"] += espera
+    except Exception as e:
+        salida.poner(e)
+
+
+def flujo_pipeline(iterador, acumulador, estadisticas, leidos=None):
+    # Generador: entrega los registros normalizados, validados y sumados al
+    # acumulador, en el orden del archivo, mientras la ingesta y el
+    # procesamiento corren en hilos propios. El consumidor (la exportacion)
+    # es la tercera etapa
+    # estadisticas: diccionario que se completa al terminar con "tiempos"
+    # (segundos por etapa medidos como en main.flujo_registros) y "pipeline"
+    # (espera por etapa y profundidad de cada cola)
+    # leidos: registros ya tomados de `iterador` (ej: el primero, leido para
+    # detectar un archivo vacio) que se entregan antes que el resto
+    # Si el consumidor deja de iterar (error al escribir), los hilos se cancelan
+    # y se cierra `iterador` (y con el, el archivo de entrada)
+    if leidos == None:
+        leidos = []
+    cancelado = threading.Event()
+    colas = [
+        ColaMedida(CAPACIDAD_COLA, cancelado),
+        ColaMedida(CAPACIDAD_COLA, cancelado),
+    ]
+    etapas = {}
+    for nombre in ETAPAS_PIPELINE:
+        etapas[nombre] = nueva_etapa()
+    tiempos = {"normalizacion_validacion": 0.0, "calidad": 0.0}
+    hilos = [
+        threading.Thread(
+            target=etapa_ingesta,
+            args=(iterador, leidos, colas[0], etapas["ingesta"]),
+            daemon=True,
+        ),
+        threading.Thread(
+            target=etapa_procesamiento,
+            args=(
+                colas[0],
+                colas[1],
+                acumulador,
+                etapas["normalizacion_validacion"],
+                tiempos,
+                cancelado,
+            ),
+            daemon=True,
+        ),
+    ]
+    for hilo in hilos:
+        hilo.start()
+
+    reloj = time.perf_counter
+    exportacion = etapas["exportacion"]
+    try:
+        while True:
+            lote, espera = colas[1].tomar()
+            exportacion["espera_entrada_s"] += espera
+            if lote == None:
+                break
+            if isinstance(lote, Exception):
+                raise lote
+            t0 = reloj()
+            for reg in lote:
+                yield reg
+            exportacion["ocupado_s"] += reloj() - t0
+    finally:
+        cancelado.set()
+        for hilo in hilos:
+            hilo.join()
+        tiempos["ingesta"] = etapas["ingesta"]["ocupado_s"]
+        estadisticas["tiempos"] = tiempos
+        estadisticas["pipeline"] = resumen_pipeline(etapas, colas)
+
+
+def resumen_pipeline(etapas, colas):
+    # Diccionario "pipeline" de las metricas: tamano de lote, espera de cada
+    # etapa (entrada vacia / salida llena) y profundidad de cada cola
+    salida_etapas = {}
+    for nombre in ETAPAS_PIPELINE:
+        datos = etapas[nombre]
+        salida_etapas[nombre] = {
+            "ocupado_s": round(datos["ocupado_s"], 4),
+            "espera_entrada_s": round(datos["espera_entrada_s"], 4),
+            "espera_salida_s": round(datos["espera_salida_s"], 4),
+        }
+    salida_colas = {}
+    i = 0
+    while i < len(COLAS_PIPELINE):
+        salida_colas[COLAS_PIPELINE[i]] = colas[i].resumen()
+        i += 1
+    return {
+        "registros_por_lote": REGISTROS_POR_LOTE,
+        "etapas": salida_etapas,
+        "colas": salida_colas,
+    }
@@ -0,0 +1,82 @@
+# procesador.py - Normalizacion y validacion en una sola pasada
+# Hace lo mismo que normalizador.normalizar_registro seguido de
+# validador.validar_registro, pero parsea cada campo una sola vez: la fecha se
+# resuelve una vez y de ese resultado sale su validez para R2, y el monto se
+# convierte una vez para categoria_riesgo y R3. La salida (registro, mascara,
+# motivos y WARN del log) es la misma que la del camino de dos etapas
+
+import normalizador
+import registro
+import validador
+
+MODULO = "PROCESADOR"
+
+# Eventos de resolver_fecha que dejan una fecha DD/MM/YYYY valida (R2 pasa)
+EVENTOS_FECHA_VALIDA = [None, "fecha convertida"]
+
+
+def procesar_registro(reg, compacto=False):
+    # Normaliza y valida un registro crudo
+    # Retorna un registro nuevo con los campos normalizados, categoria_riesgo,
+    # estado, motivos_falla y _fallas (no modifica el original)
+    # compacto: el registro nuevo es un registro.RegistroCompacto
+    if compacto:
+        d = registro.RegistroCompacto()
+    else:
+        d = {}
+
+    # Copiar todos los campos con trimming
+    for campo in reg.keys():
+        valor = reg[campo]
+        if valor != None:
+            valor = valor.strip()
+        d[campo] = valor
+
+    # Obtener id para logs
+    if "id_solicitud" in d.keys():
+        id_sol = d["id_solicitud"]
+    else:
+        id_sol = "DESCONOCIDO"
+
+    fallas = 0
+
+    # Fecha: un solo parseo (memoizado); el evento dice si quedo valida
+    if "fecha_solicitud" in d.keys() and d["fecha_solicitud"] != "":
+        fecha = d["fecha_solicitud"]
+        resultado, evento = normalizador.resolver_fecha(fecha)
+        if evento != None:
+            normalizador.registrar_evento_fecha(evento, fecha, resultado, id_sol)
+        d["fecha_solicitud"] = resultado
+        if evento not in EVENTOS_FECHA_VALIDA:
+            fallas = fallas | validador.BITS_REGLAS["R2"]
+
+    # tipo_producto y moneda en MAYUSCULAS, pais en Title Case
+    for columna in normalizador.COLUMNAS_CATEGORICAS:
+        if columna in d.keys() and d[columna] != "":
+            d[columna] = normalizador.normalizar_categoria(columna, d[columna])
+
+    moneda = d.get("moneda")
+    if moneda != None and moneda != "":
+        if moneda not in validador.MONEDAS_SOPORTADAS:
+            fallas = fallas | validador.BITS_REGLAS["R2"]
+
+    # Monto: una sola conversion para categoria_riesgo y R3
+    d["categoria_riesgo"] = ""
+    if "monto_o_limite" in d.keys() and d["monto_o_limite"] != "":
+        monto = validador.convertir_monto(d["monto_o_limite"])
+        if monto == None:
+            fallas = fallas | validador.BITS_REGLAS["R3"]
+        else:
+            d["categoria_riesgo"] = normalizador.calcular_categoria_riesgo(monto)
+            if monto <= 0 or monto > validador.MONTO_MAXIMO:
+                fallas = fallas | validador.BITS_REGLAS["R3"]
+
+    # R1: los valores ya estan sin espacios, alcanza con comparar contra ""
+    for campo in validador.CAMPOS_OBLIGATORIOS:
+        valor = d.get(campo)
+        if valor == None or valor == "":
+            fallas = fallas | validador.BITS_REGLAS["R1"]
+            break
+
+    validador.marcar_resultado(d, fallas)
+    return d
@@ -0,0 +1,80 @@
+# registro.py - Registro compacto con __slots__ (opcional, --compacto)
+# Un dict por fila con 13 claves ocupa varias veces mas memoria que un objeto
+# con atributos fijos. RegistroCompacto guarda los campos del esquema en
+# __slots__ y expone la parte de la API de dict que usan normalizador,
+# validador, calidad y la exportacion, asi los modulos no cambian
+
+import ingesta
+
+# Esquema: campos de entrada + campos que agregan normalizacion y validacion
+CAMPOS_REGISTRO = ingesta.CAMPOS + [
+    "categoria_riesgo",
+    "estado",
+    "motivos_falla",
+    "_fallas",
+]
+
+# Conjunto para chequear pertenencia al esquema en O(1)
+CAMPOS_FIJOS = frozenset(CAMPOS_REGISTRO)
+
+
+class RegistroCompacto:
+    # Registro con un atributo por campo del esquema en lugar de un dict
+    # Soporta reg[campo], reg[campo] = valor, campo in reg, reg.keys(),
+    # reg.get(campo) y dict(reg). Un campo del esquema sin asignar no existe
+    # (igual que una clave ausente); los campos fuera del esquema (columnas
+    # extra de un JSON) se guardan en el dict _extras, creado solo si hace falta
+
+    __slots__ = tuple(CAMPOS_REGISTRO) + ("_extras",)
+
+    def __init__(self):
+        self._extras = None
+
+    def __getitem__(self, campo):
+        if campo in CAMPOS_FIJOS:
+            try:
+                return getattr(self, campo)
+            except AttributeError:
+                raise KeyError(campo)
+        if self._extras == None or campo not in self._extras:
+            raise KeyError(campo)
+        return self._extras[campo]
+
+    def __setitem__(self, campo, valor):
+        if campo in CAMPOS_FIJOS:
+            setattr(self, campo, valor)
+            return
+        if self._extras == None:
+            self._extras = {}
+        self._extras[campo] = valor
+
+    def __contains__(self, campo):
+        if campo in CAMPOS_FIJOS:
+            return hasattr(self, campo)
+        return self._extras != None and campo in self._extras
+
+    def get(self, campo, defecto=None):
+        if campo in CAMPOS_FIJOS:
+            return getattr(self, campo, defecto)
+        if self._extras == None:
+            return defecto
+        return self._extras.get(campo, defecto)
+
+    def keys(self):
+        # Como dict.keys() retorna una vista: el propio registro. Asi
+        # `campo in reg.keys()` usa __contains__ sin armar la lista de campos
+        return self
+
+    def __iter__(self):
+        # Campos asignados: primero los del esquema (en su orden), luego extras
+        campos = []
+        for campo in CAMPOS_REGISTRO:
+            if hasattr(self, campo):
+                campos.append(campo)
+        if self._extras != None:
+            for campo in self._extras.keys():
+                campos.append(campo)
+        return iter(campos)
+
+    def __len__(self):
+        return len(list(iter(self)))
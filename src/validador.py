@@ -1,6 +1,8 @@
 # validador.py - Validacion de reglas de elegibilidad (RF-03)
 # Aplica 3 reglas de validacion a cada registro
 
+import functools
+
 import logger
 
 MODULO = "VALIDADOR"
@@ -19,6 +21,12 @@ CAMPOS_OBLIGATORIOS = [
     "pais",
 ]
 
+# Monto maximo aceptado por R3 (el minimo es > 0)
+MONTO_MAXIMO = 999999999
+
+# Maximo de fechas distintas cuyo resultado de R2 se recuerda (memo LRU)
+MAX_FECHAS_MEMO = 4096
+
 
 def validar_r1(reg):
     # R1: Campos obligatorios presentes y no vacios
@@ -32,6 +40,26 @@ def validar_r1(reg):
     return motivos
 
 
+@functools.lru_cache(maxsize=MAX_FECHAS_MEMO)
+def es_fecha_valida(fecha):
+    # Despues de normalizacion la fecha deberia estar en DD/MM/YYYY
+    # Retorna True si tiene ese formato y dia/mes en rango (memo por texto)
+    if len(fecha) != 10:
+        return False
+    if fecha[2] != "/" or fecha[5] != "/":
+        return False
+    dia = fecha[0:2]
+    mes = fecha[3:5]
+    anio = fecha[6:10]
+    if not dia.isdigit() or not mes.isdigit() or not anio.isdigit():
+        return False
+    if int(dia) < 1 or int(dia) > 31:
+        return False
+    if int(mes) < 1 or int(mes) > 12:
+        return False
+    return True
+
+
 def validar_r2(reg):
     # R2: Formato de fecha valido y moneda en lista soportada
     # Retorna lista de motivos de falla (vacia si pasa)
@@ -43,23 +71,7 @@ def validar_r2(reg):
     else:
         fecha = ""
     if fecha != "":
-        # Despues de normalizacion deberia estar en DD/MM/YYYY
-        es_valida = True
-        if len(fecha) != 10:
-            es_valida = False
-        elif fecha[2] != "/" or fecha[5] != "/":
-            es_valida = False
-        else:
-            dia = fecha[0:2]
-            mes = fecha[3:5]
-            anio = fecha[6:10]
-            if not dia.isdigit() or not mes.isdigit() or not anio.isdigit():
-                es_valida = False
-            elif int(dia) < 1 or int(dia) > 31:
-                es_valida = False
-            elif int(mes) < 1 or int(mes) > 12:
-                es_valida = False
-        if not es_valida:
+        if not es_fecha_valida(fecha):
             motivos.append("formato de fecha invalido: '" + fecha + "'")
 
     # Validar moneda
@@ -73,8 +85,23 @@ def validar_r2(reg):
     return motivos
 
 
+def convertir_monto(texto):
+    # Convierte un monto entero (puede ser negativo) a int
+    # Retorna None si no es numerico
+    val = texto.strip()
+    if val == "":
+        return None
+    if val[0] == "-":
+        rest = val[1:]
+        if rest == "" or not rest.isdigit():
+            return None
+    elif not val.isdigit():
+        return None
+    return int(val)
+
+
 def validar_r3(reg):
-    # R3: Rango de monto valido (> 0 y <= 999999999)
+    # R3: Rango de monto valido (> 0 y <= MONTO_MAXIMO)
     # Retorna lista de motivos de falla (vacia si pasa)
     motivos = []
 
@@ -83,94 +110,130 @@ def validar_r3(reg):
     else:
         monto_str = ""
     if monto_str != "":
-        # Intentar convertir a numero
-        es_numero = True
-        val = monto_str.strip()
-        if val == "":
-            es_numero = False
-        elif val[0] == "-":
-            rest = val[1:]
-            if rest == "" or not rest.isdigit():
-                es_numero = False
-        else:
-            rest = val
-            if not rest.isdigit():
-                es_numero = False
-
-        if not es_numero:
+        monto = convertir_monto(monto_str)
+        if monto == None:
             motivos.append("monto no es numerico: " + monto_str)
-        else:
-            monto = int(val)
-            if monto <= 0:
-                motivos.append(
-                    "monto fuera de rango: " + str(monto) + " (debe ser > 0)"
-                )
-            elif monto > 999999999:
-                motivos.append(
-                    "monto fuera de rango: " + str(monto) + " (debe ser <= 999999999)"
-                )
+        elif monto <= 0:
+            motivos.append("monto fuera de rango: " + str(monto) + " (debe ser > 0)")
+        elif monto > MONTO_MAXIMO:
+            motivos.append(
+                "monto fuera de rango: "
+                + str(monto)
+                + " (debe ser <= "
+                + str(MONTO_MAXIMO)
+                + ")"
+            )
 
     return motivos
 
 
-def validar_registros(registros):
-    # Aplica las 3 reglas de validacion a cada registro
-    # Agrega campos: estado (VALIDO/INVALIDO), motivos_falla, detalle_reglas
-    # Retorna la lista de registros con los campos agregados
+def falla_r1(reg):
+    # True si el registro no cumple R1 (mismo criterio que validar_r1, sin
+    # armar mensajes)
+    for campo in CAMPOS_OBLIGATORIOS:
+        if campo not in reg.keys():
+            return True
+        valor = reg[campo]
+        if valor == None or valor.strip() == "":
+            return True
+    return False
 
-    total_validos = 0
-    total_invalidos = 0
 
-    for reg in registros:
-        if "id_solicitud" in reg.keys():
-            id_sol = reg["id_solicitud"]
-        else:
-            id_sol = "DESCONOCIDO"
-        motivos_todos = []
-        detalle = {}
-
-        # Aplicar R1
-        fallas_r1 = validar_r1(reg)
-        detalle["R1"] = fallas_r1
-        for m in fallas_r1:
-            motivos_todos.append("R1: " + m)
-
-        # Aplicar R2
-        fallas_r2 = validar_r2(reg)
-        detalle["R2"] = fallas_r2
-        for m in fallas_r2:
-            motivos_todos.append("R2: " + m)
-
-        # Aplicar R3
-        fallas_r3 = validar_r3(reg)
-        detalle["R3"] = fallas_r3
-        for m in fallas_r3:
-            motivos_todos.append("R3: " + m)
-
-        # Determinar estado
-        if len(motivos_todos) == 0:
-            reg["estado"] = "VALIDO"
-            reg["motivos_falla"] = ""
-            total_validos += 1
-        else:
-            reg["estado"] = "INVALIDO"
-            # Unir motivos con "; " usando concatenacion
-            motivos_str = ""
-            idx = 0
-            for m in motivos_todos:
-                if idx > 0:
-                    motivos_str = motivos_str + "; "
-                motivos_str = motivos_str + m
-                idx += 1
-            reg["motivos_falla"] = motivos_str
-            total_invalidos += 1
-            logger.warn(
-                MODULO, "Registro " + id_sol + " invalido: " + reg["motivos_falla"]
-            )
+def falla_r2(reg):
+    # True si el registro no cumple R2 (mismo criterio que validar_r2)
+    fecha = reg.get("fecha_solicitud")
+    if fecha != None and fecha != "" and not es_fecha_valida(fecha):
+        return True
+    moneda = reg.get("moneda")
+    if moneda != None and moneda != "" and moneda not in MONEDAS_SOPORTADAS:
+        return True
+    return False
+
+
+def falla_r3(reg):
+    # True si el registro no cumple R3 (mismo criterio que validar_r3)
+    monto_str = reg.get("monto_o_limite")
+    if monto_str == None or monto_str == "":
+        return False
+    monto = convertir_monto(monto_str)
+    return monto == None or monto <= 0 or monto > MONTO_MAXIMO
+
+
+# Reglas en orden de aplicacion, con el bit que las representa en _fallas, la
+# funcion que detecta la falla y la que arma los mensajes
+REGLAS = ["R1", "R2", "R3"]
+BITS_REGLAS = {"R1": 1, "R2": 2, "R3": 4}
+FALLA_REGLAS = {"R1": falla_r1, "R2": falla_r2, "R3": falla_r3}
+MENSAJES_REGLAS = {"R1": validar_r1, "R2": validar_r2, "R3": validar_r3}
+
 
-        # Guardar detalle para el reporte de calidad
-        reg["_detalle_reglas"] = detalle
+def mensajes_regla(reg, regla):
+    # Mensajes de falla de una regla para un registro (se arman a pedido: solo
+    # para registros invalidos y para los ejemplos del reporte de calidad)
+    return MENSAJES_REGLAS[regla](reg)
 
+
+def reglas_falladas(fallas):
+    # Lista de reglas cuyo bit esta prendido en la mascara `fallas`
+    reglas = []
+    for regla in REGLAS:
+        if fallas & BITS_REGLAS[regla]:
+            reglas.append(regla)
+    return reglas
+
+
+def armar_motivos(reg, fallas):
+    # Texto de motivos_falla: "R1: ...; R2: ..." segun la mascara `fallas`
+    motivos = []
+    for regla in reglas_falladas(fallas):
+        for m in mensajes_regla(reg, regla):
+            motivos.append(regla + ": " + m)
+    return "; ".join(motivos)
+
+
+def validar_registro(reg):
+    # Aplica las 3 reglas de validacion a un registro
+    # Agrega campos: estado (VALIDO/INVALIDO), motivos_falla y _fallas (mascara
+    # de bits de las reglas que fallaron, ver BITS_REGLAS)
+    # Un registro valido no arma ningun mensaje; en uno invalido los mensajes
+    # se arman solo para las reglas que fallaron
+    # Retorna True si el registro es valido
+    fallas = 0
+    for regla in REGLAS:
+        if FALLA_REGLAS[regla](reg):
+            fallas = fallas | BITS_REGLAS[regla]
+    return marcar_resultado(reg, fallas)
+
+
+def marcar_resultado(reg, fallas):
+    # Agrega _fallas, estado y motivos_falla a un registro segun la mascara de
+    # reglas falladas, y loguea el WARN si es invalido
+    # Retorna True si el registro es valido
+    reg["_fallas"] = fallas
+
+    # Determinar estado
+    if fallas == 0:
+        reg["estado"] = "VALIDO"
+        reg["motivos_falla"] = ""
+        return True
+
+    reg["estado"] = "INVALIDO"
+    reg["motivos_falla"] = armar_motivos(reg, fallas)
+    if "id_solicitud" in reg.keys():
+        id_sol = reg["id_solicitud"]
+    else:
+        id_sol = "DESCONOCIDO"
+    # El tipo de mensaje para la agregacion del log son las reglas que fallaron
+    logger.warn_agregado(
+        MODULO,
+        "registro invalido por " + "+".join(reglas_falladas(fallas)),
+        "Registro " + id_sol + " invalido: " + reg["motivos_falla"],
+    )
+    return False
+
+
+def registrar_resumen(total_validos, total_invalidos):
+    # Loguea el cierre de la etapa de validacion
     logger.info(
         MODULO,
         "Validacion completada - "
@@ -179,4 +242,20 @@ def validar_registros(registros):
         + str(total_invalidos)
         + " invalidos",
     )
+
+
+def validar_registros(registros):
+    # Aplica las 3 reglas de validacion a cada registro
+    # Retorna la lista de registros con los campos agregados
+
+    total_validos = 0
+    total_invalidos = 0
+
+    for reg in registros:
+        if validar_registro(reg):
+            total_validos += 1
+        else:
+            total_invalidos += 1
+
+    registrar_resumen(total_validos, total_invalidos)
     return registros
@@ -0,0 +1,218 @@
+# test_cache.py - Tests para la cache de resultados por contenido
+# Verifica que una entrada ya procesada se reutilice y que un cambio en las
+# reglas o en el codigo que arma la salida invalide la cache
+
+import sys
+import os
+import tempfile
+import json
+import shutil
+
+# Agregar src al path
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+import logger
+import main
+import cache
+import procesador
+import validador
+
+# Inicializar logger para tests, fuera del repositorio
+CARPETA_LOGS_TEST = os.path.join(tempfile.gettempdir(), "tests_workflow_logs")
+logger.inicializar(CARPETA_LOGS_TEST)
+
+CARPETA_TEST = os.path.dirname(os.path.abspath(__file__))
+
+# Header estandar de los CSV de prueba
+HEADER_CSV = "id_solicitud,fecha_solicitud,tipo_producto,id_cliente,monto_o_limite,moneda,pais,flag_prioritario,flag_digital\n"
+
+
+def borrar_carpeta_ejecucion(carpeta):
+    # Vuelve al log de los tests y borra la carpeta de una ejecucion: main.main
+    # deja activo su workflow.log y el siguiente mensaje recrearia la carpeta
+    logger.inicializar(CARPETA_LOGS_TEST)
+    shutil.rmtree(carpeta)
+
+
+def leer_texto(ruta):
+    # Lee un archivo completo como texto
+    arch = open(ruta, "r", encoding="utf-8")
+    contenido = arch.read()
+    arch.close()
+    return contenido
+
+
+def ejecutar_con_cache(ruta_entrada):
+    # Ejecuta main.main con la cache activa y retorna (resultado, csv de salida,
+    # reporte sin timestamp, metricas ni seccion cache). Borra la carpeta de
+    # ejecucion al terminar
+    resultado = main.main(
+        archivo_entrada_param=ruta_entrada, dir_data_param=CARPETA_TEST, usar_cache=True
+    )
+    csv_salida = leer_texto(resultado["archivo_salida"])
+    reporte = json.loads(leer_texto(resultado["archivo_reporte"]))
+    del reporte["timestamp"]
+    del reporte["metricas"]
+    if "cache" in reporte.keys():
+        del reporte["cache"]
+    borrar_carpeta_ejecucion(resultado["carpeta_ejecucion"])
+    return resultado, csv_salida, reporte
+
+
+def test_cache_reutiliza_y_se_invalida():
+    # DADO un CSV ya procesado con la cache activa
+    # CUANDO se procesa de nuevo, y luego con otra lista de monedas soportadas
+    # ENTONCES la segunda ejecucion sale de la cache con la misma salida y el
+    # mismo reporte, y el cambio de reglas obliga a recalcular
+    print("TEST: test_cache_reutiliza_y_se_invalida")
+
+    ruta_csv = os.path.join(CARPETA_TEST, "temp_cache.csv")
+    arch = open(ruta_csv, "w", encoding="utf-8")
+    arch.write(HEADER_CSV)
+    arch.write("SOL-001,15/03/2025,cuenta,CLI-1,50000,ARS,argentina,S,N\n")
+    arch.write("SOL-002,15/03/2025,cuenta,CLI-2,50000,GBP,argentina,S,N\n")
+    arch.write("SOL-003,2025-06-20,tarjeta,CLI-3,1000,USD,chile,N,S\n")
+    arch.close()
+    dir_cache = os.path.join(CARPETA_TEST, "cache")
+
+    ok = True
+    monedas_originales = validador.MONEDAS_SOPORTADAS
+    try:
+        primera = ejecutar_con_cache(ruta_csv)
+        segunda = ejecutar_con_cache(ruta_csv)
+        validador.MONEDAS_SOPORTADAS = monedas_originales + ["GBP"]
+        otras_reglas = ejecutar_con_cache(ruta_csv)
+    finally:
+        validador.MONEDAS_SOPORTADAS = monedas_originales
+
+    if primera[0]["desde_cache"] or not segunda[0]["desde_cache"]:
+        print("  FALLO: solo la segunda ejecucion deberia salir de la cache")
+        ok = False
+    elif primera[1] != segunda[1] or primera[2] != segunda[2]:
+        print("  FALLO: la salida desde la cache difiere de la original")
+        ok = False
+    elif segunda[0]["metricas"]["modo"] != "cache":
+        print("  FALLO: las metricas deberian indicar el modo 'cache'")
+        ok = False
+    elif otras_reglas[0]["desde_cache"]:
+        print("  FALLO: un cambio en las reglas deberia invalidar la cache")
+        ok = False
+    elif otras_reglas[2]["resumen"]["total_validos"] != 3:
+        print("  FALLO: con GBP soportada los 3 registros deberian ser validos")
+        ok = False
+    elif len(os.listdir(dir_cache)) != 2:
+        print("  FALLO: se esperaban 2 entradas en la cache")
+        ok = False
+
+    # Limpiar
+    os.remove(ruta_csv)
+    shutil.rmtree(dir_cache)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_huella_incluye_codigo_de_procesamiento():
+    # DADO la huella de las reglas para salida CSV
+    # CUANDO cambia el codigo de procesador.py (cada fila de la salida se arma
+    # en procesador.procesar_registro)
+    # ENTONCES cambia la huella y no se reutilizan resultados viejos
+    print("TEST: test_huella_incluye_codigo_de_procesamiento")
+
+    ok = True
+    huella = cache.huella_reglas("csv", False)
+    archivo_original = procesador.__file__
+    try:
+        # Otro archivo fuente: equivale a haber editado procesador.py
+        procesador.__file__ = validador.__file__
+        otra_huella = cache.huella_reglas("csv", False)
+    finally:
+        procesador.__file__ = archivo_original
+    if huella == otra_huella:
+        print("  FALLO: un cambio en procesador.py deberia cambiar la huella")
+        ok = False
+    if cache.huella_reglas("csv", False) != huella:
+        print("  FALLO: la huella deberia ser estable con el mismo codigo")
+        ok = False
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_editar_salida_no_modifica_la_cache():
+    # DADO un CSV procesado con la cache activa
+    # CUANDO se edita la salida de la ejecucion original y la de una ejecucion
+    # que salio de la cache
+    # ENTONCES una ejecucion posterior sigue obteniendo la salida original
+    print("TEST: test_editar_salida_no_modifica_la_cache")
+
+    ruta_csv = os.path.join(CARPETA_TEST, "temp_cache_edicion.csv")
+    arch = open(ruta_csv, "w", encoding="utf-8")
+    arch.write(HEADER_CSV)
+    arch.write("SOL-001,15/03/2025,cuenta,CLI-1,50000,ARS,argentina,S,N\n")
+    arch.close()
+    dir_cache = os.path.join(CARPETA_TEST, "cache")
+
+    ok = True
+    carpetas = []
+    esperado = None
+    for i in range(2):
+        resultado = main.main(
+            archivo_entrada_param=ruta_csv, dir_data_param=CARPETA_TEST, usar_cache=True
+        )
+        carpetas.append(resultado["carpeta_ejecucion"])
+        if esperado == None:
+            esperado = leer_texto(resultado["archivo_salida"])
+        arch = open(resultado["archivo_salida"], "a", encoding="utf-8")
+        arch.write("SOL-EDITADA\n")
+        arch.close()
+    final = ejecutar_con_cache(ruta_csv)
+    if not final[0]["desde_cache"]:
+        print("  FALLO: la ultima ejecucion deberia salir de la cache")
+        ok = False
+    elif final[1] != esperado:
+        print("  FALLO: editar una salida modifico la entrada de cache")
+        ok = False
+
+    # Limpiar
+    for carpeta in carpetas:
+        borrar_carpeta_ejecucion(carpeta)
+    os.remove(ruta_csv)
+    shutil.rmtree(dir_cache)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+# Ejecutar tests manualmente
+if __name__ == "__main__":
+    print("=" * 50)
+    print("TESTS DE CACHE DE RESULTADOS")
+    print("=" * 50)
+
+    total = 3
+    aprobados = 0
+
+    try:
+        test_cache_reutiliza_y_se_invalida()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_huella_incluye_codigo_de_procesamiento()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_editar_salida_no_modifica_la_cache()
+        aprobados += 1
+    except AssertionError:
+        pass
+
+    print("")
+    print("Resultado: " + str(aprobados) + "/" + str(total) + " tests aprobados")
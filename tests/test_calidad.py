@@ -3,6 +3,7 @@
 
 import sys
 import os
+import tempfile
 import json
 
 # Agregar src al path
@@ -12,9 +13,11 @@ sys.path.insert(
 
 import logger
 import calidad
+import validador
 
-# Inicializar logger para tests
-logger.inicializar()
+# Inicializar logger para tests, fuera del repositorio
+CARPETA_LOGS_TEST = os.path.join(tempfile.gettempdir(), "tests_workflow_logs")
+logger.inicializar(CARPETA_LOGS_TEST)
 
 CARPETA_TEST = os.path.dirname(os.path.abspath(__file__))
 
@@ -199,13 +202,138 @@ def test_reporte_se_guarda_json():
     assert ok
 
 
+def test_acumulador_fusionado_igual_a_reporte():
+    # DADO un lote de registros dividido en 3 fragmentos consecutivos
+    # CUANDO se acumula cada fragmento por separado y se fusionan en orden
+    # ENTONCES el reporte es igual al de generar_reporte sobre la lista completa
+    print("TEST: test_acumulador_fusionado_igual_a_reporte")
+
+    registros = []
+    i = 0
+    while i < 20:
+        detalle = {"R1": [], "R2": [], "R3": []}
+        if i % 3 == 0:
+            detalle["R2"] = ["moneda no soportada: GBP"]
+        if i % 4 == 0:
+            detalle["R3"] = ["monto fuera de rango: -" + str(i)]
+        if i == 17:
+            # Regla nueva que solo aparece en el ultimo fragmento
+            detalle["R4"] = ["regla nueva"]
+        if len(detalle["R2"]) + len(detalle["R3"]) + len(detalle.get("R4", [])) > 0:
+            estado = "INVALIDO"
+        else:
+            estado = "VALIDO"
+        registros.append(
+            {
+                "id_solicitud": "SOL-F" + str(i),
+                "estado": estado,
+                "_detalle_reglas": detalle,
+            }
+        )
+        i += 1
+
+    reporte_lista = calidad.generar_reporte(registros, "test.csv", CARPETA_TEST)
+
+    acumulador = calidad.AcumuladorCalidad()
+    for inicio, fin in [(0, 6), (6, 13), (13, 20)]:
+        parcial = calidad.AcumuladorCalidad()
+        for reg in registros[inicio:fin]:
+            parcial.agregar(reg)
+        acumulador.fusionar(parcial)
+    reporte_fusion = acumulador.reporte("test.csv", CARPETA_TEST)
+
+    ok = True
+    del reporte_lista["timestamp"]
+    del reporte_fusion["timestamp"]
+    if reporte_lista != reporte_fusion:
+        print("  FALLO: el reporte fusionado difiere del reporte sobre la lista")
+        ok = False
+    elif "R4" not in reporte_fusion["detalle_reglas"].keys():
+        print("  FALLO: la regla R4 del ultimo fragmento no aparece en el reporte")
+        ok = False
+    elif reporte_fusion["detalle_reglas"]["R3_rango_monto"]["ejemplos"] != [
+        "SOL-F0: monto fuera de rango: -0",
+        "SOL-F4: monto fuera de rango: -4",
+        "SOL-F8: monto fuera de rango: -8",
+    ]:
+        print("  FALLO: los ejemplos no respetan el orden de los registros")
+        ok = False
+
+    # Limpiar archivo generado
+    ruta_reporte = os.path.join(CARPETA_TEST, "reporte_calidad.json")
+    if os.path.exists(ruta_reporte):
+        os.remove(ruta_reporte)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_reporte_mascara_igual_a_detalle():
+    # DADO registros validados (con la mascara _fallas) y los mismos registros
+    # en el formato anterior (_detalle_reglas con listas de mensajes)
+    # CUANDO se genera el reporte de cada lista
+    # ENTONCES ambos reportes son iguales
+    print("TEST: test_reporte_mascara_igual_a_detalle")
+
+    registros = []
+    anteriores = []
+    i = 0
+    while i < 12:
+        reg = {
+            "id_solicitud": "SOL-M" + str(i),
+            "fecha_solicitud": "15/03/2025",
+            "tipo_producto": "CUENTA",
+            "id_cliente": "CLI-1",
+            "monto_o_limite": str(1000 - 300 * (i % 5)),
+            "moneda": ["ARS", "GBP", "USD"][i % 3],
+            "pais": "Argentina",
+        }
+        if i % 4 == 0:
+            reg["id_cliente"] = ""
+        validador.validar_registro(reg)
+        registros.append(reg)
+        detalle = {}
+        for regla in validador.REGLAS:
+            detalle[regla] = validador.mensajes_regla(reg, regla)
+        anteriores.append(
+            {
+                "id_solicitud": reg["id_solicitud"],
+                "estado": reg["estado"],
+                "_detalle_reglas": detalle,
+            }
+        )
+        i += 1
+
+    reporte = calidad.generar_reporte(registros, "test.csv", CARPETA_TEST)
+    reporte_anterior = calidad.generar_reporte(anteriores, "test.csv", CARPETA_TEST)
+
+    ok = True
+    del reporte["timestamp"]
+    del reporte_anterior["timestamp"]
+    if reporte != reporte_anterior:
+        print("  FALLO: el reporte con mascara difiere del formato anterior")
+        ok = False
+    elif reporte["detalle_reglas"]["R1_campos_obligatorios"]["total_fallas"] != 3:
+        print("  FALLO: se esperaban 3 fallas de R1")
+        ok = False
+
+    # Limpiar archivo generado
+    ruta_reporte = os.path.join(CARPETA_TEST, "reporte_calidad.json")
+    if os.path.exists(ruta_reporte):
+        os.remove(ruta_reporte)
+
+    if ok:
+        print("  OK")
+    assert ok
+
 # Ejecutar tests manualmente
 if __name__ == "__main__":
     print("=" * 50)
     print("TESTS DE CALIDAD (RF-04)")
     print("=" * 50)
 
-    total = 3
+    total = 5
     aprobados = 0
 
     try:
@@ -223,6 +351,16 @@ if __name__ == "__main__":
         aprobados += 1
     except AssertionError:
         pass
+    try:
+        test_acumulador_fusionado_igual_a_reporte()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_reporte_mascara_igual_a_detalle()
+        aprobados += 1
+    except AssertionError:
+        pass
 
     print("")
     print("Resultado: " + str(aprobados) + "/" + str(total) + " tests aprobados")
@@ -0,0 +1,267 @@
+# test_checkpoint.py - Tests para checkpoints y reanudacion de ejecuciones
+# Verifica que una ejecucion interrumpida (SIGTERM o corte) se reanuda desde el
+# ultimo checkpoint con los mismos artefactos que una ejecucion completa, y que
+# no se reanuda si el archivo de entrada cambio
+
+import sys
+import os
+import tempfile
+import gzip
+import json
+import shutil
+import signal
+
+# Agregar src al path
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+import logger
+import ingesta
+import checkpoint
+import main
+
+# Inicializar logger para tests, fuera del repositorio
+CARPETA_LOGS_TEST = os.path.join(tempfile.gettempdir(), "tests_workflow_logs")
+logger.inicializar(CARPETA_LOGS_TEST)
+
+CARPETA_TEST = os.path.dirname(os.path.abspath(__file__))
+
+HEADER_CSV = "id_solicitud,fecha_solicitud,tipo_producto,id_cliente,monto_o_limite,moneda,pais,flag_prioritario,flag_digital\n"
+
+# Funciones originales de checkpoint.py que los tests reemplazan por un rato
+GUARDAR_ORIGINAL = checkpoint.guardar
+INSTALAR_ORIGINAL = checkpoint.instalar_senales
+
+# Registros de cada checkpoint guardado con guardar_e_interrumpir
+CHECKPOINTS_GUARDADOS = []
+
+
+def borrar_carpeta_ejecucion(carpeta):
+    # Vuelve al log de los tests y borra la carpeta de una ejecucion: main.main
+    # deja activo su workflow.log y el siguiente mensaje recrearia la carpeta
+    logger.inicializar(CARPETA_LOGS_TEST)
+    shutil.rmtree(carpeta)
+
+
+def guardar_e_interrumpir(carpeta, estado):
+    # Guarda el checkpoint y, despues del tercero, el proceso recibe SIGTERM
+    ruta = GUARDAR_ORIGINAL(carpeta, estado)
+    CHECKPOINTS_GUARDADOS.append(estado["registros"])
+    if len(CHECKPOINTS_GUARDADOS) == 3:
+        os.kill(os.getpid(), signal.SIGTERM)
+    return ruta
+
+
+def instalar_e_interrumpir():
+    # Instala los manejadores y pide la interrupcion antes de empezar
+    anteriores = INSTALAR_ORIGINAL()
+    checkpoint.INTERRUPCION.set()
+    return anteriores
+
+
+def leer_artefactos(resultado):
+    # Retorna (salida descomprimida, reporte sin timestamp ni metricas)
+    if resultado["archivo_salida"].endswith(".gz"):
+        arch = gzip.open(resultado["archivo_salida"], "rt", encoding="utf-8")
+    else:
+        arch = open(resultado["archivo_salida"], "r", encoding="utf-8")
+    salida = arch.read()
+    arch.close()
+    arch = open(resultado["archivo_reporte"], "r", encoding="utf-8")
+    reporte = json.loads(arch.read())
+    arch.close()
+    del reporte["timestamp"]
+    del reporte["metricas"]
+    return salida, reporte
+
+
+def test_reanudar_igual_a_ejecucion_completa():
+    # DADO un CSV con registros validos, invalidos y lineas vacias
+    # CUANDO una ejecucion con checkpoints recibe SIGTERM, se agrega basura al
+    # final de la salida parcial (como si se cortara despues del checkpoint) y
+    # se reanuda con --reanudar
+    # ENTONCES no queda salida con el nombre final mientras esta interrumpida,
+    # y al reanudar la salida y el reporte son identicos a los de una
+    # ejecucion en streaming sin cortes, sin checkpoint ni parcial al terminar
+    print("TEST: test_reanudar_igual_a_ejecucion_completa")
+
+    ruta_csv = os.path.join(CARPETA_TEST, "temp_checkpoint.csv")
+    arch = open(ruta_csv, "w", encoding="utf-8")
+    arch.write(HEADER_CSV)
+    i = 0
+    while i < 400:
+        if i % 3 == 0:
+            campos = ",2025-13-20,,CLI-2,-5,GBP,peru,N,S\n"
+        else:
+            campos = ",15/03/2025,cuenta,CLI-1,500,ars,chile,S,N\n"
+        arch.write("SOL-K" + str(i) + campos)
+        if i % 50 == 0:
+            arch.write("\n")
+        i += 1
+    arch.close()
+
+    bloque_original = ingesta.BLOQUE_MMAP
+    filas_original = checkpoint.FILAS_POR_CHECKPOINT
+    ok = True
+    try:
+        ingesta.BLOQUE_MMAP = 1024
+        checkpoint.FILAS_POR_CHECKPOINT = 40
+        for opciones in [{}, {"formato_salida": "jsonl", "comprimir_salida": True}]:
+            CHECKPOINTS_GUARDADOS.clear()
+            completa = main.main(
+                archivo_entrada_param=ruta_csv,
+                dir_data_param=CARPETA_TEST,
+                modo_streaming=True,
+                **opciones,
+            )
+            esperado = leer_artefactos(completa)
+            borrar_carpeta_ejecucion(completa["carpeta_ejecucion"])
+
+            checkpoint.guardar = guardar_e_interrumpir
+            try:
+                cortada = main.main(
+                    archivo_entrada_param=ruta_csv,
+                    dir_data_param=CARPETA_TEST,
+                    usar_checkpoint=True,
+                    **opciones,
+                )
+            finally:
+                checkpoint.guardar = GUARDAR_ORIGINAL
+            carpeta = cortada["carpeta_ejecucion"]
+            estado, motivo = checkpoint.cargar(carpeta)
+            nombres = os.listdir(carpeta)
+            if cortada["status"] != "interrumpido" or estado == None:
+                print("  FALLO: se esperaba una ejecucion interrumpida con checkpoint")
+                ok = False
+                borrar_carpeta_ejecucion(carpeta)
+                continue
+            if estado["registros"] == 0 or estado["registros"] >= 400:
+                print("  FALLO: checkpoint inesperado: " + str(estado["registros"]))
+                ok = False
+            for nombre in nombres:
+                if nombre.startswith("solicitudes_limpias") and not nombre.endswith(
+                    checkpoint.SUFIJO_PARCIAL
+                ):
+                    print("  FALLO: quedo una salida final a medio escribir")
+                    ok = False
+
+            # Lo escrito despues del ultimo checkpoint se descarta al reanudar
+            parcial = open(estado["archivo_salida"] + checkpoint.SUFIJO_PARCIAL, "ab")
+            parcial.write(b"SOL-BASURA,sin confirmar\n")
+            parcial.close()
+
+            reanudada = main.main(dir_data_param=CARPETA_TEST, reanudar=carpeta)
+            if reanudada["status"] != "ok":
+                print("  FALLO: la ejecucion reanudada deberia terminar en 'ok'")
+                ok = False
+            elif leer_artefactos(reanudada) != esperado:
+                print("  FALLO: los artefactos difieren de la ejecucion completa")
+                ok = False
+            elif reanudada["resumen"]["total_procesados"] != 400:
+                print("  FALLO: total inesperado al reanudar")
+                ok = False
+            sobrantes = []
+            for nombre in os.listdir(carpeta):
+                if nombre == checkpoint.ARCHIVO_CHECKPOINT or nombre.endswith(
+                    checkpoint.SUFIJO_PARCIAL
+                ):
+                    sobrantes.append(nombre)
+            if len(sobrantes) > 0:
+                print("  FALLO: quedaron archivos de la reanudacion: " + str(sobrantes))
+                ok = False
+            borrar_carpeta_ejecucion(carpeta)
+    finally:
+        ingesta.BLOQUE_MMAP = bloque_original
+        checkpoint.FILAS_POR_CHECKPOINT = filas_original
+        checkpoint.guardar = GUARDAR_ORIGINAL
+
+    # Limpiar
+    os.remove(ruta_csv)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_no_reanudar_si_cambio_la_entrada():
+    # DADO una ejecucion interrumpida con checkpoint
+    # CUANDO el archivo de entrada cambia antes de reanudar, o la carpeta no
+    # tiene checkpoint
+    # ENTONCES no se reanuda y main retorna status "error"; --reanudar tampoco
+    # acepta un rango de lineas (--filas)
+    print("TEST: test_no_reanudar_si_cambio_la_entrada")
+
+    ruta_csv = os.path.join(CARPETA_TEST, "temp_checkpoint_cambio.csv")
+    arch = open(ruta_csv, "w", encoding="utf-8")
+    arch.write(HEADER_CSV)
+    arch.write("SOL-1,15/03/2025,cuenta,CLI-1,500,ars,chile,S,N\n")
+    arch.close()
+
+    ok = True
+    # Interrupcion pedida antes de empezar: se guarda el checkpoint del primer
+    # bloque y se detiene
+    checkpoint.instalar_senales = instalar_e_interrumpir
+    try:
+        cortada = main.main(
+            archivo_entrada_param=ruta_csv,
+            dir_data_param=CARPETA_TEST,
+            usar_checkpoint=True,
+        )
+    finally:
+        checkpoint.instalar_senales = INSTALAR_ORIGINAL
+    carpeta = cortada["carpeta_ejecucion"]
+    if cortada["status"] != "interrumpido":
+        print("  FALLO: se esperaba status 'interrumpido'")
+        ok = False
+
+    arch = open(ruta_csv, "a", encoding="utf-8")
+    arch.write("SOL-2,15/03/2025,cuenta,CLI-1,500,ars,chile,S,N\n")
+    arch.close()
+    estado, motivo = checkpoint.cargar(carpeta)
+    if estado != None or "cambio" not in motivo:
+        print("  FALLO: se esperaba rechazar un archivo de entrada modificado")
+        ok = False
+    if main.main(dir_data_param=CARPETA_TEST, reanudar=carpeta)["status"] != "error":
+        print("  FALLO: se esperaba status 'error' al reanudar")
+        ok = False
+    if main.main(dir_data_param=CARPETA_TEST, reanudar=CARPETA_TEST)["status"] != (
+        "error"
+    ):
+        print("  FALLO: se esperaba status 'error' sin checkpoint")
+        ok = False
+    if main.parsear_argumentos(["--reanudar", carpeta, "--filas", "2:3"]) != None:
+        print("  FALLO: se esperaba rechazar --reanudar con --filas")
+        ok = False
+
+    # Limpiar
+    borrar_carpeta_ejecucion(carpeta)
+    os.remove(ruta_csv)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+# Ejecutar tests manualmente
+if __name__ == "__main__":
+    print("=" * 50)
+    print("TESTS DE CHECKPOINTS Y REANUDACION")
+    print("=" * 50)
+
+    total = 2
+    aprobados = 0
+
+    try:
+        test_reanudar_igual_a_ejecucion_completa()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_no_reanudar_si_cambio_la_entrada()
+        aprobados += 1
+    except AssertionError:
+        pass
+
+    print("")
+    print("Resultado: " + str(aprobados) + "/" + str(total) + " tests aprobados")
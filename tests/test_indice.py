@@ -0,0 +1,199 @@
+# test_indice.py - Tests para el indice persistente de offsets de lineas
+# Verifica que el indice se guarda, se reutiliza y se invalida si cambia el
+# archivo, la lectura de rangos de lineas y los fragmentos calculados con la
+# tabla
+
+import sys
+import os
+import tempfile
+import gzip
+
+# Agregar src al path
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+import logger
+import ingesta
+import indice
+import paralelo
+
+# Inicializar logger para tests, fuera del repositorio
+CARPETA_LOGS_TEST = os.path.join(tempfile.gettempdir(), "tests_workflow_logs")
+logger.inicializar(CARPETA_LOGS_TEST)
+
+CARPETA_TEST = os.path.dirname(os.path.abspath(__file__))
+
+
+def escribir_csv(ruta, filas):
+    # Escribe un CSV con header, `filas` registros y una linea vacia cada 7
+    arch = open(ruta, "w", encoding="utf-8")
+    arch.write("id_solicitud,moneda\n")
+    i = 0
+    while i < filas:
+        arch.write("SOL-" + str(i) + ",ARS\n")
+        if i % 7 == 0:
+            arch.write("\n")
+        i += 1
+    arch.close()
+
+
+def test_indice_persistente():
+    # DADO un CSV sin indice
+    # CUANDO se obtiene el indice, se vuelve a obtener, se modifica el archivo
+    # y se corrompe el indice guardado
+    # ENTONCES se guarda junto al archivo, se reutiliza mientras el archivo no
+    # cambie, se rearma si cambia y un indice corrupto se ignora
+    print("TEST: test_indice_persistente")
+
+    ruta = os.path.join(CARPETA_TEST, "temp_indice.csv")
+    escribir_csv(ruta, 200)
+    ruta_idx = indice.ruta_indice(ruta)
+    if os.path.exists(ruta_idx):
+        os.remove(ruta_idx)
+
+    ok = True
+    tabla = indice.obtener_indice(ruta)
+    if not os.path.exists(ruta_idx):
+        print("  FALLO: no se guardo el indice")
+        ok = False
+    if list(tabla) != list(ingesta.tabla_lineas(ruta)):
+        print("  FALLO: la tabla difiere de ingesta.tabla_lineas")
+        ok = False
+    cargada = indice.cargar_indice(ruta)
+    if cargada == None or list(cargada) != list(tabla):
+        print("  FALLO: el indice guardado no se pudo cargar")
+        ok = False
+
+    # Los fragmentos con la tabla son los mismos que leyendo el archivo
+    offset_datos = ingesta.leer_header(ruta, "csv")[1]
+    for cantidad in [1, 3, 8, 50]:
+        if paralelo.calcular_fragmentos(
+            ruta, offset_datos, cantidad
+        ) != paralelo.calcular_fragmentos(ruta, offset_datos, cantidad, tabla):
+            print("  FALLO: fragmentos distintos con " + str(cantidad))
+            ok = False
+
+    # Archivo modificado: el indice queda desactualizado y se rearma
+    escribir_csv(ruta, 150)
+    if indice.cargar_indice(ruta) != None:
+        print("  FALLO: se esperaba None para un indice desactualizado")
+        ok = False
+    tabla = indice.obtener_indice(ruta)
+    if list(tabla) != list(ingesta.tabla_lineas(ruta)):
+        print("  FALLO: la tabla no se rearmo")
+        ok = False
+
+    # Indice truncado: se ignora
+    arch = open(ruta_idx, "rb")
+    datos = arch.read()
+    arch.close()
+    arch = open(ruta_idx, "wb")
+    arch.write(datos[:-5])
+    arch.close()
+    if indice.cargar_indice(ruta) != None:
+        print("  FALLO: se esperaba None para un indice truncado")
+        ok = False
+
+    # Sin persistir no se escribe el indice; JSON no se indexa
+    os.remove(ruta_idx)
+    indice.obtener_indice(ruta, persistir=False)
+    if os.path.exists(ruta_idx):
+        print("  FALLO: se guardo el indice con persistir=False")
+        ok = False
+    if indice.obtener_indice(os.path.join(CARPETA_TEST, "temp_indice.json")) != None:
+        print("  FALLO: un JSON no deberia tener indice")
+        ok = False
+
+    # Limpiar
+    os.remove(ruta)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_rango_de_lineas():
+    # DADO un CSV con lineas vacias y un JSONL
+    # CUANDO se leen rangos de lineas con iter_lineas
+    # ENTONCES se obtienen los registros de esas lineas, con la misma
+    # numeracion que iter_solicitudes(numerar=True)
+    print("TEST: test_rango_de_lineas")
+
+    ruta = os.path.join(CARPETA_TEST, "temp_rango.csv")
+    escribir_csv(ruta, 40)
+    ruta_jsonl = os.path.join(CARPETA_TEST, "temp_rango.jsonl")
+    arch = open(ruta_jsonl, "w", encoding="utf-8")
+    i = 0
+    while i < 10:
+        arch.write('{"id_solicitud": "SOL-' + str(i) + '"}\n\n')
+        i += 1
+    arch.close()
+
+    ok = True
+    for archivo in [ruta, ruta_jsonl]:
+        numerados = list(ingesta.iter_solicitudes(archivo, numerar=True))
+        tabla = indice.obtener_indice(archivo, persistir=False)
+        for desde, hasta in [(1, 1), (1, 5), (2, 2), (9, 30), (14, None), (60, 70)]:
+            esperado = []
+            for numero, reg in numerados:
+                if numero >= desde and (hasta == None or numero <= hasta):
+                    esperado.append(reg)
+            obtenido = list(indice.iter_lineas(archivo, desde, hasta, tabla))
+            if obtenido != esperado:
+                print(
+                    "  FALLO: rango "
+                    + str(desde)
+                    + ":"
+                    + str(hasta)
+                    + " inesperado en "
+                    + archivo
+                )
+                ok = False
+    if indice.linea_en_offset(tabla, indice.offset_linea(tabla, 5)) != 5:
+        print("  FALLO: linea_en_offset no es la inversa de offset_linea")
+        ok = False
+
+    # Un archivo comprimido no se puede leer por rango de lineas
+    arch = gzip.open(ruta + ".gz", "wt", encoding="utf-8")
+    arch.write("id_solicitud\nSOL-1\n")
+    arch.close()
+    if indice.iter_lineas(ruta + ".gz", 1, 5) != None:
+        print("  FALLO: se esperaba None para un archivo comprimido")
+        ok = False
+
+    # Limpiar
+    os.remove(ruta)
+    os.remove(ruta + ".gz")
+    os.remove(ruta_jsonl)
+    for archivo in [ruta, ruta_jsonl]:
+        if os.path.exists(indice.ruta_indice(archivo)):
+            os.remove(indice.ruta_indice(archivo))
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+# Ejecutar tests manualmente
+if __name__ == "__main__":
+    print("=" * 50)
+    print("TESTS DE INDICE DE LINEAS")
+    print("=" * 50)
+
+    total = 2
+    aprobados = 0
+
+    try:
+        test_indice_persistente()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_rango_de_lineas()
+        aprobados += 1
+    except AssertionError:
+        pass
+
+    print("")
+    print("Resultado: " + str(aprobados) + "/" + str(total) + " tests aprobados")
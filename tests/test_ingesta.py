@@ -3,18 +3,24 @@
 
 import sys
 import os
+import tempfile
 
 # Agregar src al path
 sys.path.insert(
     0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
 )
 
+import bz2
+import gzip
 import json
+import lzma
+import zipfile
 import logger
 import ingesta
 
-# Inicializar logger para tests
-logger.inicializar()
+# Inicializar logger para tests, fuera del repositorio
+CARPETA_LOGS_TEST = os.path.join(tempfile.gettempdir(), "tests_workflow_logs")
+logger.inicializar(CARPETA_LOGS_TEST)
 
 # Carpeta temporal para tests
 CARPETA_TEST = os.path.dirname(os.path.abspath(__file__))
@@ -400,13 +406,362 @@ def test_json_vacio():
     assert ok
 
 
+def test_iter_solicitudes_streaming():
+    # DADO un archivo CSV con varios registros
+    # CUANDO se usa iter_solicitudes
+    # ENTONCES se obtiene un iterador (no una lista) con los mismos registros
+    # que leer_solicitudes, y None si el archivo no existe
+    print("TEST: test_iter_solicitudes_streaming")
+
+    ruta = os.path.join(CARPETA_TEST, "temp_iter.csv")
+    arch = open(ruta, "w", encoding="utf-8")
+    arch.write("id_solicitud,tipo_producto,moneda\n")
+    arch.write("SOL-001,cuenta,ARS\n")
+    arch.write("SOL-002,tarjeta,USD\n")
+    arch.write("SOL-003,servicio,EUR\n")
+    arch.close()
+
+    iterador = ingesta.iter_solicitudes(ruta)
+
+    ok = True
+    if iterador == None:
+        print("  FALLO: iterador es None")
+        ok = False
+    elif type(iterador) == list:
+        print("  FALLO: se esperaba un iterador, se obtuvo una lista")
+        ok = False
+    else:
+        primero = next(iterador)
+        if primero["id_solicitud"] != "SOL-001":
+            print("  FALLO: primer registro no tiene id_solicitud correcto")
+            ok = False
+        resto = []
+        for reg in iterador:
+            resto.append(reg)
+        if [primero] + resto != ingesta.leer_solicitudes(ruta):
+            print("  FALLO: el iterador no coincide con leer_solicitudes")
+            ok = False
+
+    if ingesta.iter_solicitudes("archivo_que_no_existe.csv") != None:
+        print("  FALLO: se esperaba None para archivo inexistente")
+        ok = False
+
+    # Limpiar
+    os.remove(ruta)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_separar_campos_casos_borde():
+    # DADO lineas CSV con comillas escapadas, comillas a mitad de campo,
+    # campos vacios y comillas sin cerrar
+    # CUANDO se separan los campos
+    # ENTONCES el resultado respeta la semantica de escape del parser
+    print("TEST: test_separar_campos_casos_borde")
+
+    casos = [
+        ("a,b,c", ["a", "b", "c"]),
+        (",,", ["", "", ""]),
+        ("", [""]),
+        ('"a,b",c', ["a,b", "c"]),
+        ('"di ""hola""",x', ['di "hola"', "x"]),
+        ('""', [""]),
+        ('""""', ['"']),
+        ('ab"c,d"e,f', ["abc,de", "f"]),
+        ('a,"sin cerrar, b', ["a", "sin cerrar, b"]),
+        ('"a"",b', ['a",b']),
+        ("x" * 5000 + ',"' + "y," * 2000 + '"', ["x" * 5000, "y," * 2000]),
+    ]
+
+    ok = True
+    for linea, esperado in casos:
+        obtenido = ingesta.separar_campos(linea)
+        if obtenido != esperado:
+            print(
+                "  FALLO: linea "
+                + repr(linea[:40])
+                + " -> "
+                + repr(obtenido)[:80]
+                + ", se esperaba "
+                + repr(esperado)[:80]
+            )
+            ok = False
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_json_incremental_bloques_chicos():
+    # DADO un JSON con numeros, strings y objetos anidados
+    # CUANDO se lee con bloques de pocos caracteres (los elementos quedan
+    # cortados entre bloques)
+    # ENTONCES se obtienen los mismos registros que con json.loads, y un JSON
+    # invalido a mitad del archivo hace que leer_solicitudes retorne None
+    print("TEST: test_json_incremental_bloques_chicos")
+
+    ruta = os.path.join(CARPETA_TEST, "temp_incremental.json")
+    datos = [
+        {"id_solicitud": "SOL-001", "monto_o_limite": 972.5, "pais": "M\u00e9xico"},
+        17,
+        {"id_solicitud": "SOL-002", "detalle": {"a": [1, 2]}, "flag": True},
+        {"id_solicitud": "SOL-003", "moneda": "a,b]\"c", "monto_o_limite": 1e3},
+    ]
+    arch = open(ruta, "w", encoding="utf-8")
+    arch.write(" \n" + json.dumps(datos, indent=2) + "\n")
+    arch.close()
+
+    esperado = []
+    for elem in datos:
+        if type(elem) == dict:
+            esperado.append(ingesta.convertir_elemento_json(elem))
+
+    ok = True
+    tamano_original = ingesta.TAMANO_BLOQUE_JSON
+    try:
+        for tamano in [1, 3, 7]:
+            ingesta.TAMANO_BLOQUE_JSON = tamano
+            resultado = ingesta.leer_solicitudes(ruta)
+            if resultado != esperado:
+                print("  FALLO: registros distintos con bloques de " + str(tamano))
+                ok = False
+
+        # Coma de mas antes del cierre: error despues del tercer registro
+        arch = open(ruta, "w", encoding="utf-8")
+        arch.write(json.dumps(datos)[:-1] + ",]")
+        arch.close()
+        if ingesta.leer_solicitudes(ruta) != None:
+            print("  FALLO: se esperaba None para JSON invalido a mitad del archivo")
+            ok = False
+    finally:
+        ingesta.TAMANO_BLOQUE_JSON = tamano_original
+
+    # Limpiar
+    os.remove(ruta)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_lectura_jsonl():
+    # DADO un archivo .ndjson con un objeto por linea, una linea vacia,
+    # una linea invalida y un elemento que no es objeto
+    # CUANDO se ejecuta la ingesta
+    # ENTONCES se leen los objetos validos (valores convertidos a string) y se
+    # omiten las lineas invalidas; por rango de bytes se obtiene lo mismo
+    print("TEST: test_lectura_jsonl")
+
+    ruta = os.path.join(CARPETA_TEST, "temp_lineas.ndjson")
+    arch = open(ruta, "w", encoding="utf-8")
+    arch.write('{"id_solicitud": "SOL-001", "monto_o_limite": 1500, "moneda": "ARS"}\n')
+    arch.write("\n")
+    arch.write('{"id_solicitud": "SOL-002", "moneda": null\n')
+    arch.write("[1, 2]\n")
+    arch.write('{"id_solicitud": "SOL-003", "pais": "Per\u00fa"}')
+    arch.close()
+
+    ok = True
+    if ingesta.detectar_formato(ruta) != "jsonl":
+        print("  FALLO: .ndjson deberia detectarse como jsonl")
+        ok = False
+
+    resultado = ingesta.leer_solicitudes(ruta)
+    esperado = [
+        {"id_solicitud": "SOL-001", "monto_o_limite": "1500", "moneda": "ARS"},
+        {"id_solicitud": "SOL-003", "pais": "Per\u00fa"},
+    ]
+    if resultado != esperado:
+        print("  FALLO: registros inesperados: " + str(resultado))
+        ok = False
+
+    lectura = ingesta.leer_header(ruta, "jsonl")
+    por_rango = list(
+        ingesta.iter_rango_bytes(
+            ruta, "jsonl", lectura[0], lectura[1], os.path.getsize(ruta)
+        )
+    )
+    if por_rango != esperado:
+        print("  FALLO: la lectura por rango de bytes no coincide")
+        ok = False
+
+    # Limpiar
+    os.remove(ruta)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_lectura_comprimida():
+    # DADO archivos CSV, TXT, JSON y JSONL comprimidos con gzip, bz2, xz y zip
+    # CUANDO se ejecuta la ingesta sobre el archivo comprimido
+    # ENTONCES se obtienen los mismos registros que del archivo plano, y un
+    # gzip truncado retorna None
+    print("TEST: test_lectura_comprimida")
+
+    contenidos = {
+        "csv": 'id_solicitud,moneda\nSOL-001,ARS\n\nSOL-002,"U,SD"\n',
+        "txt": "id_solicitud|moneda\nSOL-001 | ARS\nSOL-002|USD\n",
+        "json": '[{"id_solicitud": "SOL-001", "monto": 10},'
+        + ' {"id_solicitud": "SOL-002"}]',
+        "jsonl": '{"id_solicitud": "SOL-001"}\n{"id_solicitud": "SOL-002"}\n',
+    }
+
+    ok = True
+    temporales = []
+    for formato in contenidos.keys():
+        ruta = os.path.join(CARPETA_TEST, "temp_comprimido." + formato)
+        arch = open(ruta, "w", encoding="utf-8")
+        arch.write(contenidos[formato])
+        arch.close()
+        temporales.append(ruta)
+        esperado = ingesta.leer_solicitudes(ruta)
+        datos = contenidos[formato].encode("utf-8")
+
+        comprimidos = {
+            ".gz": gzip.compress(datos),
+            ".bz2": bz2.compress(datos),
+            ".xz": lzma.compress(datos),
+        }
+        for ext in comprimidos.keys():
+            arch = open(ruta + ext, "wb")
+            arch.write(comprimidos[ext])
+            arch.close()
+        zf = zipfile.ZipFile(ruta + ".zip", "w", zipfile.ZIP_DEFLATED)
+        zf.writestr("datos." + formato, datos)
+        zf.close()
+
+        for ext in [".gz", ".bz2", ".xz", ".zip"]:
+            temporales.append(ruta + ext)
+            if ingesta.detectar_formato(ruta + ext) != formato:
+                print("  FALLO: formato no detectado en " + ruta + ext)
+                ok = False
+            if ingesta.leer_solicitudes(ruta + ext) != esperado:
+                print("  FALLO: registros distintos en " + ruta + ext)
+                ok = False
+
+    # gzip truncado: error al descomprimir a mitad del archivo
+    ruta = os.path.join(CARPETA_TEST, "temp_truncado.csv.gz")
+    datos = gzip.compress(("id_solicitud\n" + "SOL-001\n" * 5000).encode("utf-8"))
+    arch = open(ruta, "wb")
+    arch.write(datos[: len(datos) // 2])
+    arch.close()
+    temporales.append(ruta)
+    if ingesta.leer_solicitudes(ruta) != None:
+        print("  FALLO: se esperaba None para un gzip truncado")
+        ok = False
+
+    # Limpiar
+    for ruta in temporales:
+        os.remove(ruta)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_lectura_mmap_por_bloques():
+    # DADO un CSV plano con "\r\n", lineas vacias, acentos, un "\r" solo y
+    # lineas que cruzan el limite de bloque
+    # CUANDO se lee con mmap en bloques chicos, se arma la tabla de offsets y
+    # se leen rangos de lineas
+    # ENTONCES las lineas son las mismas que en modo texto, la tabla apunta al
+    # inicio de cada linea y leer_lineas retorna el rango pedido
+    print("TEST: test_lectura_mmap_por_bloques")
+
+    ruta = os.path.join(CARPETA_TEST, "temp_mmap.csv")
+    contenido = "id_solicitud,pais\r\n\r\nSOL-001,Perú\r\nSOL-002,Mexico\rSOL-003,"
+    contenido = contenido + ("x" * 50) + "\n"
+    i = 4
+    while i < 40:
+        contenido = contenido + "SOL-" + str(i).zfill(3) + ",Peñalolén\n"
+        i += 1
+    contenido = contenido + "SOL-999,sin fin de linea"
+    arch = open(ruta, "wb")
+    arch.write(contenido.encode("utf-8"))
+    arch.close()
+
+    ok = True
+    arch = open(ruta, "r", encoding="utf-8")
+    esperado = arch.read().split("\n")
+    arch.close()
+
+    bloque_original = ingesta.BLOQUE_MMAP
+    for bloque in [1, 7, 64, bloque_original]:
+        ingesta.BLOQUE_MMAP = bloque
+        lineas = []
+        for lote in ingesta.iter_bloques_lineas(ruta):
+            lineas.extend(lote)
+        if lineas != esperado:
+            print("  FALLO: lineas distintas con bloques de " + str(bloque))
+            ok = False
+    ingesta.BLOQUE_MMAP = bloque_original
+
+    # Tabla de offsets: inicio de cada linea ("\n") y el tamano al final
+    datos = contenido.encode("utf-8")
+    tabla = ingesta.tabla_lineas(ruta)
+    if tabla[-1] != len(datos) or len(tabla) - 1 != datos.count(b"\n") + 1:
+        print("  FALLO: tabla inesperada: " + str(list(tabla)))
+        ok = False
+    j = 1
+    while j < len(tabla) - 1:
+        if datos[tabla[j] - 1 : tabla[j]] != b"\n":
+            print("  FALLO: offset " + str(tabla[j]) + " no es inicio de linea")
+            ok = False
+        j += 1
+    # La linea 3 de la tabla tiene el "\r" solo: son dos lineas de texto
+    if ingesta.leer_lineas(ruta, tabla, 3, 5) != [
+        "SOL-002,Mexico",
+        "SOL-003," + ("x" * 50),
+        "SOL-004,Peñalolén",
+    ]:
+        print("  FALLO: leer_lineas inesperado")
+        ok = False
+    if ingesta.leer_lineas(ruta, tabla, len(tabla) - 2, len(tabla) + 10) != [
+        "SOL-999,sin fin de linea"
+    ]:
+        print("  FALLO: leer_lineas al final del archivo")
+        ok = False
+
+    # Los registros son los mismos que leyendo todo de una vez
+    registros = ingesta.leer_solicitudes(ruta)
+    if registros == None or len(registros) != 40:
+        print("  FALLO: se esperaban 40 registros")
+        ok = False
+    elif registros[1]["pais"] != "Mexico" or registros[2]["pais"] != "x" * 50:
+        print("  FALLO: el \\r solo no separo las lineas")
+        ok = False
+
+    # Archivo vacio: sin lineas y tabla con solo el tamano
+    ruta_vacio = os.path.join(CARPETA_TEST, "temp_mmap_vacio.csv")
+    arch = open(ruta_vacio, "w")
+    arch.close()
+    if list(ingesta.iter_bloques_lineas(ruta_vacio)) != []:
+        print("  FALLO: se esperaban 0 bloques para un archivo vacio")
+        ok = False
+    if list(ingesta.tabla_lineas(ruta_vacio)) != [0]:
+        print("  FALLO: tabla inesperada para un archivo vacio")
+        ok = False
+
+    # Limpiar
+    os.remove(ruta)
+    os.remove(ruta_vacio)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
 # Ejecutar tests manualmente
 if __name__ == "__main__":
     print("=" * 50)
     print("TESTS DE INGESTA (RF-01)")
     print("=" * 50)
 
-    total = 10
+    total = 16
     aprobados = 0
 
     try:
@@ -459,6 +814,36 @@ if __name__ == "__main__":
         aprobados += 1
     except AssertionError:
         pass
+    try:
+        test_iter_solicitudes_streaming()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_separar_campos_casos_borde()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_json_incremental_bloques_chicos()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_lectura_jsonl()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_lectura_comprimida()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_lectura_mmap_por_bloques()
+        aprobados += 1
+    except AssertionError:
+        pass
 
     print("")
     print("Resultado: " + str(aprobados) + "/" + str(total) + " tests aprobados")
@@ -0,0 +1,197 @@
+# test_ingesta_multiple.py - Tests para la ingesta de varios archivos (RF-01)
+# Verifica el orden del flujo unificado, el origen de cada registro y los
+# archivos con error, leyendo en este proceso y en un pool de procesos
+
+import sys
+import os
+import tempfile
+import gzip
+import json
+
+# Agregar src al path
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+import logger
+import ingesta
+import ingesta_multiple
+
+# Inicializar logger para tests, fuera del repositorio
+CARPETA_LOGS_TEST = os.path.join(tempfile.gettempdir(), "tests_workflow_logs")
+logger.inicializar(CARPETA_LOGS_TEST)
+
+CARPETA_TEST = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_flujo_unificado_con_origen():
+    # DADO un CSV con una linea vacia, un TXT comprimido, un JSON, un JSONL con
+    # una linea invalida y un JSON invalido a mitad del archivo
+    # CUANDO se leen con iter_archivos en este proceso y con 3 workers
+    # ENTONCES se obtienen los registros de cada archivo en orden, archivo por
+    # archivo, con su archivo y linea de origen; el JSON invalido se omite
+    print("TEST: test_flujo_unificado_con_origen")
+
+    ruta_csv = os.path.join(CARPETA_TEST, "temp_multi.csv")
+    arch = open(ruta_csv, "w", encoding="utf-8")
+    arch.write("id_solicitud,moneda\nSOL-C1,ARS\n\nSOL-C2,USD\n")
+    arch.close()
+    ruta_txt = os.path.join(CARPETA_TEST, "temp_multi.txt.gz")
+    arch = gzip.open(ruta_txt, "wt", encoding="utf-8")
+    arch.write("id_solicitud|moneda\nSOL-T1 | EUR\n")
+    arch.close()
+    ruta_json = os.path.join(CARPETA_TEST, "temp_multi.json")
+    arch = open(ruta_json, "w", encoding="utf-8")
+    arch.write(json.dumps([{"id_solicitud": "SOL-J1"}, {"id_solicitud": "SOL-J2"}]))
+    arch.close()
+    ruta_jsonl = os.path.join(CARPETA_TEST, "temp_multi.jsonl")
+    arch = open(ruta_jsonl, "w", encoding="utf-8")
+    arch.write('{"id_solicitud": "SOL-L1"}\nno es json\n{"id_solicitud": "SOL-L2"}\n')
+    arch.close()
+    ruta_invalido = os.path.join(CARPETA_TEST, "temp_multi_invalido.json")
+    arch = open(ruta_invalido, "w", encoding="utf-8")
+    arch.write('[{"id_solicitud": "SOL-X1"},]')
+    arch.close()
+
+    archivos = [ruta_csv, ruta_invalido, ruta_txt, ruta_json, ruta_jsonl]
+    esperado = [
+        ("SOL-C1", ruta_csv, "2"),
+        ("SOL-C2", ruta_csv, "4"),
+        ("SOL-T1", ruta_txt, "2"),
+        ("SOL-J1", ruta_json, "1"),
+        ("SOL-J2", ruta_json, "2"),
+        ("SOL-L1", ruta_jsonl, "1"),
+        ("SOL-L2", ruta_jsonl, "3"),
+    ]
+
+    ok = True
+    for workers in [1, 3]:
+        resumen = []
+        obtenido = []
+        for reg in ingesta_multiple.iter_archivos(archivos, workers, resumen):
+            obtenido.append(
+                (
+                    reg["id_solicitud"],
+                    reg[ingesta_multiple.CAMPO_ARCHIVO],
+                    reg[ingesta_multiple.CAMPO_LINEA],
+                )
+            )
+        if obtenido != esperado:
+            print("  FALLO: flujo inesperado con " + str(workers) + " workers")
+            print("    " + str(obtenido))
+            ok = False
+        estados = []
+        for entrada in resumen:
+            estados.append(entrada["status"])
+        if estados != ["ok", "error", "ok", "ok", "ok"]:
+            print("  FALLO: resumen inesperado: " + str(resumen))
+            ok = False
+
+    # Los registros son los mismos que con leer_solicitudes, mas el origen
+    registros = ingesta_multiple.leer_archivos([ruta_csv], 2)
+    sin_origen = []
+    for reg in registros:
+        copia = dict(reg)
+        del copia[ingesta_multiple.CAMPO_ARCHIVO]
+        del copia[ingesta_multiple.CAMPO_LINEA]
+        sin_origen.append(copia)
+    if sin_origen != ingesta.leer_solicitudes(ruta_csv):
+        print("  FALLO: los registros difieren de leer_solicitudes")
+        ok = False
+
+    # Limpiar
+    for ruta in archivos:
+        os.remove(ruta)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_archivos_en_partes_y_corte_anticipado():
+    # DADO tres CSV de 30 registros, partes de 4 registros y colas de 1 parte
+    # CUANDO se leen con 2 workers completos y cortando la iteracion a mitad
+    # ENTONCES los registros llegan en orden aunque cada archivo viaje en
+    # varias partes, y al cortar el generador se cierra sin quedar esperando
+    # a los workers con la cola llena
+    print("TEST: test_archivos_en_partes_y_corte_anticipado")
+
+    archivos = []
+    esperado = []
+    for letra in ["A", "B", "C"]:
+        ruta = os.path.join(CARPETA_TEST, "temp_partes_" + letra + ".csv")
+        arch = open(ruta, "w", encoding="utf-8")
+        arch.write("id_solicitud,moneda\n")
+        i = 0
+        while i < 30:
+            arch.write("SOL-" + letra + str(i) + ",ARS\n")
+            esperado.append("SOL-" + letra + str(i))
+            i += 1
+        arch.close()
+        archivos.append(ruta)
+
+    ok = True
+    registros_por_parte = ingesta_multiple.REGISTROS_POR_PARTE
+    partes_por_cola = ingesta_multiple.PARTES_POR_COLA
+    ingesta_multiple.REGISTROS_POR_PARTE = 4
+    ingesta_multiple.PARTES_POR_COLA = 1
+    try:
+        resumen = []
+        obtenido = []
+        for reg in ingesta_multiple.iter_archivos(archivos, 2, resumen):
+            obtenido.append(reg["id_solicitud"])
+        if obtenido != esperado:
+            print("  FALLO: registros en partes fuera de orden: " + str(obtenido))
+            ok = False
+        registros = []
+        for entrada in resumen:
+            registros.append(entrada["registros"])
+        if registros != [30, 30, 30]:
+            print("  FALLO: resumen inesperado: " + str(resumen))
+            ok = False
+
+        flujo = ingesta_multiple.iter_archivos(archivos, 2)
+        primeros = []
+        for reg in flujo:
+            primeros.append(reg["id_solicitud"])
+            if len(primeros) == 5:
+                break
+        flujo.close()
+        if primeros != esperado[0:5]:
+            print("  FALLO: primeros registros inesperados: " + str(primeros))
+            ok = False
+    finally:
+        ingesta_multiple.REGISTROS_POR_PARTE = registros_por_parte
+        ingesta_multiple.PARTES_POR_COLA = partes_por_cola
+
+    # Limpiar
+    for ruta in archivos:
+        os.remove(ruta)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+# Ejecutar tests manualmente
+if __name__ == "__main__":
+    print("=" * 50)
+    print("TESTS DE INGESTA MULTIPLE (RF-01)")
+    print("=" * 50)
+
+    total = 2
+    aprobados = 0
+
+    try:
+        test_flujo_unificado_con_origen()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_archivos_en_partes_y_corte_anticipado()
+        aprobados += 1
+    except AssertionError:
+        pass
+
+    print("")
+    print("Resultado: " + str(aprobados) + "/" + str(total) + " tests aprobados")
@@ -0,0 +1,217 @@
+# test_logger.py - Tests para el modulo de logging (RNF-01)
+# Verifica formato de linea y escritura asincronica por lotes
+
+import sys
+import os
+import tempfile
+import shutil
+import threading
+
+# Agregar src al path
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+import logger
+
+CARPETA_TEST = os.path.dirname(os.path.abspath(__file__))
+
+# Log por defecto de los tests, fuera del repositorio
+CARPETA_LOGS_TEST = os.path.join(tempfile.gettempdir(), "tests_workflow_logs")
+
+
+def leer_lineas(ruta):
+    # Lee un archivo de log y retorna sus lineas sin salto de linea
+    arch = open(ruta, "r", encoding="utf-8")
+    lineas = []
+    for linea in arch:
+        lineas.append(linea[:-1])
+    arch.close()
+    return lineas
+
+
+def test_log_asincronico_mismo_formato():
+    # DADO un logger inicializado en modo asincronico
+    # CUANDO se registran muchos mensajes y se llama a cerrar()
+    # ENTONCES el archivo tiene todas las lineas, en orden y con el formato de siempre
+    print("TEST: test_log_asincronico_mismo_formato")
+
+    carpeta = os.path.join(CARPETA_TEST, "temp_logs_async")
+    ruta = logger.inicializar(carpeta, "workflow.log", asincronico=True)
+    lineas_esperadas = []
+    i = 0
+    while i < 2500:
+        lineas_esperadas.append(logger.warn("TEST", "mensaje " + str(i)))
+        i += 1
+    logger.flush()
+    escritas_antes_de_cerrar = len(leer_lineas(ruta))
+    logger.cerrar()
+
+    ok = True
+    lineas = leer_lineas(ruta)
+    if escritas_antes_de_cerrar != 2500:
+        print("  FALLO: flush() no dejo todas las lineas escritas")
+        ok = False
+    if lineas != lineas_esperadas:
+        print("  FALLO: el archivo no coincide con las lineas registradas")
+        ok = False
+    elif lineas[0][0] != "[" or "] [WARN] [TEST] mensaje 0" not in lineas[0]:
+        print("  FALLO: formato de linea inesperado: " + lineas[0])
+        ok = False
+
+    # Despues de cerrar() se sigue registrando en modo sincronico
+    logger.info("TEST", "despues de cerrar")
+    if "despues de cerrar" not in leer_lineas(ruta)[-1]:
+        print("  FALLO: el log no sigue funcionando despues de cerrar()")
+        ok = False
+
+    # Limpiar y volver al log de los tests
+    logger.inicializar(CARPETA_LOGS_TEST)
+    if os.path.exists(carpeta):
+        shutil.rmtree(carpeta)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_warn_agregado_limita_y_resume():
+    # DADO un limite de 3 WARN por tipo y resumen cada 5 suprimidos
+    # CUANDO se registran 12 WARN del mismo tipo y 1 de otro tipo
+    # ENTONCES se loguean 3 + 1 completos, un resumen periodico y el total final
+    print("TEST: test_warn_agregado_limita_y_resume")
+
+    carpeta = os.path.join(CARPETA_TEST, "temp_logs_agregado")
+    ruta = logger.inicializar(carpeta, "workflow.log")
+    logger.configurar_agregacion(3, 5)
+    suprimidos = 0
+    i = 0
+    while i < 12:
+        if logger.warn_agregado("VALIDADOR", "tipo A", "registro " + str(i)) == None:
+            suprimidos += 1
+        i += 1
+    logger.warn_agregado("VALIDADOR", "tipo B", "otro mensaje")
+    logger.emitir_resumen_suprimidos()
+    logger.configurar_agregacion(0)
+
+    ok = True
+    lineas = leer_lineas(ruta)
+    completos = 0
+    for linea in lineas:
+        if "] registro " in linea:
+            completos += 1
+    if suprimidos != 9:
+        print("  FALLO: se esperaban 9 mensajes suprimidos, hubo " + str(suprimidos))
+        ok = False
+    elif completos != 3:
+        print("  FALLO: se esperaban 3 WARN completos de tipo A, hubo " + str(completos))
+        ok = False
+    elif "tipo A: 5 mensajes mas suprimidos" not in lineas[3]:
+        print("  FALLO: falta el resumen periodico: " + lineas[3])
+        ok = False
+    elif "otro mensaje" not in lineas[4]:
+        print("  FALLO: el tipo B no deberia suprimirse")
+        ok = False
+    elif "tipo A: 4 mensajes mas suprimidos" not in lineas[5]:
+        print("  FALLO: falta el resumen de suprimidos pendientes")
+        ok = False
+    elif "tipo A: 12 ocurrencias en total (9 suprimidas del log)" not in lineas[6]:
+        print("  FALLO: falta el total por tipo al final")
+        ok = False
+    elif len(lineas) != 7:
+        print("  FALLO: se esperaban 7 lineas, hay " + str(len(lineas)))
+        ok = False
+
+    # Limpiar y volver al log de los tests
+    logger.inicializar(CARPETA_LOGS_TEST)
+    if os.path.exists(carpeta):
+        shutil.rmtree(carpeta)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+class SalidaRota:
+    # Reemplazo de sys.stdout cuya escritura falla (pipe cerrado)
+
+    def write(self, texto):
+        raise BrokenPipeError("stdout cerrado")
+
+
+class SysConSalidaRota:
+    # Reemplazo del modulo sys dentro de logger: solo el hilo escritor lo usa
+    stdout = SalidaRota()
+
+
+def test_log_asincronico_escritor_con_error():
+    # DADO un logger asincronico cuyo hilo escritor no puede escribir
+    # CUANDO se registran mensajes y se llama a flush()
+    # ENTONCES flush() no queda esperando, el error queda en ERROR_ESCRITOR y
+    # los mensajes siguientes se escriben en modo sincronico
+    print("TEST: test_log_asincronico_escritor_con_error")
+
+    carpeta = os.path.join(CARPETA_TEST, "temp_logs_error")
+    ruta = logger.inicializar(carpeta, "workflow.log", asincronico=True)
+    ok = True
+    if logger.COLA.maxsize != logger.MAX_LINEAS_EN_COLA:
+        print("  FALLO: la cola del escritor deberia tener un limite")
+        ok = False
+    logger.sys = SysConSalidaRota
+    try:
+        logger.warn("TEST", "se pierde con el escritor roto")
+        hilo = threading.Thread(target=logger.flush, daemon=True)
+        hilo.start()
+        hilo.join(5)
+    finally:
+        logger.sys = sys
+    if hilo.is_alive():
+        print("  FALLO: flush() quedo esperando al escritor")
+        ok = False
+    elif not isinstance(logger.ERROR_ESCRITOR, BrokenPipeError):
+        print("  FALLO: no se registro el error del escritor")
+        ok = False
+    else:
+        logger.info("TEST", "despues del error")
+        if "despues del error" not in leer_lineas(ruta)[-1]:
+            print("  FALLO: el log deberia seguir en modo sincronico")
+            ok = False
+        logger.cerrar()
+
+    # Limpiar y volver al log de los tests
+    logger.inicializar(CARPETA_LOGS_TEST)
+    if os.path.exists(carpeta):
+        shutil.rmtree(carpeta)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+# Ejecutar tests manualmente
+if __name__ == "__main__":
+    print("=" * 50)
+    print("TESTS DE LOGGER (RNF-01)")
+    print("=" * 50)
+
+    total = 3
+    aprobados = 0
+
+    try:
+        test_log_asincronico_mismo_formato()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_warn_agregado_limita_y_resume()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_log_asincronico_escritor_con_error()
+        aprobados += 1
+    except AssertionError:
+        pass
+
+    print("")
+    print("Resultado: " + str(aprobados) + "/" + str(total) + " tests aprobados")
@@ -0,0 +1,246 @@
+# test_lote.py - Tests para el procesamiento por lotes (RF-05)
+# Verifica que el lote procese cada archivo soportado y consolide el resumen
+
+import sys
+import os
+import tempfile
+import json
+import shutil
+import signal
+
+# Agregar src al path
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+import logger
+import checkpoint
+import lote
+
+# Inicializar logger para tests, fuera del repositorio
+CARPETA_LOGS_TEST = os.path.join(tempfile.gettempdir(), "tests_workflow_logs")
+logger.inicializar(CARPETA_LOGS_TEST)
+
+CARPETA_TEST = os.path.dirname(os.path.abspath(__file__))
+
+# Header estandar de los CSV de prueba
+HEADER_CSV = "id_solicitud,fecha_solicitud,tipo_producto,id_cliente,monto_o_limite,moneda,pais,flag_prioritario,flag_digital\n"
+
+# Funcion original de checkpoint.py que el test de interrupcion reemplaza
+GUARDAR_ORIGINAL = checkpoint.guardar
+
+
+class TerminarWorker:
+    # Al deserializarse en un proceso worker lo termina de golpe (como un
+    # worker que muere por falta de memoria)
+
+    def __reduce__(self):
+        return (os._exit, (1,))
+
+
+def guardar_e_interrumpir(carpeta, estado):
+    # Guarda el checkpoint y el proceso recibe SIGTERM
+    ruta = GUARDAR_ORIGINAL(carpeta, estado)
+    os.kill(os.getpid(), signal.SIGTERM)
+    return ruta
+
+
+def test_lote_carpeta_serial_y_paralelo():
+    # DADO una carpeta con un CSV, un TXT, un CSV vacio y un archivo no soportado
+    # CUANDO se ejecuta el lote en un proceso y con 2 workers
+    # ENTONCES se procesan los 3 archivos soportados (en orden), cada uno con
+    # su carpeta de ejecucion, y resumen_lote.json consolida los totales
+    print("TEST: test_lote_carpeta_serial_y_paralelo")
+
+    carpeta_entrada = os.path.join(CARPETA_TEST, "temp_lote")
+    os.makedirs(carpeta_entrada, exist_ok=True)
+    arch = open(os.path.join(carpeta_entrada, "a.csv"), "w", encoding="utf-8")
+    arch.write(HEADER_CSV)
+    arch.write("SOL-001,15/03/2025,cuenta,CLI-1,50000,ARS,argentina,S,N\n")
+    arch.write("SOL-002,15/03/2025,cuenta,CLI-2,50000,GBP,argentina,S,N\n")
+    arch.close()
+    arch = open(os.path.join(carpeta_entrada, "b.txt"), "w", encoding="utf-8")
+    arch.write(HEADER_CSV.replace(",", "|"))
+    arch.write("SOL-003|2025-06-20|tarjeta|CLI-3|1000|USD|chile|N|S\n")
+    arch.close()
+    arch = open(os.path.join(carpeta_entrada, "c.csv"), "w", encoding="utf-8")
+    arch.write("")
+    arch.close()
+    arch = open(os.path.join(carpeta_entrada, "notas.md"), "w", encoding="utf-8")
+    arch.write("no es una entrada")
+    arch.close()
+
+    ok = True
+    for workers in [1, 2]:
+        resultado = lote.ejecutar_lote(carpeta_entrada, CARPETA_TEST, workers)
+        if resultado["status"] != "ok":
+            print("  FALLO: status esperado 'ok', obtenido " + resultado["status"])
+            ok = False
+            continue
+        arch = open(resultado["archivo_resumen"], "r", encoding="utf-8")
+        resumen = json.loads(arch.read())
+        arch.close()
+        r = resumen["resumen"]
+        nombres = []
+        for entrada in resumen["archivos"]:
+            nombres.append(os.path.basename(entrada["archivo"]))
+        if nombres != ["a.csv", "b.txt", "c.csv"]:
+            print("  FALLO: archivos del lote inesperados: " + str(nombres))
+            ok = False
+        elif (
+            r["archivos_ok"] != 2
+            or r["archivos_vacios"] != 1
+            or r["total_procesados"] != 3
+            or r["total_validos"] != 2
+        ):
+            print("  FALLO: resumen consolidado inesperado: " + str(r))
+            ok = False
+        for entrada in resumen["archivos"]:
+            carpeta = entrada["carpeta_ejecucion"]
+            if carpeta == None or not os.path.isdir(carpeta):
+                print("  FALLO: falta la carpeta de ejecucion de " + entrada["archivo"])
+                ok = False
+            else:
+                shutil.rmtree(carpeta)
+        shutil.rmtree(resultado["carpeta_ejecucion"])
+
+    # Limpiar
+    shutil.rmtree(carpeta_entrada)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_lote_interrumpido_con_checkpoint():
+    # DADO una carpeta con dos CSV y un lote con checkpoints
+    # CUANDO el proceso recibe SIGTERM mientras procesa el primer archivo
+    # ENTONCES el primero queda interrumpido con su checkpoint, el segundo no
+    # se procesa y resumen_lote.json se escribe con status "interrumpido"; un
+    # lote posterior en el mismo proceso se procesa completo
+    print("TEST: test_lote_interrumpido_con_checkpoint")
+
+    carpeta_entrada = os.path.join(CARPETA_TEST, "temp_lote_interrumpido")
+    os.makedirs(carpeta_entrada, exist_ok=True)
+    for nombre in ["a.csv", "b.csv"]:
+        arch = open(os.path.join(carpeta_entrada, nombre), "w", encoding="utf-8")
+        arch.write(HEADER_CSV)
+        arch.write("SOL-001,15/03/2025,cuenta,CLI-1,50000,ARS,argentina,S,N\n")
+        arch.close()
+
+    ok = True
+    checkpoint.guardar = guardar_e_interrumpir
+    try:
+        resultado = lote.ejecutar_lote(
+            carpeta_entrada, CARPETA_TEST, 1, {"usar_checkpoint": True}
+        )
+    finally:
+        checkpoint.guardar = GUARDAR_ORIGINAL
+    if resultado["status"] != "interrumpido" or resultado["archivo_resumen"] == None:
+        print("  FALLO: se esperaba un lote interrumpido con resumen")
+        ok = False
+    else:
+        r = resultado["resumen"]["resumen"]
+        entradas = resultado["resumen"]["archivos"]
+        if (
+            r["total_archivos"] != 2
+            or r["archivos_interrumpidos"] != 1
+            or r["archivos_sin_procesar"] != 1
+            or len(entradas) != 1
+        ):
+            print("  FALLO: resumen del lote inesperado: " + str(r))
+            ok = False
+        for entrada in entradas:
+            if checkpoint.cargar(entrada["carpeta_ejecucion"])[0] == None:
+                print("  FALLO: el archivo interrumpido no dejo checkpoint")
+                ok = False
+            shutil.rmtree(entrada["carpeta_ejecucion"])
+    # Volver al log de los tests antes de borrar la carpeta del lote
+    logger.inicializar(CARPETA_LOGS_TEST)
+    shutil.rmtree(resultado["carpeta_ejecucion"])
+
+    # Un lote nuevo en el mismo proceso no hereda la interrupcion anterior
+    resultado = lote.ejecutar_lote(
+        carpeta_entrada, CARPETA_TEST, 1, {"usar_checkpoint": True}
+    )
+    if resultado["status"] != "ok":
+        print("  FALLO: el lote siguiente deberia terminar en 'ok'")
+        ok = False
+    for entrada in resultado["resumen"]["archivos"]:
+        shutil.rmtree(entrada["carpeta_ejecucion"])
+    logger.inicializar(CARPETA_LOGS_TEST)
+    shutil.rmtree(resultado["carpeta_ejecucion"])
+
+    # Limpiar
+    shutil.rmtree(carpeta_entrada)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_lote_paralelo_worker_caido():
+    # DADO una carpeta con dos CSV y un lote con 2 workers
+    # CUANDO los procesos worker terminan de golpe
+    # ENTONCES el lote no se corta con una excepcion: los archivos quedan con
+    # status "error" y resumen_lote.json se escribe
+    print("TEST: test_lote_paralelo_worker_caido")
+
+    carpeta_entrada = os.path.join(CARPETA_TEST, "temp_lote_worker_caido")
+    os.makedirs(carpeta_entrada, exist_ok=True)
+    for nombre in ["a.csv", "b.csv"]:
+        arch = open(os.path.join(carpeta_entrada, nombre), "w", encoding="utf-8")
+        arch.write(HEADER_CSV)
+        arch.write("SOL-001,15/03/2025,cuenta,CLI-1,50000,ARS,argentina,S,N\n")
+        arch.close()
+
+    ok = True
+    resultado = lote.ejecutar_lote(
+        carpeta_entrada, CARPETA_TEST, 2, {"terminar": TerminarWorker()}
+    )
+    if resultado["status"] != "error" or not os.path.exists(
+        resultado["archivo_resumen"]
+    ):
+        print("  FALLO: se esperaba un lote con error y resumen")
+        ok = False
+    elif resultado["resumen"]["resumen"]["archivos_con_error"] != 2:
+        print("  FALLO: resumen inesperado: " + str(resultado["resumen"]["resumen"]))
+        ok = False
+    logger.inicializar(CARPETA_LOGS_TEST)
+    shutil.rmtree(resultado["carpeta_ejecucion"])
+
+    # Limpiar
+    shutil.rmtree(carpeta_entrada)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+# Ejecutar tests manualmente
+if __name__ == "__main__":
+    print("=" * 50)
+    print("TESTS DE PROCESAMIENTO POR LOTES (RF-05)")
+    print("=" * 50)
+
+    total = 3
+    aprobados = 0
+
+    try:
+        test_lote_carpeta_serial_y_paralelo()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_lote_interrumpido_con_checkpoint()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_lote_paralelo_worker_caido()
+        aprobados += 1
+    except AssertionError:
+        pass
+
+    print("")
+    print("Resultado: " + str(aprobados) + "/" + str(total) + " tests aprobados")
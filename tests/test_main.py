@@ -3,6 +3,9 @@
 
 import sys
 import os
+import tempfile
+import gzip
+import inspect
 import json
 import shutil
 
@@ -14,11 +17,54 @@ sys.path.insert(
 import logger
 import main
 
-# Inicializar logger para tests
-logger.inicializar()
+# Inicializar logger para tests, fuera del repositorio
+CARPETA_LOGS_TEST = os.path.join(tempfile.gettempdir(), "tests_workflow_logs")
+logger.inicializar(CARPETA_LOGS_TEST)
 
 CARPETA_TEST = os.path.dirname(os.path.abspath(__file__))
 
+# Header estandar de los CSV de prueba
+HEADER_CSV = "id_solicitud,fecha_solicitud,tipo_producto,id_cliente,monto_o_limite,moneda,pais,flag_prioritario,flag_digital\n"
+
+
+def borrar_carpeta_ejecucion(carpeta):
+    # Vuelve al log de los tests y borra la carpeta de una ejecucion: main.main
+    # deja activo su workflow.log y el siguiente mensaje recrearia la carpeta
+    logger.inicializar(CARPETA_LOGS_TEST)
+    shutil.rmtree(carpeta)
+
+
+def leer_texto(ruta):
+    # Lee un archivo completo como texto (descomprime si termina en .gz)
+    if ruta.endswith(".gz"):
+        arch = gzip.open(ruta, "rt", encoding="utf-8")
+    else:
+        arch = open(ruta, "r", encoding="utf-8")
+    contenido = arch.read()
+    arch.close()
+    return contenido
+
+
+def ejecutar_y_leer_artefactos(ruta_entrada, **opciones):
+    # Ejecuta main.main y retorna (status, csv de salida, reporte sin timestamp
+    # ni metricas, que cambian en cada corrida)
+    # Borra la carpeta de ejecucion al terminar
+    resultado = main.main(
+        archivo_entrada_param=ruta_entrada, dir_data_param=CARPETA_TEST, **opciones
+    )
+    csv_salida = None
+    reporte = None
+    if resultado["status"] == "ok":
+        csv_salida = leer_texto(resultado["archivo_salida"])
+        reporte = json.loads(leer_texto(resultado["archivo_reporte"]))
+        del reporte["timestamp"]
+        del reporte["metricas"]
+    if resultado["carpeta_ejecucion"] != None and os.path.exists(
+        resultado["carpeta_ejecucion"]
+    ):
+        borrar_carpeta_ejecucion(resultado["carpeta_ejecucion"])
+    return resultado["status"], csv_salida, reporte
+
 
 def test_workflow_completo_e2e():
     # DADO un archivo CSV con registros validos e invalidos
@@ -140,7 +186,7 @@ def test_workflow_completo_e2e():
     if os.path.exists(ruta_csv):
         os.remove(ruta_csv)
     if carpeta_ejecucion != "" and os.path.exists(carpeta_ejecucion):
-        shutil.rmtree(carpeta_ejecucion)
+        borrar_carpeta_ejecucion(carpeta_ejecucion)
 
     if ok:
         print("  OK")
@@ -192,7 +238,7 @@ def test_abort_archivo_inexistente():
         ok = False
 
     if carpeta_ejecucion != "" and os.path.exists(carpeta_ejecucion):
-        shutil.rmtree(carpeta_ejecucion)
+        borrar_carpeta_ejecucion(carpeta_ejecucion)
 
     if ok:
         print("  OK")
@@ -256,7 +302,7 @@ def test_abort_archivo_vacio():
     if os.path.exists(ruta_csv):
         os.remove(ruta_csv)
     if carpeta_ejecucion != "" and os.path.exists(carpeta_ejecucion):
-        shutil.rmtree(carpeta_ejecucion)
+        borrar_carpeta_ejecucion(carpeta_ejecucion)
 
     if ok:
         print("  OK")
@@ -364,13 +410,13 @@ def test_ejecuciones_consecutivas_no_sobrescriben():
         and "carpeta_ejecucion" in r1.keys()
         and os.path.exists(r1["carpeta_ejecucion"])
     ):
-        shutil.rmtree(r1["carpeta_ejecucion"])
+        borrar_carpeta_ejecucion(r1["carpeta_ejecucion"])
     if (
         r2 != None
         and "carpeta_ejecucion" in r2.keys()
         and os.path.exists(r2["carpeta_ejecucion"])
     ):
-        shutil.rmtree(r2["carpeta_ejecucion"])
+        borrar_carpeta_ejecucion(r2["carpeta_ejecucion"])
 
     if ok:
         print("  OK")
@@ -519,7 +565,7 @@ def test_workflow_completo_json_e2e():
     if os.path.exists(ruta_json):
         os.remove(ruta_json)
     if carpeta_ejecucion != "" and os.path.exists(carpeta_ejecucion):
-        shutil.rmtree(carpeta_ejecucion)
+        borrar_carpeta_ejecucion(carpeta_ejecucion)
 
     if ok:
         print("  OK")
@@ -638,7 +684,826 @@ def test_workflow_completo_txt_e2e():
     if os.path.exists(ruta_txt):
         os.remove(ruta_txt)
     if carpeta_ejecucion != "" and os.path.exists(carpeta_ejecucion):
-        shutil.rmtree(carpeta_ejecucion)
+        borrar_carpeta_ejecucion(carpeta_ejecucion)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_modo_streaming_igual_a_clasico():
+    # DADO un CSV con registros validos, invalidos y fechas a convertir
+    # CUANDO se ejecuta el workflow en modo streaming
+    # ENTONCES el CSV de salida y el reporte son identicos al modo por etapas
+    print("TEST: test_modo_streaming_igual_a_clasico")
+
+    ruta_csv = os.path.join(CARPETA_TEST, "temp_streaming.csv")
+    arch = open(ruta_csv, "w", encoding="utf-8")
+    arch.write(HEADER_CSV)
+    arch.write("SOL-S01,15/03/2025,cuenta,CLI-100,50000,ars,argentina,S,N\n")
+    arch.write("SOL-S02,2025-06-20,tarjeta,CLI-200,750000,USD,Brasil,N,S\n")
+    arch.write('SOL-S03,10/01/2025,,CLI-300,"30,5",GBP,Chile,S,N\n')
+    arch.write("SOL-S04,99-99-2025,servicio,CLI-400,-10,EUR,uruguay,N,N\n")
+    arch.close()
+
+    clasico = ejecutar_y_leer_artefactos(ruta_csv)
+    streaming = ejecutar_y_leer_artefactos(ruta_csv, modo_streaming=True)
+
+    ok = True
+    if clasico[0] != "ok" or streaming[0] != "ok":
+        print("  FALLO: ambas ejecuciones deberian terminar en status 'ok'")
+        ok = False
+    elif clasico[1] != streaming[1]:
+        print("  FALLO: el CSV de salida difiere entre modos")
+        ok = False
+    elif clasico[2] != streaming[2]:
+        print("  FALLO: el reporte de calidad difiere entre modos")
+        ok = False
+
+    # Un archivo solo con header tambien se detecta como vacio en streaming
+    arch = open(ruta_csv, "w", encoding="utf-8")
+    arch.write(HEADER_CSV)
+    arch.close()
+    vacio = ejecutar_y_leer_artefactos(ruta_csv, modo_streaming=True)
+    if vacio[0] != "empty":
+        print("  FALLO: se esperaba status 'empty', se obtuvo '" + vacio[0] + "'")
+        ok = False
+
+    # Limpiar
+    os.remove(ruta_csv)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_exportar_csv_escape_y_bloques():
+    # DADO registros con comas, comillas y valores None, en mas de un bloque
+    # CUANDO se exporta a CSV con escrituras por bloques
+    # ENTONCES cada fila se escapa correctamente y no se pierden filas
+    print("TEST: test_exportar_csv_escape_y_bloques")
+
+    registros = []
+    i = 0
+    while i < 7:
+        registros.append(
+            {
+                "id_solicitud": "SOL-B0" + str(i),
+                "tipo_producto": "cuenta, ahorros",
+                "pais": 'Argentina "AR"',
+                "monto_o_limite": 1000 + i,
+                "moneda": None,
+                "estado": "VALIDO",
+            }
+        )
+        i += 1
+
+    carpeta_export = os.path.join(CARPETA_TEST, "temp_export_bloques")
+    ruta_salida = os.path.join(carpeta_export, "temp_bloques.csv")
+    filas_original = main.FILAS_POR_ESCRITURA
+    main.FILAS_POR_ESCRITURA = 3
+    total = main.exportar_csv(registros, ruta_salida)
+    main.FILAS_POR_ESCRITURA = filas_original
+
+    ok = True
+    lineas = leer_texto(ruta_salida).split("\n")
+    esperada = 'SOL-B00,,"cuenta, ahorros",,1000,,"Argentina ""AR""",,,,VALIDO,'
+    if total != 7:
+        print("  FALLO: se esperaban 7 registros exportados, se obtuvo " + str(total))
+        ok = False
+    elif len(lineas) != 9 or lineas[8] != "":
+        print("  FALLO: se esperaban header + 7 filas terminadas en salto de linea")
+        ok = False
+    elif lineas[1] != esperada:
+        print("  FALLO: fila escapada incorrecta: " + lineas[1])
+        ok = False
+    elif lineas[7][0:7] != "SOL-B06":
+        print("  FALLO: la ultima fila no corresponde al ultimo registro")
+        ok = False
+
+    # Limpiar
+    if os.path.exists(carpeta_export):
+        shutil.rmtree(carpeta_export)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_modo_paralelo_igual_a_clasico():
+    # DADO un CSV y un TXT con registros validos, invalidos y lineas vacias
+    # CUANDO se ejecuta el workflow con 2 workers
+    # ENTONCES el CSV de salida y el reporte son identicos a la ejecucion serial
+    print("TEST: test_modo_paralelo_igual_a_clasico")
+
+    ruta_csv = os.path.join(CARPETA_TEST, "temp_paralelo.csv")
+    ruta_txt = os.path.join(CARPETA_TEST, "temp_paralelo.txt")
+    arch_csv = open(ruta_csv, "w", encoding="utf-8")
+    arch_txt = open(ruta_txt, "w", encoding="utf-8")
+    arch_csv.write(HEADER_CSV)
+    arch_txt.write(HEADER_CSV.replace(",", "|"))
+    monedas = ["ARS", "usd", "GBP", "EUR", ""]
+    fechas = ["15/03/2025", "2025-06-20", "32/13/2025", "10-01-2025", "sin fecha"]
+    montos = ["50000", "750000", "-10", "abc", "1000000000"]
+    i = 0
+    while i < 120:
+        campos = [
+            "SOL-P" + str(i),
+            fechas[i % 5],
+            "cuenta",
+            "CLI-" + str(i),
+            montos[(i // 5) % 5],
+            monedas[(i // 3) % 5],
+            "argentina",
+            "S",
+            "N",
+        ]
+        arch_csv.write(",".join(campos) + "\n")
+        arch_txt.write(" | ".join(campos) + "\n")
+        if i % 25 == 0:
+            arch_csv.write("\n")
+        i += 1
+    arch_csv.close()
+    arch_txt.close()
+
+    ok = True
+    for ruta in [ruta_csv, ruta_txt]:
+        serial = ejecutar_y_leer_artefactos(ruta)
+        paralelo = ejecutar_y_leer_artefactos(ruta, workers=2)
+        if serial[0] != "ok" or paralelo[0] != "ok":
+            print("  FALLO: ambas ejecuciones deberian terminar en status 'ok'")
+            ok = False
+        elif serial[1] != paralelo[1]:
+            print("  FALLO: el CSV de salida difiere con workers en " + ruta)
+            ok = False
+        elif serial[2] != paralelo[2]:
+            print("  FALLO: el reporte de calidad difiere con workers en " + ruta)
+            ok = False
+
+    # Limpiar
+    os.remove(ruta_csv)
+    os.remove(ruta_txt)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_metricas_por_etapa():
+    # DADO un CSV con registros
+    # CUANDO se ejecuta el workflow clasico (midiendo memoria) y en streaming
+    # ENTONCES cada ejecucion deja metricas.json y la seccion "metricas" del
+    # reporte con sus etapas (en streaming normalizacion y validacion son una
+    # sola pasada), duracion y registros/s
+    print("TEST: test_metricas_por_etapa")
+
+    ruta = os.path.join(CARPETA_TEST, "temp_metricas.csv")
+    arch = open(ruta, "w", encoding="utf-8")
+    arch.write(HEADER_CSV)
+    i = 0
+    while i < 50:
+        arch.write(
+            "SOL-M" + str(i) + ",15/03/2025,cuenta,CLI-1,5000,ARS,argentina,S,N\n"
+        )
+        i += 1
+    arch.close()
+
+    etapas_clasico = [
+        "ingesta",
+        "normalizacion",
+        "validacion",
+        "calidad",
+        "exportacion",
+    ]
+    etapas_streaming = ["ingesta", "normalizacion_validacion", "calidad", "exportacion"]
+    ok = True
+    for opciones in [{"medir_memoria": True}, {"modo_streaming": True}]:
+        if "modo_streaming" in opciones.keys():
+            etapas = etapas_streaming
+        else:
+            etapas = etapas_clasico
+        resultado = main.main(
+            archivo_entrada_param=ruta, dir_data_param=CARPETA_TEST, **opciones
+        )
+        carpeta = resultado["carpeta_ejecucion"]
+        ruta_metricas = os.path.join(carpeta, "metricas.json")
+        if not os.path.exists(ruta_metricas):
+            print("  FALLO: no se genero metricas.json")
+            ok = False
+        else:
+            guardadas = json.loads(leer_texto(ruta_metricas))
+            reporte = json.loads(leer_texto(resultado["archivo_reporte"]))
+            if "metricas" not in reporte.keys():
+                print("  FALLO: el reporte no tiene la seccion metricas")
+                ok = False
+            elif list(reporte["metricas"]["etapas"].keys()) != etapas:
+                print("  FALLO: etapas inesperadas: " + str(reporte["metricas"]))
+                ok = False
+            elif guardadas["etapas"] != reporte["metricas"]["etapas"]:
+                print("  FALLO: metricas.json difiere del reporte")
+                ok = False
+            else:
+                for etapa in etapas:
+                    datos = reporte["metricas"]["etapas"][etapa]
+                    if datos["registros"] != 50 or datos["duracion_s"] < 0:
+                        print("  FALLO: metricas invalidas en " + etapa)
+                        ok = False
+                    medida = "pico_memoria_mb" in datos.keys()
+                    if medida != ("medir_memoria" in opciones.keys()):
+                        print("  FALLO: pico de memoria inesperado en " + etapa)
+                        ok = False
+        borrar_carpeta_ejecucion(carpeta)
+
+    os.remove(ruta)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_entrada_y_salida_jsonl():
+    # DADO los mismos registros en un CSV y en un JSONL
+    # CUANDO se procesa el JSONL (serial y con 2 workers) y se exporta en JSONL
+    # ENTONCES el resultado coincide con el del CSV, y cada linea de la salida
+    # JSONL tiene los mismos valores que la fila del CSV de salida
+    print("TEST: test_entrada_y_salida_jsonl")
+
+    ruta_csv = os.path.join(CARPETA_TEST, "temp_lineas.csv")
+    ruta_jsonl = os.path.join(CARPETA_TEST, "temp_lineas.jsonl")
+    arch_csv = open(ruta_csv, "w", encoding="utf-8")
+    arch_jsonl = open(ruta_jsonl, "w", encoding="utf-8")
+    arch_csv.write(HEADER_CSV)
+    campos = HEADER_CSV.strip().split(",")
+    monedas = ["ARS", "usd", "GBP", "EUR"]
+    i = 0
+    while i < 60:
+        valores = [
+            "SOL-J" + str(i),
+            "15/03/2025",
+            "cuenta",
+            "CLI-" + str(i),
+            str(1000 * (i + 1)),
+            monedas[i % 4],
+            "argentina",
+            "S",
+            "N",
+        ]
+        arch_csv.write(",".join(valores) + "\n")
+        reg = {}
+        j = 0
+        while j < len(campos):
+            reg[campos[j]] = valores[j]
+            j += 1
+        arch_jsonl.write(json.dumps(reg) + "\n")
+        i += 1
+    arch_csv.close()
+    arch_jsonl.close()
+
+    ok = True
+    desde_csv = ejecutar_y_leer_artefactos(ruta_csv)
+    desde_jsonl = ejecutar_y_leer_artefactos(ruta_jsonl)
+    paralelo = ejecutar_y_leer_artefactos(ruta_jsonl, workers=2)
+    salida_jsonl = ejecutar_y_leer_artefactos(ruta_csv, formato_salida="jsonl")
+    if desde_csv[0] != "ok" or desde_jsonl[0] != "ok" or paralelo[0] != "ok":
+        print("  FALLO: las ejecuciones deberian terminar en status 'ok'")
+        ok = False
+    elif desde_csv[1] != desde_jsonl[1] or desde_jsonl[1] != paralelo[1]:
+        print("  FALLO: el CSV de salida difiere segun el formato de entrada")
+        ok = False
+    elif desde_csv[2]["resumen"] != desde_jsonl[2]["resumen"]:
+        print("  FALLO: el resumen del reporte difiere segun el formato de entrada")
+        ok = False
+    else:
+        filas_csv = desde_csv[1].strip().split("\n")
+        encabezados = filas_csv[0].split(",")
+        lineas = salida_jsonl[1].strip().split("\n")
+        if len(lineas) != len(filas_csv) - 1:
+            print("  FALLO: la salida JSONL no tiene una linea por registro")
+            ok = False
+        else:
+            i = 0
+            while i < len(lineas):
+                objeto = json.loads(lineas[i])
+                if list(objeto.keys()) != encabezados:
+                    print("  FALLO: campos de la salida JSONL en otro orden")
+                    ok = False
+                    break
+                # Los registros no tienen comas: la fila se puede separar
+                if list(objeto.values()) != filas_csv[i + 1].split(","):
+                    print("  FALLO: valores distintos en la linea " + str(i + 1))
+                    ok = False
+                    break
+                i += 1
+
+    # Limpiar
+    os.remove(ruta_csv)
+    os.remove(ruta_jsonl)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_entrada_y_salida_comprimidas():
+    # DADO un CSV y su version comprimida con gzip
+    # CUANDO se procesa el .csv.gz (tambien pidiendo 2 workers) y se exporta
+    # con --comprimir-salida (serial y con 2 workers)
+    # ENTONCES todas las salidas, ya descomprimidas, son iguales a la del CSV
+    print("TEST: test_entrada_y_salida_comprimidas")
+
+    ruta_csv = os.path.join(CARPETA_TEST, "temp_comprimido.csv")
+    ruta_gz = ruta_csv + ".gz"
+    contenido = HEADER_CSV
+    i = 0
+    while i < 80:
+        contenido += (
+            "SOL-Z" + str(i) + ",15/03/2025,cuenta,CLI-1," + str(100 * (i + 1))
+        )
+        contenido += ",ARS,argentina,S,N\n"
+        i += 1
+    arch = open(ruta_csv, "w", encoding="utf-8")
+    arch.write(contenido)
+    arch.close()
+    arch = gzip.open(ruta_gz, "wt", encoding="utf-8")
+    arch.write(contenido)
+    arch.close()
+
+    ok = True
+    plano = ejecutar_y_leer_artefactos(ruta_csv)
+    corridas = [
+        ejecutar_y_leer_artefactos(ruta_gz),
+        ejecutar_y_leer_artefactos(ruta_gz, workers=2),
+        ejecutar_y_leer_artefactos(ruta_csv, comprimir_salida=True),
+        ejecutar_y_leer_artefactos(ruta_csv, comprimir_salida=True, workers=2),
+    ]
+    for corrida in corridas:
+        if corrida[0] != "ok" or plano[0] != "ok":
+            print("  FALLO: las ejecuciones deberian terminar en status 'ok'")
+            ok = False
+        elif corrida[1] != plano[1]:
+            print("  FALLO: la salida difiere de la del CSV sin comprimir")
+            ok = False
+        elif corrida[2]["resumen"] != plano[2]["resumen"]:
+            print("  FALLO: el resumen del reporte difiere")
+            ok = False
+
+    resultado = main.main(
+        archivo_entrada_param=ruta_csv,
+        dir_data_param=CARPETA_TEST,
+        comprimir_salida=True,
+    )
+    if not resultado["archivo_salida"].endswith("solicitudes_limpias.csv.gz"):
+        print("  FALLO: nombre de salida comprimida inesperado")
+        ok = False
+    borrar_carpeta_ejecucion(resultado["carpeta_ejecucion"])
+
+    # Limpiar
+    os.remove(ruta_csv)
+    os.remove(ruta_gz)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_memo_fechas_en_metricas():
+    # DADO un CSV donde todos los registros tienen la misma fecha
+    # CUANDO se ejecuta el workflow en un proceso y con 2 workers
+    # ENTONCES las metricas informan una consulta por registro a cada memo de
+    # fechas, con a lo sumo un fallo por proceso (con workers la fecha se
+    # parsea una sola vez y el memo de validacion no se consulta)
+    print("TEST: test_memo_fechas_en_metricas")
+
+    ruta = os.path.join(CARPETA_TEST, "temp_memo.csv")
+    arch = open(ruta, "w", encoding="utf-8")
+    arch.write(HEADER_CSV)
+    i = 0
+    while i < 50:
+        arch.write(
+            "SOL-F" + str(i) + ",2025-03-15,cuenta,CLI-1,5000,ARS,argentina,S,N\n"
+        )
+        i += 1
+    arch.close()
+
+    ok = True
+    for workers in [1, 2]:
+        resultado = main.main(
+            archivo_entrada_param=ruta, dir_data_param=CARPETA_TEST, workers=workers
+        )
+        memo = resultado["metricas"].get("memo")
+        if memo == None or list(memo.keys()) != list(main.FUNCIONES_MEMO.keys()):
+            print("  FALLO: las metricas no informan los memos: " + str(memo))
+            ok = False
+        else:
+            for nombre in memo.keys():
+                datos = memo[nombre]
+                consultas = 50
+                if workers > 1 and nombre == "validacion_fecha":
+                    consultas = 0
+                if datos["aciertos"] + datos["fallos"] != consultas:
+                    print("  FALLO: consultas inesperadas al memo " + nombre)
+                    ok = False
+                elif datos["fallos"] > workers:
+                    print("  FALLO: demasiados fallos en el memo " + nombre)
+                    ok = False
+        borrar_carpeta_ejecucion(resultado["carpeta_ejecucion"])
+
+    os.remove(ruta)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+def test_cardinalidad_en_metricas():
+    # DADO un CSV con 3 paises, 2 monedas y 1 tipo de producto (con distintas
+    # mayusculas)
+    # CUANDO se ejecuta el workflow en un proceso y con 2 workers
+    # ENTONCES las metricas informan la cardinalidad normalizada de cada columna
+    print("TEST: test_cardinalidad_en_metricas")
+
+    ruta = os.path.join(CARPETA_TEST, "temp_cardinalidad.csv")
+    arch = open(ruta, "w", encoding="utf-8")
+    arch.write(HEADER_CSV)
+    paises = ["argentina", "CHILE", "Uruguay", "Argentina"]
+    monedas = ["ars", "USD"]
+    i = 0
+    while i < 40:
+        arch.write(
+            "SOL-K"
+            + str(i)
+            + ",15/03/2025,Cuenta,CLI-1,5000,"
+            + monedas[i % 2]
+            + ","
+            + paises[i % 4]
+            + ",S,N\n"
+        )
+        i += 1
+    arch.close()
+
+    esperado = {
+        "tipo_producto": {"valores_distintos": 1, "limite_alcanzado": False},
+        "moneda": {"valores_distintos": 2, "limite_alcanzado": False},
+        "pais": {"valores_distintos": 3, "limite_alcanzado": False},
+    }
+    ok = True
+    for workers in [1, 2]:
+        resultado = main.main(
+            archivo_entrada_param=ruta, dir_data_param=CARPETA_TEST, workers=workers
+        )
+        cardinalidad = resultado["metricas"].get("cardinalidad")
+        if cardinalidad != esperado:
+            print("  FALLO: cardinalidad inesperada: " + str(cardinalidad))
+            ok = False
+        borrar_carpeta_ejecucion(resultado["carpeta_ejecucion"])
+
+    os.remove(ruta)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+def test_registros_compactos_misma_salida():
+    # DADO un CSV con registros validos e invalidos
+    # CUANDO se ejecuta el workflow por etapas con y sin registros compactos
+    # ENTONCES la salida y el reporte son identicos
+    print("TEST: test_registros_compactos_misma_salida")
+
+    ruta = os.path.join(CARPETA_TEST, "temp_compacto.csv")
+    arch = open(ruta, "w", encoding="utf-8")
+    arch.write(HEADER_CSV)
+    arch.write("SOL-001,15/03/2025,cuenta,CLI-1,50000,ARS,argentina,S,N\n")
+    arch.write("SOL-002,2025-06-20,tarjeta,CLI-2,-5,GBP,chile,N,S\n")
+    arch.write('SOL-003,31-12-2025,servicio,,"1,000",usd,costa rica,S,N\n')
+    arch.write("SOL-004,99/99/2025,cuenta,CLI-4,600000,EUR,uruguay,N,N\n")
+    arch.close()
+
+    ok = True
+    normal = ejecutar_y_leer_artefactos(ruta)
+    compacto = ejecutar_y_leer_artefactos(ruta, compacto=True)
+    if normal[0] != "ok" or compacto[0] != "ok":
+        print("  FALLO: las ejecuciones deberian terminar en status 'ok'")
+        ok = False
+    elif normal[1] != compacto[1]:
+        print("  FALLO: el CSV de salida difiere con registros compactos")
+        ok = False
+    elif normal[2] != compacto[2]:
+        print("  FALLO: el reporte difiere con registros compactos")
+        ok = False
+
+    os.remove(ruta)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+def test_modo_pipeline_igual_a_streaming():
+    # DADO un CSV con registros validos e invalidos (mas lotes que capacidad en
+    # las colas) y un JSON invalido a mitad del archivo
+    # CUANDO se ejecuta el workflow en modo pipeline
+    # ENTONCES el CSV de salida y el reporte son identicos al modo streaming,
+    # las metricas informan esperas y colas, el JSON invalido detiene el
+    # workflow sin dejar salida y un pipeline cancelado cierra la entrada
+    print("TEST: test_modo_pipeline_igual_a_streaming")
+
+    ruta_csv = os.path.join(CARPETA_TEST, "temp_pipeline.csv")
+    arch = open(ruta_csv, "w", encoding="utf-8")
+    arch.write(HEADER_CSV)
+    i = 0
+    while i < 60:
+        arch.write("SOL-P" + str(i) + ",15/03/2025,cuenta,CLI-1,50000,ars,chile,S,N\n")
+        arch.write("SOL-Q" + str(i) + ",2025-13-20,,CLI-2,-5,GBP,peru,N,S\n")
+        i += 1
+    arch.close()
+
+    import pipeline
+
+    ok = True
+    lote_original = pipeline.REGISTROS_POR_LOTE
+    capacidad_original = pipeline.CAPACIDAD_COLA
+    try:
+        pipeline.REGISTROS_POR_LOTE = 7
+        pipeline.CAPACIDAD_COLA = 2
+        streaming = ejecutar_y_leer_artefactos(ruta_csv, modo_streaming=True)
+        resultado = main.main(
+            archivo_entrada_param=ruta_csv,
+            dir_data_param=CARPETA_TEST,
+            modo_pipeline=True,
+        )
+        if resultado["status"] != "ok":
+            print("  FALLO: el modo pipeline deberia terminar en status 'ok'")
+            ok = False
+        else:
+            reporte = json.loads(leer_texto(resultado["archivo_reporte"]))
+            metricas_pipeline = reporte["metricas"].get("pipeline")
+            del reporte["timestamp"]
+            del reporte["metricas"]
+            if leer_texto(resultado["archivo_salida"]) != streaming[1]:
+                print("  FALLO: el CSV de salida difiere del modo streaming")
+                ok = False
+            elif reporte != streaming[2]:
+                print("  FALLO: el reporte de calidad difiere del modo streaming")
+                ok = False
+            elif resultado["metricas"]["modo"] != "pipeline":
+                print("  FALLO: modo inesperado en las metricas")
+                ok = False
+            elif metricas_pipeline == None:
+                print("  FALLO: las metricas no informan el pipeline")
+                ok = False
+            else:
+                # 120 registros en lotes de 7: 18 lotes por cola
+                for nombre in pipeline.COLAS_PIPELINE:
+                    cola = metricas_pipeline["colas"][nombre]
+                    if cola["lotes"] != 18 or cola["profundidad_max"] > 2:
+                        print("  FALLO: cola inesperada " + nombre + ": " + str(cola))
+                        ok = False
+                for etapa in pipeline.ETAPAS_PIPELINE:
+                    datos = metricas_pipeline["etapas"][etapa]
+                    if datos["espera_entrada_s"] < 0 or datos["espera_salida_s"] < 0:
+                        print("  FALLO: esperas invalidas en " + etapa)
+                        ok = False
+        borrar_carpeta_ejecucion(resultado["carpeta_ejecucion"])
+    finally:
+        pipeline.REGISTROS_POR_LOTE = lote_original
+        pipeline.CAPACIDAD_COLA = capacidad_original
+
+    # JSON con una coma de mas despues del segundo elemento
+    ruta_json = os.path.join(CARPETA_TEST, "temp_pipeline.json")
+    arch = open(ruta_json, "w", encoding="utf-8")
+    arch.write('[{"id_solicitud": "SOL-1"}, {"id_solicitud": "SOL-2"},]')
+    arch.close()
+    resultado = main.main(
+        archivo_entrada_param=ruta_json, dir_data_param=CARPETA_TEST, modo_pipeline=True
+    )
+    if resultado["status"] != "error":
+        print("  FALLO: se esperaba status 'error' para JSON invalido")
+        ok = False
+    elif os.path.exists(
+        os.path.join(resultado["carpeta_ejecucion"], "solicitudes_limpias.csv")
+    ):
+        print("  FALLO: quedo una salida parcial del JSON invalido")
+        ok = False
+    borrar_carpeta_ejecucion(resultado["carpeta_ejecucion"])
+
+    # Si la exportacion deja de leer a mitad, el pipeline cierra el generador
+    # de la ingesta (y con el, el archivo de entrada)
+    import calidad
+    import ingesta
+
+    lote_original = pipeline.REGISTROS_POR_LOTE
+    try:
+        pipeline.REGISTROS_POR_LOTE = 7
+        iterador = ingesta.iter_solicitudes(ruta_csv)
+        primero = next(iterador)
+        flujo = pipeline.flujo_pipeline(
+            iterador, calidad.AcumuladorCalidad(), {}, [primero]
+        )
+        if next(flujo)["id_solicitud"] != "SOL-P0":
+            print("  FALLO: el pipeline deberia empezar por el primer registro")
+            ok = False
+        flujo.close()
+    finally:
+        pipeline.REGISTROS_POR_LOTE = lote_original
+    if inspect.getgeneratorstate(iterador) != inspect.GEN_CLOSED:
+        print("  FALLO: el pipeline cancelado no cerro la entrada")
+        ok = False
+
+    # Limpiar
+    os.remove(ruta_csv)
+    os.remove(ruta_json)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_rango_de_lineas_e_indice():
+    # DADO un CSV con registros validos, invalidos y lineas vacias
+    # CUANDO se ejecuta el workflow con un rango de lineas y con 2 workers
+    # usando el indice de lineas
+    # ENTONCES el rango da la misma salida que un archivo con solo esas lineas,
+    # y con el indice la salida es identica a la serial y el indice queda
+    # guardado junto al archivo para las proximas ejecuciones
+    print("TEST: test_rango_de_lineas_e_indice")
+
+    ruta_csv = os.path.join(CARPETA_TEST, "temp_rango_main.csv")
+    ruta_parte = os.path.join(CARPETA_TEST, "temp_rango_main_parte.csv")
+    lineas = []
+    i = 0
+    while i < 60:
+        if i % 2 == 0:
+            campos = ",15/03/2025,cuenta,CLI-1,50000,ars,chile,S,N"
+        else:
+            campos = ",2025-13-20,,CLI-2,-5,GBP,peru,N,S"
+        lineas.append("SOL-R" + str(i) + campos)
+        if i % 9 == 0:
+            lineas.append("")
+        i += 1
+    arch = open(ruta_csv, "w", encoding="utf-8")
+    arch.write(HEADER_CSV + "\n".join(lineas) + "\n")
+    arch.close()
+    # Lineas 10 a 30 del archivo (la linea 1 es el header)
+    arch = open(ruta_parte, "w", encoding="utf-8")
+    arch.write(HEADER_CSV + "\n".join(lineas[8:29]) + "\n")
+    arch.close()
+
+    import indice
+
+    ok = True
+    rango = ejecutar_y_leer_artefactos(ruta_csv, filas=(10, 30))
+    parte = ejecutar_y_leer_artefactos(ruta_parte)
+    if rango[0] != "ok" or rango[1] != parte[1]:
+        print("  FALLO: la salida del rango difiere del archivo con esas lineas")
+        ok = False
+    elif rango[2]["resumen"] != parte[2]["resumen"]:
+        print("  FALLO: el resumen del rango difiere del archivo con esas lineas")
+        ok = False
+    if os.path.exists(indice.ruta_indice(ruta_csv)):
+        print("  FALLO: sin --indice no deberia guardarse el indice")
+        ok = False
+
+    serial = ejecutar_y_leer_artefactos(ruta_csv)
+    for vez in [1, 2]:
+        con_indice = ejecutar_y_leer_artefactos(ruta_csv, workers=2, usar_indice=True)
+        if con_indice[1] != serial[1] or con_indice[2] != serial[2]:
+            print("  FALLO: la salida con indice difiere (ejecucion " + str(vez) + ")")
+            ok = False
+        if not os.path.exists(indice.ruta_indice(ruta_csv)):
+            print("  FALLO: no se guardo el indice")
+            ok = False
+
+    # Limpiar
+    os.remove(ruta_csv)
+    os.remove(ruta_parte)
+    if os.path.exists(indice.ruta_indice(ruta_csv)):
+        os.remove(indice.ruta_indice(ruta_csv))
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+# Funcion original de logger.py que el test del log asincronico envuelve
+INICIALIZAR_ORIGINAL = logger.inicializar
+
+# Valor de `asincronico` de cada logger.inicializar de workflow.log
+MODOS_LOG = []
+
+
+def inicializar_y_anotar(carpeta_logs=None, nombre_archivo=None, asincronico=False):
+    # Como logger.inicializar, anotando si el log de la ejecucion es asincronico
+    if nombre_archivo == "workflow.log":
+        MODOS_LOG.append(asincronico)
+    return INICIALIZAR_ORIGINAL(carpeta_logs, nombre_archivo, asincronico)
+
+
+def test_log_asincronico_opcional():
+    # DADO un CSV valido
+    # CUANDO se ejecuta main sin opciones y con log_asincronico=True
+    # ENTONCES por defecto el log es sincronico; con la opcion es asincronico,
+    # y en los dos casos workflow.log esta completo cuando main retorna
+    print("TEST: test_log_asincronico_opcional")
+
+    ruta_csv = os.path.join(CARPETA_TEST, "temp_log_asincronico.csv")
+    arch = open(ruta_csv, "w", encoding="utf-8")
+    arch.write(HEADER_CSV)
+    arch.write("SOL-001,15/03/2025,cuenta,CLI-1,50000,ARS,argentina,S,N\n")
+    arch.write("SOL-002,15/03/2025,cuenta,CLI-2,50000,GBP,argentina,S,N\n")
+    arch.close()
+
+    ok = True
+    MODOS_LOG.clear()
+    logger.inicializar = inicializar_y_anotar
+    try:
+        for opciones in [{}, {"log_asincronico": True}]:
+            resultado = main.main(
+                archivo_entrada_param=ruta_csv, dir_data_param=CARPETA_TEST, **opciones
+            )
+            contenido = leer_texto(resultado["archivo_log"])
+            if "Workflow completado en " not in contenido:
+                print("  FALLO: workflow.log incompleto al terminar main")
+                ok = False
+            borrar_carpeta_ejecucion(resultado["carpeta_ejecucion"])
+    finally:
+        logger.inicializar = INICIALIZAR_ORIGINAL
+    if MODOS_LOG != [False, True]:
+        print("  FALLO: modos de log inesperados: " + str(MODOS_LOG))
+        ok = False
+
+    # Limpiar
+    os.remove(ruta_csv)
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+def test_lote_unido_como_un_conjunto():
+    # DADO una carpeta con dos CSV y un JSONL, y un CSV con los mismos
+    # registros en ese orden
+    # CUANDO se ejecuta python src/main.py --lote carpeta --unir --workers 2
+    # ENTONCES los archivos se procesan como un solo conjunto de datos en una
+    # ejecucion, con la misma salida y el mismo resumen que el CSV unico
+    print("TEST: test_lote_unido_como_un_conjunto")
+
+    carpeta_entrada = os.path.join(CARPETA_TEST, "temp_lote_unido")
+    os.makedirs(carpeta_entrada, exist_ok=True)
+    lineas_a = [
+        "SOL-U1,15/03/2025,cuenta,CLI-1,50000,ARS,argentina,S,N",
+        "SOL-U2,2025-13-20,,CLI-2,-5,GBP,peru,N,S",
+    ]
+    lineas_b = ["SOL-U3,2025-06-20,tarjeta,CLI-3,1000,USD,chile,N,S"]
+    campos = HEADER_CSV.strip().split(",")
+    valores_c = [
+        "SOL-U4", "20/06/2025", "prestamo", "CLI-4", "300", "eur", "chile", "N", "N"
+    ]
+    arch = open(os.path.join(carpeta_entrada, "a.csv"), "w", encoding="utf-8")
+    arch.write(HEADER_CSV + "\n".join(lineas_a) + "\n")
+    arch.close()
+    arch = open(os.path.join(carpeta_entrada, "b.csv"), "w", encoding="utf-8")
+    arch.write(HEADER_CSV + "\n".join(lineas_b) + "\n")
+    arch.close()
+    arch = open(os.path.join(carpeta_entrada, "c.jsonl"), "w", encoding="utf-8")
+    arch.write(json.dumps(dict(zip(campos, valores_c))) + "\n")
+    arch.close()
+    ruta_unica = os.path.join(CARPETA_TEST, "temp_lote_unido_unico.csv")
+    arch = open(ruta_unica, "w", encoding="utf-8")
+    arch.write(HEADER_CSV + "\n".join(lineas_a + lineas_b + [",".join(valores_c)]))
+    arch.write("\n")
+    arch.close()
+
+    ok = True
+    argv_original = sys.argv
+    sys.argv = ["main.py", "--lote", carpeta_entrada, "--unir", "--workers", "2"]
+    try:
+        resultado = main.main(dir_data_param=CARPETA_TEST)
+    finally:
+        sys.argv = argv_original
+    unico = ejecutar_y_leer_artefactos(ruta_unica)
+    if resultado["status"] != "ok":
+        print("  FALLO: status esperado 'ok', obtenido " + resultado["status"])
+        ok = False
+    else:
+        if leer_texto(resultado["archivo_salida"]) != unico[1]:
+            print("  FALLO: la salida unida difiere del CSV unico")
+            ok = False
+        if resultado["reporte"]["resumen"] != unico[2]["resumen"]:
+            print("  FALLO: el resumen unido difiere del CSV unico")
+            ok = False
+        contenido = leer_texto(resultado["archivo_log"])
+        if "Ingesta multiple completada - 4 registros de 3 archivos" not in contenido:
+            print("  FALLO: el log no registra la ingesta de los 3 archivos")
+            ok = False
+    if resultado["carpeta_ejecucion"] != None:
+        borrar_carpeta_ejecucion(resultado["carpeta_ejecucion"])
+
+    # --unir solo tiene sentido con --lote
+    if main.parsear_argumentos(["datos.csv", "--unir"]) != None:
+        print("  FALLO: --unir sin --lote deberia rechazarse")
+        ok = False
+
+    # Limpiar
+    shutil.rmtree(carpeta_entrada)
+    os.remove(ruta_unica)
 
     if ok:
         print("  OK")
@@ -651,7 +1516,7 @@ if __name__ == "__main__":
     print("TESTS DE MAIN / ORQUESTADOR (RF-05)")
     print("=" * 50)
 
-    total = 7
+    total = 20
     aprobados = 0
 
     try:
@@ -689,6 +1554,71 @@ if __name__ == "__main__":
         aprobados += 1
     except AssertionError:
         pass
+    try:
+        test_modo_streaming_igual_a_clasico()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_exportar_csv_escape_y_bloques()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_modo_paralelo_igual_a_clasico()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_metricas_por_etapa()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_entrada_y_salida_jsonl()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_entrada_y_salida_comprimidas()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_memo_fechas_en_metricas()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_cardinalidad_en_metricas()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_registros_compactos_misma_salida()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_modo_pipeline_igual_a_streaming()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_rango_de_lineas_e_indice()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_log_asincronico_opcional()
+        aprobados += 1
+    except AssertionError:
+        pass
+    try:
+        test_lote_unido_como_un_conjunto()
+        aprobados += 1
+    except AssertionError:
+        pass
 
     print("")
     print("Resultado: " + str(aprobados) + "/" + str(total) + " tests aprobados")
@@ -3,6 +3,7 @@
 
 import sys
 import os
+import tempfile
 
 # Agregar src al path
 sys.path.insert(
@@ -12,8 +13,9 @@ sys.path.insert(
 import logger
 import normalizador
 
-# Inicializar logger para tests
-logger.inicializar()
+# Inicializar logger para tests, fuera del repositorio
+CARPETA_LOGS_TEST = os.path.join(tempfile.gettempdir(), "tests_workflow_logs")
+logger.inicializar(CARPETA_LOGS_TEST)
 
 
 def test_normalizar_fecha_yyyy_mm_dd():
@@ -253,13 +255,74 @@ def test_fecha_formato_dd_mm_yyyy():
     assert ok
 
 
+def test_categorias_compartidas_y_acotadas():
+    # DADO registros con los mismos paises y monedas escritos de distinta forma
+    # CUANDO se normalizan
+    # ENTONCES los valores iguales comparten el mismo objeto string, pais queda
+    # en Title Case y el memo no supera MAX_VALORES_CATEGORIA por columna
+    print("TEST: test_categorias_compartidas_y_acotadas")
+
+    normalizador.reiniciar_categorias()
+    registros = []
+    for pais in ["costa rica", "COSTA  RICA", "costa rica", "chile"]:
+        registros.append(
+            {
+                "id_solicitud": "SOL-C",
+                "fecha_solicitud": "15/03/2025",
+                "tipo_producto": "cuenta",
+                "moneda": "usd",
+                "pais": pais,
+                "monto_o_limite": "1000",
+            }
+        )
+    resultado = normalizador.normalizar_registros(registros)
+
+    ok = True
+    if resultado[0]["pais"] != "Costa Rica" or resultado[1]["pais"] != "Costa Rica":
+        print("  FALLO: pais esperado 'Costa Rica', obtenido " + resultado[1]["pais"])
+        ok = False
+    elif resultado[0]["pais"] is not resultado[2]["pais"]:
+        print("  FALLO: los paises iguales deberian ser el mismo objeto")
+        ok = False
+    elif resultado[0]["moneda"] is not resultado[3]["moneda"]:
+        print("  FALLO: las monedas iguales deberian ser el mismo objeto")
+        ok = False
+    else:
+        valores, desbordadas = normalizador.valores_categorias()
+        if valores["pais"] != ["Chile", "Costa Rica"] or desbordadas != []:
+            print("  FALLO: valores de pais inesperados: " + str(valores["pais"]))
+            ok = False
+
+    # Pasado el limite se sigue normalizando, sin guardar en el memo
+    limite_original = normalizador.MAX_VALORES_CATEGORIA
+    normalizador.MAX_VALORES_CATEGORIA = 2
+    try:
+        normalizador.reiniciar_categorias()
+        for moneda in ["ars", "usd", "eur"]:
+            if normalizador.normalizar_categoria("moneda", moneda) != moneda.upper():
+                print("  FALLO: moneda mal normalizada con el memo lleno")
+                ok = False
+        if len(normalizador.MEMO_CATEGORIAS["moneda"]) != 2:
+            print("  FALLO: el memo de moneda supero el limite")
+            ok = False
+        if normalizador.valores_categorias()[1] != ["moneda"]:
+            print("  FALLO: moneda deberia figurar como desbordada")
+            ok = False
+    finally:
+        normalizador.MAX_VALORES_CATEGORIA = limite_original
+        normalizador.reiniciar_categorias()
+
+    if ok:
+        print("  OK")
+    assert ok
+
 # Ejecutar tests manualmente
 if __name__ == "__main__":
     print("=" * 50)
     print("TESTS DE NORMALIZADOR (RF-02)")
     print("=" * 50)
 
-    total = 6
+    total = 7
     aprobados = 0
 
     try:
@@ -292,6 +355,11 @@ if __name__ == "__main__":
         aprobados += 1
     except AssertionError:
         pass
+    try:
+        test_categorias_compartidas_y_acotadas()
+        aprobados += 1
+    except AssertionError:
+        pass
 
     print("")
     print("Resultado: " + str(aprobados) + "/" + str(total) + " tests aprobados")
@@ -0,0 +1,110 @@
+# test_procesador.py - Tests para la normalizacion y validacion en una pasada
+# Verifica que procesador.procesar_registro de lo mismo que normalizar y validar
+
+import sys
+import os
+import tempfile
+
+# Agregar src al path
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+import logger
+import normalizador
+import validador
+import procesador
+
+# Inicializar logger para tests, fuera del repositorio
+CARPETA_LOGS_TEST = os.path.join(tempfile.gettempdir(), "tests_workflow_logs")
+logger.inicializar(CARPETA_LOGS_TEST)
+
+
+def armar_registro(fecha, monto, moneda, pais, cliente):
+    # Registro crudo con los campos que cambian entre casos de prueba
+    return {
+        "id_solicitud": " SOL-P01 ",
+        "fecha_solicitud": fecha,
+        "tipo_producto": " cuenta ",
+        "id_cliente": cliente,
+        "monto_o_limite": monto,
+        "moneda": moneda,
+        "pais": pais,
+        "flag_prioritario": "S",
+        "flag_digital": "N",
+    }
+
+
+def test_una_pasada_igual_a_dos_etapas():
+    # DADO registros con fechas en varios formatos (validas, invalidas y no
+    # reconocidas), montos fuera de rango o no numericos, monedas no soportadas
+    # y campos obligatorios vacios
+    # CUANDO se procesan en una pasada y con normalizar + validar, como dict y
+    # como RegistroCompacto
+    # ENTONCES los registros resultantes (campos, orden, estado, motivos y
+    # mascara de fallas) son iguales
+    print("TEST: test_una_pasada_igual_a_dos_etapas")
+
+    fechas = ["15/03/2025", "2025-03-15", " 15-03-2025 ", "32/13/2025", "sin fecha", ""]
+    montos = ["5000", " 600000 ", "0", "-500", "1000000000", "abc", "-", ""]
+    monedas = ["ars", "USD", "XXX", ""]
+    paises = ["argentina", "  costa RICA ", ""]
+    clientes = ["CLI-1", "  "]
+
+    ok = True
+    casos = 0
+    for fecha in fechas:
+        for monto in montos:
+            for moneda in monedas:
+                for pais in paises:
+                    for cliente in clientes:
+                        crudo = armar_registro(fecha, monto, moneda, pais, cliente)
+                        for compacto in [False, True]:
+                            esperado = normalizador.normalizar_registro(crudo, compacto)
+                            validador.validar_registro(esperado)
+                            obtenido = procesador.procesar_registro(crudo, compacto)
+                            if list(obtenido.keys()) != list(esperado.keys()):
+                                print("  FALLO: campos distintos para " + str(crudo))
+                                ok = False
+                            elif dict(obtenido) != dict(esperado):
+                                print("  FALLO: valores distintos para " + str(crudo))
+                                ok = False
+                            casos += 1
+
+    # Sin id_solicitud ni moneda: R1 falla por campo inexistente
+    crudo = armar_registro("2025-03-15", "5000", "ARS", "chile", "CLI-1")
+    del crudo["id_solicitud"]
+    del crudo["moneda"]
+    esperado = normalizador.normalizar_registro(crudo)
+    validador.validar_registro(esperado)
+    obtenido = procesador.procesar_registro(crudo)
+    if obtenido != esperado or obtenido["_fallas"] != validador.BITS_REGLAS["R1"]:
+        print("  FALLO: registro sin campos obligatorios: " + str(obtenido))
+        ok = False
+
+    if casos != 6 * 8 * 4 * 3 * 2 * 2:
+        print("  FALLO: se probaron " + str(casos) + " casos")
+        ok = False
+
+    if ok:
+        print("  OK")
+    assert ok
+
+
+# Ejecutar tests manualmente
+if __name__ == "__main__":
+    print("=" * 50)
+    print("TESTS DE PROCESADOR")
+    print("=" * 50)
+
+    total = 1
+    aprobados = 0
+
+    try:
+        test_una_pasada_igual_a_dos_etapas()
+        aprobados += 1
+    except AssertionError:
+        pass
+
+    print("")
+    print("Resultado: " + str(aprobados) + "/" + str(total) + " tests aprobados")
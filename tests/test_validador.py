@@ -3,6 +3,7 @@
 
 import sys
 import os
+import tempfile
 
 # Agregar src al path
 sys.path.insert(
@@ -12,8 +13,9 @@ sys.path.insert(
 import logger
 import validador
 
-# Inicializar logger para tests
-logger.inicializar()
+# Inicializar logger para tests, fuera del repositorio
+CARPETA_LOGS_TEST = os.path.join(tempfile.gettempdir(), "tests_workflow_logs")
+logger.inicializar(CARPETA_LOGS_TEST)
 
 
 def hacer_registro(id_sol, fecha, tipo, cliente, monto, moneda, pais):
@@ -326,13 +328,51 @@ def test_fecha_dia_31_mes_invalido():
     assert ok
 
 
+def test_mascara_de_fallas():
+    # DADO un registro valido y uno que falla R1, R2 y R3
+    # CUANDO se validan
+    # ENTONCES _fallas es 0 en el valido y tiene los 3 bits en el invalido, y
+    # los mensajes armados a pedido coinciden con motivos_falla
+    print("TEST: test_mascara_de_fallas")
+
+    valido = hacer_registro(
+        "SOL-V13", "15/03/2025", "CUENTA", "CLI-100", "5000", "ARS", "Argentina"
+    )
+    invalido = hacer_registro(
+        "SOL-V14", "32/13/2025", "", "CLI-100", "-500", "GBP", "Argentina"
+    )
+    validador.validar_registros([valido, invalido])
+
+    ok = True
+    if valido["_fallas"] != 0 or "_detalle_reglas" in valido.keys():
+        print("  FALLO: un registro valido no deberia tener fallas ni detalle")
+        ok = False
+    elif validador.reglas_falladas(invalido["_fallas"]) != ["R1", "R2", "R3"]:
+        print("  FALLO: mascara inesperada: " + str(invalido["_fallas"]))
+        ok = False
+    elif validador.armar_motivos(invalido, invalido["_fallas"]) != (
+        invalido["motivos_falla"]
+    ):
+        print("  FALLO: los mensajes a pedido difieren de motivos_falla")
+        ok = False
+    elif validador.mensajes_regla(invalido, "R2") != [
+        "formato de fecha invalido: '32/13/2025'",
+        "moneda no soportada: GBP",
+    ]:
+        print("  FALLO: mensajes de R2 inesperados")
+        ok = False
+
+    if ok:
+        print("  OK")
+    assert ok
+
 # Ejecutar tests manualmente
 if __name__ == "__main__":
     print("=" * 50)
     print("TESTS DE VALIDADOR (RF-03)")
     print("=" * 50)
 
-    total = 12
+    total = 13
     aprobados = 0
 
     try:
@@ -395,6 +435,11 @@ if __name__ == "__main__":
         aprobados += 1
     except AssertionError:
         pass
+    try:
+        test_mascara_de_fallas()
+        aprobados += 1
+    except AssertionError:
+        pass
 
     print("")
     print("Resultado: " + str(aprobados) + "/" + str(total) + " tests aprobados")